@@ -7,12 +7,19 @@ Created on Thu Dec 26 10:56:14 2024
 """
 
 import numpy as np
-import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn import svm
 from sklearn.metrics import accuracy_score
 import pickle
+import os
+import sys
+
+# Calibration and compact artifact export are shared with the backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from artifacts import export_artifact
+from calibration import calibrate_model
+from dataset_cache import load_frame
 
 ###########################
 #                         #
@@ -26,7 +33,7 @@ print("########################################")
 print("")
 
 # Data Collection and Analysis
-diabetes_dataset = pd.read_csv('dataset/diabetes.csv')
+diabetes_dataset = load_frame('diabetes')
 
 # Separating data and labels
 diabetes_X = diabetes_dataset.drop(columns=['Outcome'], axis=1)
@@ -71,6 +78,13 @@ else:
 # Save the model
 pickle.dump(classifier, open('diabetes_model.sav', 'wb'))
 
+# Calibrate confidence on out-of-fold decision values of the training data
+calibrator = calibrate_model(classifier, diabete_X_train, diabetes_y_train)
+pickle.dump(calibrator, open('diabetes_calibrator.sav', 'wb'))
+
+# Export the memory-mappable artifact next to the pickles
+export_artifact('diabetes.artifact', 'diabetes', classifier, scaler, calibrator=calibrator, source_paths=['diabetes_model.sav', 'diabetes_scaler.sav', 'diabetes_calibrator.sav'])
+
 print("")
 print("")
 #END Of DIABETES MODEL TRAINING
@@ -92,7 +106,7 @@ print("##############################################")
 print("")
 
 # Data Collection and Analysis
-heart_diseas_dataset = pd.read_csv('dataset/heart.csv')
+heart_diseas_dataset = load_frame('heart')
 
 # Separating data and labels
 heart_X = heart_diseas_dataset.drop(columns=['target'], axis=1)
@@ -137,6 +151,13 @@ else:
 # Save the model
 pickle.dump(classifier, open('heart_model.sav', 'wb'))
 
+# Calibrate confidence on out-of-fold decision values of the training data
+calibrator = calibrate_model(classifier, heart_X_train, heart_y_train)
+pickle.dump(calibrator, open('heart_calibrator.sav', 'wb'))
+
+# Export the memory-mappable artifact next to the pickles
+export_artifact('heart.artifact', 'heart', classifier, scaler, calibrator=calibrator, source_paths=['heart_model.sav', 'heart_scaler.sav', 'heart_calibrator.sav'])
+
 print("")
 print("")
 # END OF HEART DISEASES MODEL TRAINING
@@ -155,7 +176,7 @@ print("#  Parkinsons Dieases Prediction Model Training  #")
 print("##################################################")
 print("")
 #Data Collection and Analysis
-parkinsons_diseas_dataset = pd.read_csv('dataset/parkinsons.csv')
+parkinsons_diseas_dataset = load_frame('parkinsons')
 
 # Separating data and labels
 parkinsons_X = parkinsons_diseas_dataset.drop(columns=['status', 'name'], axis=1)
@@ -201,6 +222,13 @@ else:
 # Save the model
 pickle.dump(classifier, open('parkinsons_model.sav', 'wb'))
 
+# Calibrate confidence on out-of-fold decision values of the training data
+calibrator = calibrate_model(classifier, parkinsons_X_train, parkinsons_y_train)
+pickle.dump(calibrator, open('parkinsons_calibrator.sav', 'wb'))
+
+# Export the memory-mappable artifact next to the pickles
+export_artifact('parkinsons.artifact', 'parkinsons', classifier, scaler, calibrator=calibrator, source_paths=['parkinsons_model.sav', 'parkinsons_scaler.sav', 'parkinsons_calibrator.sav'])
+
 print("")
 print("")
 
@@ -7,12 +7,12 @@ Created on Thu Jan 26 10:56:14 2024
 """
 
 import numpy as np
-import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
 from sklearn import svm
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import pickle
+from dataset_cache import load_frame
 
 ###########################
 #                         #
@@ -26,7 +26,7 @@ print("########################################")
 print("")
 
 # Data Collection and Analysis
-diabetes_dataset = pd.read_csv('dataset/diabetes.csv')
+diabetes_dataset = load_frame('diabetes')
 
 # Separating data and labels
 diabetes_X = diabetes_dataset.drop(columns=['Outcome'], axis=1)
@@ -46,31 +46,47 @@ diabete_X_train, diabetes_X_test, diabetes_y_train, diabetes_y_test = train_test
 # Experiment with different kernels (e.g., 'poly', 'rbf', 'sigmoid')
 kernels = ['linear', 'poly', 'rbf', 'sigmoid']
 
+# Kernels are compared on cross-validated accuracy of the training split, so the test split stays unseen
+cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=2)
+
+# Keep the kernel with the best cross-validated accuracy, not whichever ran last
+best_accuracy = -1
+
 for kernel in kernels:
     print(f"Training with {kernel} kernel...")
 
-    # Training the model with the selected kernel
+    # Cross-validated accuracy on the training split
     classifier = svm.SVC(kernel=kernel)
-    classifier.fit(diabete_X_train, diabetes_y_train)
+    diabetes_cv_accuracy = cross_val_score(classifier, diabete_X_train, diabetes_y_train, cv=cv, scoring='accuracy').mean() * 100
 
-    # Model evaluation
+    # Training the model with the selected kernel
+    classifier.fit(diabete_X_train, diabetes_y_train)
     diabetes_train_accuracy = accuracy_score(diabetes_y_train, classifier.predict(diabete_X_train)) * 100
-    diabetes_test_accuracy = accuracy_score(diabetes_y_test, classifier.predict(diabetes_X_test)) * 100
 
     print(f"Training accuracy with {kernel} kernel: {diabetes_train_accuracy}")
-    print(f"Test accuracy with {kernel} kernel: {diabetes_test_accuracy}")
+    print(f"Cross-validated accuracy with {kernel} kernel: {diabetes_cv_accuracy}")
+    print("="*50)
 
-    # Classification report and confusion matrix
-    y_pred = classifier.predict(diabetes_X_test)
-    print("Classification Report:")
-    print(classification_report(diabetes_y_test, y_pred))
+    if diabetes_cv_accuracy > best_accuracy:
+        best_accuracy = diabetes_cv_accuracy
+        best_kernel = kernel
+        best_classifier = classifier
 
-    print("Confusion Matrix:")
-    print(confusion_matrix(diabetes_y_test, y_pred))
-    print("="*50)
+# Only the chosen kernel is evaluated on the test split
+diabetes_test_accuracy = accuracy_score(diabetes_y_test, best_classifier.predict(diabetes_X_test)) * 100
+print(f"Best kernel: {best_kernel} (cross-validated accuracy {best_accuracy})")
+print(f"Test accuracy with {best_kernel} kernel: {diabetes_test_accuracy}")
+
+# Classification report and confusion matrix
+y_pred = best_classifier.predict(diabetes_X_test)
+print("Classification Report:")
+print(classification_report(diabetes_y_test, y_pred))
+
+print("Confusion Matrix:")
+print(confusion_matrix(diabetes_y_test, y_pred))
 
 # Save the model with the chosen kernel
-pickle.dump(classifier, open('diabetes_model.sav', 'wb'))
+pickle.dump(best_classifier, open('diabetes_model.sav', 'wb'))
 
 print("")
 print("")
@@ -93,7 +109,7 @@ print("##############################################")
 print("")
 
 # Data Collection and Analysis
-heart_diseas_dataset = pd.read_csv('dataset/heart.csv')
+heart_diseas_dataset = load_frame('heart')
 
 # Separating data and labels
 heart_X = heart_diseas_dataset.drop(columns=['target'], axis=1)
@@ -110,31 +126,44 @@ pickle.dump(scaler, open('heart_scaler.sav', 'wb'))
 # Splitting the data
 heart_X_train, heart_X_test, heart_y_train, heart_y_test = train_test_split(heart_X_scaled, heart_y, test_size=0.2, stratify=heart_y, random_state=2)
 
+# Keep the kernel with the best cross-validated accuracy, not whichever ran last
+best_accuracy = -1
+
 for kernel in kernels:
     print(f"Training with {kernel} kernel...")
 
-    # Training the model with the selected kernel
+    # Cross-validated accuracy on the training split
     classifier = svm.SVC(kernel=kernel)
-    classifier.fit(heart_X_train, heart_y_train)
+    heart_cv_accuracy = cross_val_score(classifier, heart_X_train, heart_y_train, cv=cv, scoring='accuracy').mean() * 100
 
-    # Model evaluation
+    # Training the model with the selected kernel
+    classifier.fit(heart_X_train, heart_y_train)
     heart_train_accuracy = accuracy_score(heart_y_train, classifier.predict(heart_X_train)) * 100
-    heart_test_accuracy = accuracy_score(heart_y_test, classifier.predict(heart_X_test)) * 100
 
     print(f"Training accuracy with {kernel} kernel: {heart_train_accuracy}")
-    print(f"Test accuracy with {kernel} kernel: {heart_test_accuracy}")
+    print(f"Cross-validated accuracy with {kernel} kernel: {heart_cv_accuracy}")
+    print("="*50)
 
-    # Classification report and confusion matrix
-    y_pred = classifier.predict(heart_X_test)
-    print("Classification Report:")
-    print(classification_report(heart_y_test, y_pred))
+    if heart_cv_accuracy > best_accuracy:
+        best_accuracy = heart_cv_accuracy
+        best_kernel = kernel
+        best_classifier = classifier
 
-    print("Confusion Matrix:")
-    print(confusion_matrix(heart_y_test, y_pred))
-    print("="*50)
+# Only the chosen kernel is evaluated on the test split
+heart_test_accuracy = accuracy_score(heart_y_test, best_classifier.predict(heart_X_test)) * 100
+print(f"Best kernel: {best_kernel} (cross-validated accuracy {best_accuracy})")
+print(f"Test accuracy with {best_kernel} kernel: {heart_test_accuracy}")
+
+# Classification report and confusion matrix
+y_pred = best_classifier.predict(heart_X_test)
+print("Classification Report:")
+print(classification_report(heart_y_test, y_pred))
+
+print("Confusion Matrix:")
+print(confusion_matrix(heart_y_test, y_pred))
 
 # Save the model with the chosen kernel
-pickle.dump(classifier, open('heart_model.sav', 'wb'))
+pickle.dump(best_classifier, open('heart_model.sav', 'wb'))
 
 print("")
 print("")
@@ -154,7 +183,7 @@ print("#  Parkinsons Dieases Prediction Model Training  #")
 print("##################################################")
 print("")
 # Data Collection and Analysis
-parkinsons_diseas_dataset = pd.read_csv('dataset/parkinsons.csv')
+parkinsons_diseas_dataset = load_frame('parkinsons')
 
 # Separating data and labels
 parkinsons_X = parkinsons_diseas_dataset.drop(columns=['status', 'name'], axis=1)
@@ -172,31 +201,44 @@ parkinsons_X_test = scaler.transform(parkinsons_X_test)
 # Save the scaler to a file
 pickle.dump(scaler, open('parkinsons_scaler.sav', 'wb'))
 
+# Keep the kernel with the best cross-validated accuracy, not whichever ran last
+best_accuracy = -1
+
 for kernel in kernels:
     print(f"Training with {kernel} kernel...")
 
-    # Training the model with the selected kernel
+    # Cross-validated accuracy on the training split
     classifier = svm.SVC(kernel=kernel)
-    classifier.fit(parkinsons_X_train, parkinsons_y_train)
+    parkinsons_cv_accuracy = cross_val_score(classifier, parkinsons_X_train, parkinsons_y_train, cv=cv, scoring='accuracy').mean() * 100
 
-    # Model evaluation
+    # Training the model with the selected kernel
+    classifier.fit(parkinsons_X_train, parkinsons_y_train)
     parkinsons_train_accuracy = accuracy_score(parkinsons_y_train, classifier.predict(parkinsons_X_train)) * 100
-    parkinsons_test_accuracy = accuracy_score(parkinsons_y_test, classifier.predict(parkinsons_X_test)) * 100
 
     print(f"Training accuracy with {kernel} kernel: {parkinsons_train_accuracy}")
-    print(f"Test accuracy with {kernel} kernel: {parkinsons_test_accuracy}")
+    print(f"Cross-validated accuracy with {kernel} kernel: {parkinsons_cv_accuracy}")
+    print("="*50)
 
-    # Classification report and confusion matrix
-    y_pred = classifier.predict(parkinsons_X_test)
-    print("Classification Report:")
-    print(classification_report(parkinsons_y_test, y_pred))
+    if parkinsons_cv_accuracy > best_accuracy:
+        best_accuracy = parkinsons_cv_accuracy
+        best_kernel = kernel
+        best_classifier = classifier
 
-    print("Confusion Matrix:")
-    print(confusion_matrix(parkinsons_y_test, y_pred))
-    print("="*50)
+# Only the chosen kernel is evaluated on the test split
+parkinsons_test_accuracy = accuracy_score(parkinsons_y_test, best_classifier.predict(parkinsons_X_test)) * 100
+print(f"Best kernel: {best_kernel} (cross-validated accuracy {best_accuracy})")
+print(f"Test accuracy with {best_kernel} kernel: {parkinsons_test_accuracy}")
+
+# Classification report and confusion matrix
+y_pred = best_classifier.predict(parkinsons_X_test)
+print("Classification Report:")
+print(classification_report(parkinsons_y_test, y_pred))
+
+print("Confusion Matrix:")
+print(confusion_matrix(parkinsons_y_test, y_pred))
 
 # Save the model with the chosen kernel
-pickle.dump(classifier, open('parkinsons_model.sav', 'wb'))
+pickle.dump(best_classifier, open('parkinsons_model.sav', 'wb'))
 
 print("")
 print("")
@@ -1,13 +1,20 @@
 import numpy as np
-import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn import svm
 from sklearn.metrics import accuracy_score
 import pickle
+import os
+import sys
+
+# Calibration and compact artifact export are shared with the backend
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from artifacts import export_artifact
+from calibration import calibrate_model
+from dataset_cache import load_frame
 
 # Data Collection and Analysis
-heart_diseas_dataset = pd.read_csv('dataset/heart.csv')
+heart_diseas_dataset = load_frame('heart')
 
 # Separating data and labels
 X = heart_diseas_dataset.drop(columns=['target'], axis=1)
@@ -50,4 +57,11 @@ else:
     print("The person has heart disease.")
 
 # Save the model
-pickle.dump(classifier, open('heart_model.sav', 'wb'))
\ No newline at end of file
+pickle.dump(classifier, open('heart_model.sav', 'wb'))
+
+# Calibrate confidence on out-of-fold decision values of the training data
+calibrator = calibrate_model(classifier, X_train, y_train)
+pickle.dump(calibrator, open('heart_calibrator.sav', 'wb'))
+
+# Export the memory-mappable artifact next to the pickles
+export_artifact('heart.artifact', 'heart', classifier, scaler, calibrator=calibrator, source_paths=['heart_model.sav', 'heart_scaler.sav', 'heart_calibrator.sav'])
\ No newline at end of file
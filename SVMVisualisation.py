@@ -1,60 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVM decision boundary plots for any pair of a disease's features
+Fits a 2-feature SVM on the scaled training split and renders its decision
+boundary and margins to a PNG without a display. Linear boundaries are drawn
+from coef_ and intercept_ directly. Other kernels are evaluated on a coarse grid
+that is only refined, down to --resolution, in cells the boundary or a margin
+passes through.
+
+The 2-feature model is only written, under the output directory, when
+--save-model is given; the served models in backend/ are never touched.
+
+Usage:
+    python SVMVisualisation.py                                   # diabetes, Pregnancies vs Glucose, linear
+    python SVMVisualisation.py diabetes --features Glucose BMI --kernel rbf
+    python SVMVisualisation.py heart --features age thalach --kernel poly --compare-dense
+"""
+
+import argparse
+import os
+import sys
+import time
+
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from sklearn import svm
-from sklearn.metrics import accuracy_score
-import pickle
-
-# Data Collection and Analysis
-diabetes_dataset = pd.read_csv('dataset/diabetes.csv')
-
-# For visualization, we will select two features
-diabetes_X = diabetes_dataset[['Pregnancies', 'Glucose']]  # Selecting only two features for 2D plot
-diabetes_y = diabetes_dataset['Outcome']
-
-# Data Standardization
-scaler = StandardScaler()
-scaler.fit(diabetes_X)
-diabetes_X_scaled = scaler.transform(diabetes_X)
-
-# Save the scaler to a file
-pickle.dump(scaler, open('diabetes_scaler.sav', 'wb'))
-
-# Splitting the data
-diabetes_X_train, diabetes_X_test, diabetes_y_train, diabetes_y_test = train_test_split(diabetes_X_scaled, diabetes_y, test_size=0.2, stratify=diabetes_y, random_state=2)
-
-# Training the model
-classifier = svm.SVC(kernel='linear')
-classifier.fit(diabetes_X_train, diabetes_y_train)
-
-# Visualizing the decision boundary
-
-# Create a mesh grid for plotting decision boundary
-x_min, x_max = diabetes_X_scaled[:, 0].min() - 1, diabetes_X_scaled[:, 0].max() + 1
-y_min, y_max = diabetes_X_scaled[:, 1].min() - 1, diabetes_X_scaled[:, 1].max() + 1
-xx, yy = np.meshgrid(np.arange(x_min, x_max, 0.01), np.arange(y_min, y_max, 0.01))
-
-# Predict over the grid
-Z = classifier.predict(np.c_[xx.ravel(), yy.ravel()])
-Z = Z.reshape(xx.shape)
-
-# Plot the decision boundary
-plt.contourf(xx, yy, Z, alpha=0.8)
-plt.scatter(diabetes_X_scaled[:, 0], diabetes_X_scaled[:, 1], c=diabetes_y, edgecolors='k', marker='o', cmap=plt.cm.Paired)
-plt.title('SVM Decision Boundary for Diabetes Prediction')
-plt.xlabel('Pregnancies (scaled)')
-plt.ylabel('Glucose (scaled)')
-plt.colorbar()
-plt.show()
-
-# Model evaluation
-diabetes_train_accuracy = accuracy_score(diabetes_y_train, classifier.predict(diabetes_X_train)) * 100
-diabetes_test_accuracy = accuracy_score(diabetes_y_test, classifier.predict(diabetes_X_test)) * 100
-
-print(f"Training accuracy: {diabetes_train_accuracy}")
-print(f"Test accuracy: {diabetes_test_accuracy}")
-
-# Save the model
-pickle.dump(classifier, open('diabetes_model.sav', 'wb'))
\ No newline at end of file
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from diseases import DISEASES
+
+DEFAULT_FEATURES = {'diabetes': ['Pregnancies', 'Glucose']}
+
+# Regions of the decision function: beyond the negative margin, inside it on
+# either side of the boundary, and beyond the positive margin
+BAND_EDGES = [-1.0, 0.0, 1.0]
+BAND_COLORS = ['#9ecae1', '#deebf7', '#fee0d2', '#fc9272']
+
+def resolve_feature(spec, name):
+    """Index of a feature given its dataset column or API field name, ignoring case"""
+    for index, field in enumerate(spec.fields):
+        if name.lower() in (field.column.lower(), field.name.lower()):
+            return index
+    raise ValueError(f"{spec.name} has no feature {name!r}; choose from {', '.join(spec.columns)}")
+
+def plot_bounds(X, pad=1.0):
+    return X[:, 0].min() - pad, X[:, 0].max() + pad, X[:, 1].min() - pad, X[:, 1].max() + pad
+
+def linear_boundary(classifier, bounds):
+    """Decision values at the plot corners, and the boundary and margin lines, from the weights alone
+
+    The decision function is linear, so contour lines interpolated from the four
+    corners are exact.
+    """
+    (w0, w1), b = classifier.coef_[0], classifier.intercept_[0]
+    x_min, x_max, y_min, y_max = bounds
+    xs = np.array([x_min, x_max])
+    ys = np.array([y_min, y_max])
+    xx, yy = np.meshgrid(xs, ys)
+    values = w0 * xx + w1 * yy + b
+
+    lines = []
+    for level in BAND_EDGES:
+        # w0 x + w1 y + b = level, solved for whichever coordinate the line is steeper in
+        if abs(w1) >= abs(w0):
+            lines.append((level, xs, (level - b - w0 * xs) / w1))
+        else:
+            lines.append((level, (level - b - w1 * ys) / w0, ys))
+    return xx, yy, values, lines, 0
+
+def adaptive_bands(decision_function, bounds, resolution, coarse):
+    """Band index (see BAND_EDGES) of every point of a fine grid, evaluating as few points as possible
+
+    The grid is first evaluated every `coarse` units. Each cell whose corners
+    fall in different bands is split into four and its new points evaluated,
+    down to the fine resolution. Cells whose corners agree are filled with
+    their band unevaluated. Returns the grid, the bands and the number of
+    points evaluated.
+    """
+    x_min, x_max, y_min, y_max = bounds
+    step = 2 ** max(int(np.log2(max(coarse / resolution, 1))), 0)
+    nx = int(np.ceil((x_max - x_min) / resolution / step)) * step + 1
+    ny = int(np.ceil((y_max - y_min) / resolution / step)) * step + 1
+    xs = x_min + np.arange(nx) * resolution
+    ys = y_min + np.arange(ny) * resolution
+
+    bands = np.zeros((ny, nx), dtype=np.int8)
+    known = np.zeros((ny, nx), dtype=bool)
+    evaluated = 0
+
+    def evaluate(rows, cols):
+        nonlocal evaluated
+        todo = ~known[rows, cols]
+        rows, cols = rows[todo], cols[todo]
+        if len(rows):
+            values = decision_function(np.column_stack([xs[cols], ys[rows]]))
+            bands[rows, cols] = np.digitize(values, BAND_EDGES)
+            known[rows, cols] = True
+            evaluated += len(rows)
+
+    rows, cols = np.meshgrid(np.arange(0, ny, step), np.arange(0, nx, step), indexing='ij')
+    evaluate(rows.ravel(), cols.ravel())
+    # Top-left corners of the cells still to examine, in fine grid units
+    cell_rows, cell_cols = np.meshgrid(np.arange(0, ny - 1, step), np.arange(0, nx - 1, step), indexing='ij')
+    cell_rows, cell_cols = cell_rows.ravel(), cell_cols.ravel()
+
+    while len(cell_rows):
+        corners = np.stack([
+            bands[cell_rows, cell_cols], bands[cell_rows, cell_cols + step],
+            bands[cell_rows + step, cell_cols], bands[cell_rows + step, cell_cols + step]
+        ])
+        mixed = (corners != corners[0]).any(axis=0)
+
+        # Uniform cells take their corners' band, without overwriting evaluated points
+        for row, col, band in zip(cell_rows[~mixed], cell_cols[~mixed], corners[0][~mixed]):
+            block = (slice(row, row + step + 1), slice(col, col + step + 1))
+            bands[block] = np.where(known[block], bands[block], band)
+
+        if step == 1:
+            break
+        half = step // 2
+        cell_rows, cell_cols = cell_rows[mixed], cell_cols[mixed]
+        offsets = np.array([0, half, step])
+        new_rows = (cell_rows[:, None, None] + offsets[None, :, None]).repeat(3, axis=2).ravel()
+        new_cols = (cell_cols[:, None, None] + offsets[None, None, :]).repeat(3, axis=1).ravel()
+        evaluate(new_rows, new_cols)
+
+        cell_rows = (cell_rows[:, None] + np.array([0, 0, half, half])).ravel()
+        cell_cols = (cell_cols[:, None] + np.array([0, half, 0, half])).ravel()
+        step = half
+
+    xx, yy = np.meshgrid(xs, ys)
+    return xx, yy, bands, evaluated
+
+def dense_labels(classifier, bounds, resolution):
+    """Class of every grid point from one predict call each, the way this script used to plot"""
+    x_min, x_max, y_min, y_max = bounds
+    xx, yy = np.meshgrid(np.arange(x_min, x_max, resolution), np.arange(y_min, y_max, resolution))
+    return xx, yy, classifier.predict(np.c_[xx.ravel(), yy.ravel()]).reshape(xx.shape)
+
+def render(path, X, y, classifier, boundary, labels, title):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    band_levels = [-0.5, 0.5, 1.5, 2.5, 3.5]
+    line_styles = {-1.0: '--', 0.0: '-', 1.0: '--'}
+
+    if boundary[0] == 'linear':
+        _, xx, yy, values, lines = boundary
+        outer = [min(values.min(), BAND_EDGES[0]) - 1, max(values.max(), BAND_EDGES[-1]) + 1]
+        ax.contourf(xx, yy, values, levels=[outer[0]] + BAND_EDGES + [outer[1]], colors=BAND_COLORS)
+        for level, line_x, line_y in lines:
+            ax.plot(line_x, line_y, 'k', linestyle=line_styles[level], linewidth=1.5 if level == 0 else 1)
+    else:
+        _, xx, yy, bands = boundary
+        ax.contourf(xx, yy, bands, levels=band_levels, colors=BAND_COLORS)
+        ax.contour(xx, yy, bands, levels=band_levels[1:-1], colors='k', linestyles=['--', '-', '--'],
+                   linewidths=[1, 1.5, 1])
+
+    ax.scatter(X[:, 0], X[:, 1], c=y, cmap=plt.cm.Paired, edgecolors='k', marker='o', s=20)
+    support = classifier.support_vectors_
+    ax.scatter(support[:, 0], support[:, 1], s=60, facecolors='none', edgecolors='k', linewidths=0.6,
+               label=f'support vectors ({len(support)})')
+    ax.set_xlim(xx.min(), xx.max())
+    ax.set_ylim(yy.min(), yy.max())
+    ax.set_xlabel(f'{labels[0]} (scaled)')
+    ax.set_ylabel(f'{labels[1]} (scaled)')
+    ax.set_title(title)
+    ax.legend(loc='upper right')
+    fig.savefig(path, dpi=120, bbox_inches='tight')
+    plt.close(fig)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plot the decision boundary of a 2-feature SVM')
+    parser.add_argument('disease', nargs='?', default='diabetes', choices=list(DISEASES))
+    parser.add_argument('--features', nargs=2, metavar=('X', 'Y'),
+                        help='Dataset columns or API fields to plot (default: the first two)')
+    parser.add_argument('--kernel', choices=['linear', 'poly', 'rbf', 'sigmoid'], default='linear')
+    parser.add_argument('--C', type=float, default=1.0)
+    parser.add_argument('--gamma', default='scale')
+    parser.add_argument('--resolution', type=float, default=0.01, help='Finest grid step, in scaled units')
+    parser.add_argument('--coarse', type=float, default=0.32, help='Initial grid step for non-linear kernels')
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'plots'))
+    parser.add_argument('--save-model', action='store_true',
+                        help='Also pickle the 2-feature scaler and model into the output directory')
+    parser.add_argument('--compare-dense', action='store_true',
+                        help='Also time the full-grid predict the script used before, and check agreement')
+    args = parser.parse_args(argv)
+
+    from sklearn import svm
+    from sklearn.metrics import accuracy_score
+    from sklearn.preprocessing import StandardScaler
+    from train import load_dataset
+
+    spec = DISEASES[args.disease]
+    try:
+        names = args.features or DEFAULT_FEATURES.get(args.disease) or spec.columns[:2]
+        features = [resolve_feature(spec, name) for name in names]
+    except ValueError as e:
+        parser.error(str(e))
+    labels = [spec.fields[i].label for i in features]
+    columns = [spec.fields[i].column for i in features]
+    try:
+        gamma = float(args.gamma)
+    except ValueError:
+        gamma = args.gamma
+
+    timings = {}
+    started = time.perf_counter()
+    X_train, X_test, y_train, y_test = load_dataset(args.disease, os.path.join(BASE_DIR, 'dataset'))
+    X_train, X_test = X_train[:, features], X_test[:, features]
+    scaler = StandardScaler().fit(X_train)
+    X_train, X_test = scaler.transform(X_train), scaler.transform(X_test)
+    classifier = svm.SVC(kernel=args.kernel, C=args.C, gamma=gamma).fit(X_train, y_train)
+    timings['fit'] = time.perf_counter() - started
+
+    X = np.vstack([X_train, X_test])
+    y = np.concatenate([y_train, y_test])
+    bounds = plot_bounds(X)
+
+    started = time.perf_counter()
+    if args.kernel == 'linear':
+        xx, yy, values, lines, evaluated = linear_boundary(classifier, bounds)
+        boundary = ('linear', xx, yy, values, lines)
+    else:
+        xx, yy, bands, evaluated = adaptive_bands(classifier.decision_function, bounds, args.resolution, args.coarse)
+        boundary = ('grid', xx, yy, bands)
+    timings['boundary'] = time.perf_counter() - started
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    stem = f"{args.disease}-{columns[0]}-{columns[1]}-{args.kernel}"
+    path = os.path.join(args.output_dir, f'{stem}.png')
+    started = time.perf_counter()
+    render(path, X, y, classifier, boundary, labels, f'SVM ({args.kernel}) decision boundary for {spec.title}')
+    timings['render'] = time.perf_counter() - started
+
+    train_accuracy = accuracy_score(y_train, classifier.predict(X_train)) * 100
+    test_accuracy = accuracy_score(y_test, classifier.predict(X_test)) * 100
+    dense_points = int(np.ceil((bounds[1] - bounds[0]) / args.resolution) * np.ceil((bounds[3] - bounds[2]) / args.resolution))
+    print(f"{spec.title}: {labels[0]} vs {labels[1]}, {args.kernel} kernel, {len(classifier.support_vectors_)} support vectors")
+    print(f"Training accuracy: {train_accuracy:.2f}%")
+    print(f"Test accuracy: {test_accuracy:.2f}%")
+    if args.kernel == 'linear':
+        print(f"Boundary: drawn from coef_ and intercept_ (a full grid at {args.resolution:g} has {dense_points:,} points)")
+    else:
+        print(f"Boundary: {evaluated:,} decision values evaluated (a full grid at {args.resolution:g} has {dense_points:,})")
+    print("Timings: " + ', '.join(f'{stage} {seconds * 1000:.1f} ms' for stage, seconds in timings.items()))
+
+    if args.compare_dense:
+        started = time.perf_counter()
+        dense_xx, dense_yy, dense = dense_labels(classifier, bounds, args.resolution)
+        dense_seconds = time.perf_counter() - started
+        # Classes of the dense grid points read off the fast boundary
+        if args.kernel == 'linear':
+            fast = classifier.decision_function(np.c_[dense_xx.ravel(), dense_yy.ravel()]).reshape(dense.shape) > 0
+        else:
+            fast = boundary[3][:dense.shape[0], :dense.shape[1]] >= 2
+        agreement = np.mean(classifier.classes_[fast.astype(np.intp)] == dense) * 100
+        print(f"Dense grid: {dense.size:,} predictions in {dense_seconds * 1000:.1f} ms "
+              f"({dense_seconds / timings['boundary'] if timings['boundary'] else float('inf'):,.0f}x the boundary time), "
+              f"{agreement:.3f}% of points agree")
+
+    if args.save_model:
+        import pickle
+
+        for kind, obj in (('scaler', scaler), ('model', classifier)):
+            with open(os.path.join(args.output_dir, f'{stem}_{kind}.sav'), 'wb') as f:
+                pickle.dump(obj, f)
+    print(f"Saved {path}")
+
+if __name__ == '__main__':
+    sys.exit(main())
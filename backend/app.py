@@ -6,299 +6,462 @@ Created for DiseasesPrediction project
 """
 
 import numpy as np
-import pickle
 import os
-from flask import Flask, request, jsonify
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
 import logging
+from registry import ModelRegistry
+from batching import MicroBatcher
+from cache import PredictionCache
+from metrics import RequestMetrics, StageTimer, format_histogram, format_metric, process_memory
+from diseases import DISEASES
+from schema import format_errors
+from online import FeedbackLog, OnlineLearner
+from serialization import MEDIA_TYPES, ResultFragments, encode, negotiate
+from binary import ARROW, BINARY_TYPES, NPY, BatchTooLarge, read_matrix, write_results
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_init_started = time.perf_counter()
+
 app = Flask(__name__)
 CORS(app)
 
-# Load models and scalers
-def load_model_and_scaler(model_path, scaler_path):
-    """Load a model and its corresponding scaler"""
-    try:
-        # Check if files exist
-        if not os.path.exists(model_path):
-            logger.error(f"Model file not found: {model_path}")
-            return None, None
-        if not os.path.exists(scaler_path):
-            logger.error(f"Scaler file not found: {scaler_path}")
-            return None, None
-            
-        model = pickle.load(open(model_path, 'rb'))
-        scaler = pickle.load(open(scaler_path, 'rb'))
-        logger.info(f"Successfully loaded model and scaler for {model_path}")
-        return model, scaler
-    except Exception as e:
-        logger.error(f"Error loading model/scaler: {e}")
-        return None, None
-
-# Load all models
-logger.info("Loading models...")
-diabetes_model, diabetes_scaler = load_model_and_scaler('diabetes_model.sav', 'diabetes_scaler.sav')
-heart_model, heart_scaler = load_model_and_scaler('heart_model.sav', 'heart_scaler.sav')
-parkinsons_model, parkinsons_scaler = load_model_and_scaler('parkinsons_model.sav', 'parkinsons_scaler.sav')
-
-def calculate_confidence(prediction_proba, prediction):
-    """Calculate confidence score based on prediction probability"""
-    if hasattr(prediction_proba, 'shape') and len(prediction_proba.shape) > 1:
-        # For binary classification, use the probability of the predicted class
-        confidence = max(prediction_proba[0])
-    else:
-        # Fallback to a default confidence
-        confidence = 0.85
-    
-    return float(confidence)
-
-def determine_risk_level(prediction, confidence):
-    """Determine risk level based on prediction and confidence"""
-    if prediction == 0:
-        if confidence > 0.8:
-            return 'low'
-        elif confidence > 0.6:
-            return 'low'
-        else:
-            return 'medium'
+# Compile each disease spec into a request validator once, at startup
+validators = {disease: spec.compile() for disease, spec in DISEASES.items()}
+
+# Result bytes for each disease, class and risk level, encoded once up front
+fragments = {disease: ResultFragments(spec.messages) for disease, spec in DISEASES.items()}
+
+# Upper bound on the number of records accepted by a batch request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Directory holding the <disease>_model.sav and <disease>_scaler.sav files
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.dirname(os.path.abspath(__file__)))
+
+# Confirmed outcomes posted to /api/feedback are logged per disease. With
+# ONLINE_LEARNING=1 one worker applies them to the linear models with SGD and
+# periodically writes numbered snapshots, which every worker hot-reloads in
+# place of the shipped models. Turning it off serves the shipped models again.
+FEEDBACK_DIR = os.environ.get('FEEDBACK_DIR', os.path.join(MODEL_DIR, 'feedback'))
+USE_ONLINE_LEARNING = os.environ.get('ONLINE_LEARNING', '0') == '1'
+
+# Models are loaded on first use and hot-reloaded when their files change.
+# Each scaler + linear SVM pair is fused into a single weight vector and bias,
+# with the sklearn pipeline kept as the fallback and equivalence reference.
+registry = ModelRegistry(
+    MODEL_DIR,
+    DISEASES,
+    use_fused=os.environ.get('FUSED_INFERENCE', '1') != '0',
+    poll_interval=float(os.environ.get('MODEL_RELOAD_INTERVAL', 5.0)),
+    model_format=os.environ.get('MODEL_FORMAT', 'auto'),
+    snapshot_dir=os.path.join(FEEDBACK_DIR, 'snapshots') if USE_ONLINE_LEARNING else None
+)
+
+def predict_matrix(model, input_data):
+    """Return a model version's predictions and confidences for every row of a feature matrix"""
+    return model.predict(input_data)
+
+# Opt-in coalescing of concurrent single-record requests into one model call
+USE_MICROBATCHING = os.environ.get('MICROBATCH', '0') == '1'
+MICROBATCH_WINDOW_MS = float(os.environ.get('MICROBATCH_WINDOW_MS', 2.0))
+MICROBATCH_MAX_SIZE = int(os.environ.get('MICROBATCH_MAX_SIZE', 64))
+
+batchers = {}
+if USE_MICROBATCHING:
+    for disease in DISEASES:
+        batchers[disease] = MicroBatcher(
+            disease,
+            predict_matrix,
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch=MICROBATCH_MAX_SIZE
+        )
+    logger.info(f"Micro-batching enabled ({MICROBATCH_WINDOW_MS} ms window, max {MICROBATCH_MAX_SIZE} requests)")
+
+# Cache of recent single-record results, so resubmitted forms skip the model
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 300.0))
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL) if PREDICTION_CACHE_SIZE > 0 else None
+
+def predict_row(disease, model, input_data, timer=None, coalesce=True):
+    """Predict a single (1, n) row, coalescing with concurrent requests when enabled"""
+    if prediction_cache is not None:
+        cached = prediction_cache.get(disease, model.version, input_data[0])
+        if cached is not None:
+            if timer is not None:
+                timer.mark('cache')
+            return cached
+
+    batcher = batchers.get(disease) if coalesce else None
+    if batcher is not None:
+        result = batcher.submit(input_data[0], model)
+        if timer is not None:
+            timer.mark('predict')
     else:
-        if confidence > 0.8:
-            return 'high'
-        elif confidence > 0.6:
-            return 'medium'
-        else:
-            return 'medium'
+        predictions, confidences = model.predict(input_data, timer)
+        result = (int(predictions[0]), float(confidences[0]))
+
+    if prediction_cache is not None:
+        prediction_cache.put(disease, model.version, input_data[0], result)
+    return result
+
+def respond(body, media_type, status=200):
+    """Response with the body encoded as JSON or MessagePack, as negotiated"""
+    return Response(encode(body, media_type), status=status, mimetype=media_type)
+
+def score_batch(disease, model, records, media_type, timer=None):
+    """Validate and score a list of records together, with a per-row error for invalid ones"""
+    input_data, valid_rows, errors = validators[disease].extract_batch(records)
+    if timer is not None:
+        timer.mark('extract')
+    return score_matrix(disease, model, len(records), input_data, valid_rows, errors, media_type, timer)
+
+def score_matrix(disease, model, count, input_data, valid_rows, errors, media_type, timer=None):
+    """Score the valid rows of a batch and build its response body in media_type"""
+    predictions = confidences = None
+    if valid_rows:
+        # Scale and predict the whole matrix at once
+        predictions, confidences = model.predict(input_data, timer)
+
+    if media_type in BINARY_TYPES:
+        messages = {index: format_errors(fields) for index, fields in errors.items()}
+        return write_results(media_type, DISEASES[disease].messages, count, valid_rows, predictions, confidences, messages)
+    row_errors = {index: {'error': format_errors(fields), 'fields': fields} for index, fields in errors.items()}
+    return {
+        'results': fragments[disease].batch(count, valid_rows, predictions, confidences, row_errors, media_type),
+        'count': count,
+        'errorCount': len(errors)
+    }
+
+# Screening requests score several diseases' batches on this pool at once;
+# numpy releases the GIL in the matrix products, so the models overlap. Small
+# screens run inline, where a thread handoff would cost more than the models.
+# Threads start on first use, so a preloading master forks without any.
+SCREEN_WORKERS = int(os.environ.get('SCREEN_WORKERS', len(DISEASES)))
+SCREEN_PARALLEL_ROWS = int(os.environ.get('SCREEN_PARALLEL_ROWS', 256))
+screen_pool = ThreadPoolExecutor(max_workers=SCREEN_WORKERS, thread_name_prefix='screen') if SCREEN_WORKERS > 1 else None
+
+feedback_log = FeedbackLog(FEEDBACK_DIR)
+online_learner = OnlineLearner(
+    registry,
+    feedback_log,
+    DISEASES,
+    interval=float(os.environ.get('ONLINE_SNAPSHOT_INTERVAL', 30.0)),
+    min_samples=int(os.environ.get('ONLINE_MIN_SAMPLES', 20)),
+    alpha=float(os.environ.get('ONLINE_ALPHA', 1e-3)),
+    eta0=float(os.environ.get('ONLINE_LEARNING_RATE', 0.01)),
+    holdout_every=int(os.environ.get('ONLINE_HOLDOUT_EVERY', 5))
+) if USE_ONLINE_LEARNING else None
+
+# Per-disease request counts, error counts and stage latency histograms
+request_metrics = RequestMetrics()
+
+def instrumented(route, disease=None):
+    """Time a prediction view and record its outcome in the request metrics
+
+    Views mark their own stages on g.timer; whatever runs after the last
+    mark, which is building the JSON response, is recorded as serialize.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            timer = g.timer = StageTimer()
+            response = view(*args, **kwargs)
+            status = response[1] if isinstance(response, tuple) else response.status_code
+            if status < 400:
+                timer.mark('serialize')
+            label = disease or kwargs.get('disease')
+            if label in DISEASES:
+                request_metrics.observe(label, route, timer, status)
+            return response
+        return wrapper
+    return decorator
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint, answered from in-memory state without touching the disk"""
+    model_status = registry.status()
     return jsonify({
         'status': 'healthy',
         'message': 'Disease Prediction API is running',
+        'ready': registry.ready(),
         'models_loaded': {
-            'diabetes': diabetes_model is not None,
-            'heart': heart_model is not None,
-            'parkinsons': parkinsons_model is not None
+            disease: status['loaded'] for disease, status in model_status.items()
         },
-        'files_exist': {
-            'diabetes_model.sav': os.path.exists('diabetes_model.sav'),
-            'diabetes_scaler.sav': os.path.exists('diabetes_scaler.sav'),
-            'heart_model.sav': os.path.exists('heart_model.sav'),
-            'heart_scaler.sav': os.path.exists('heart_scaler.sav'),
-            'parkinsons_model.sav': os.path.exists('parkinsons_model.sav'),
-            'parkinsons_scaler.sav': os.path.exists('parkinsons_scaler.sav'),
-        }
+        'models': model_status,
+        'files_exist': registry.files_exist(),
+        'pid': os.getpid(),
+        'startup': startup,
+        'microbatching': {
+            disease: batcher.stats() for disease, batcher in batchers.items()
+        } if USE_MICROBATCHING else None,
+        'cache': prediction_cache.stats() if prediction_cache is not None else None,
+        'online': online_learner.status() if online_learner is not None else None
     })
 
-@app.route('/api/predict/diabetes', methods=['POST'])
-def predict_diabetes():
-    """Predict diabetes risk"""
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once every disease has a model serving, 503 before"""
+    if registry.ready():
+        return jsonify({'ready': True})
+    return jsonify({'ready': False, 'missing': [d for d, s in registry.status().items() if not s['loaded']]}), 503
+
+def model_unavailable(disease):
+    logger.error(f"{DISEASES[disease].title} model or scaler not available")
+    return jsonify({'error': f'{DISEASES[disease].title} model not available. Please check if model files are uploaded.'}), 500
+
+@app.route('/api/predict/<disease>', methods=['POST'])
+@instrumented('single')
+def predict(disease):
+    """Predict disease risk for a single record"""
+    if disease not in DISEASES:
+        return jsonify({'error': f'Unknown disease: {disease}'}), 404
+
     try:
-        if diabetes_model is None or diabetes_scaler is None:
-            logger.error("Diabetes model or scaler not available")
-            return jsonify({'error': 'Diabetes model not available. Please check if model files are uploaded.'}), 500
-        
-        data = request.get_json()
+        model = registry.get(disease)
+        if model is None:
+            return model_unavailable(disease)
+
+        data = request.get_json(silent=True)
+        media_type = negotiate(request.accept_mimetypes)
+        g.timer.mark('parse')
         if not data:
             return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract features in the correct order
-        features = [
-            data['pregnancies'],
-            data['glucose'],
-            data['bloodPressure'],
-            data['skinThickness'],
-            data['insulin'],
-            data['bmi'],
-            data['diabetesPedigreeFunction'],
-            data['age']
-        ]
-        
-        # Convert to numpy array and reshape
-        input_data = np.asarray(features).reshape(1, -1)
-        
-        # Scale the input data
-        input_data_scaled = diabetes_scaler.transform(input_data)
-        
-        # Make prediction
-        prediction = diabetes_model.predict(input_data_scaled)[0]
-        
-        # Get prediction probability if available
-        try:
-            prediction_proba = diabetes_model.predict_proba(input_data_scaled)
-            confidence = calculate_confidence(prediction_proba, prediction)
-        except:
-            confidence = 0.85
-        
-        risk_level = determine_risk_level(prediction, confidence)
-        
-        # Create response message
-        if prediction == 0:
-            message = "The person is not diabetic. Continue maintaining a healthy lifestyle."
-        else:
-            message = "The person is diabetic. Please consult with a healthcare professional for proper management."
-        
-        return jsonify({
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'message': message,
-            'riskLevel': risk_level
-        })
-        
-    except KeyError as e:
-        logger.error(f"Missing field in request: {e}")
-        return jsonify({'error': f'Missing required field: {e}'}), 400
+
+        # Validate and extract features in the correct order
+        input_data, errors = validators[disease].extract(data)
+        g.timer.mark('extract')
+        if errors:
+            logger.error(f"Invalid {disease} request: {format_errors(errors)}")
+            return jsonify({'error': format_errors(errors), 'fields': errors}), 400
+
+        # Scale and predict in one pass
+        prediction, confidence = predict_row(disease, model, input_data, g.timer)
+
+        return respond(fragments[disease].record(prediction, confidence, media_type), media_type)
+
     except Exception as e:
-        logger.error(f"Error in diabetes prediction: {e}")
+        logger.error(f"Error in {disease} prediction: {e}")
         return jsonify({'error': 'Failed to make prediction'}), 500
 
-@app.route('/api/predict/heart', methods=['POST'])
-def predict_heart_disease():
-    """Predict heart disease risk"""
+@app.route('/api/predict/<disease>/batch', methods=['POST'])
+@instrumented('batch')
+def predict_batch(disease):
+    """Predict disease risk for a batch of records in a single pass"""
+    if disease not in DISEASES:
+        return jsonify({'error': f'Unknown disease: {disease}'}), 404
+
     try:
-        if heart_model is None or heart_scaler is None:
-            logger.error("Heart disease model or scaler not available")
-            return jsonify({'error': 'Heart disease model not available. Please check if model files are uploaded.'}), 500
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract features in the correct order
-        features = [
-            data['age'],
-            data['sex'],
-            data['cp'],
-            data['trestbps'],
-            data['chol'],
-            data['fbs'],
-            data['restecg'],
-            data['thalach'],
-            data['exang'],
-            data['oldpeak'],
-            data['slope'],
-            data['ca'],
-            data['thal']
-        ]
-        
-        # Convert to numpy array and reshape
-        input_data = np.asarray(features).reshape(1, -1)
-        
-        # Scale the input data
-        input_data_scaled = heart_scaler.transform(input_data)
-        
-        # Make prediction
-        prediction = heart_model.predict(input_data_scaled)[0]
-        
-        # Get prediction probability if available
-        try:
-            prediction_proba = heart_model.predict_proba(input_data_scaled)
-            confidence = calculate_confidence(prediction_proba, prediction)
-        except:
-            confidence = 0.85
-        
-        risk_level = determine_risk_level(prediction, confidence)
-        
-        # Create response message
-        if prediction == 0:
-            message = "The person does not have heart disease. Continue maintaining cardiovascular health."
-        else:
-            message = "The person has heart disease. Please consult with a cardiologist for proper evaluation and treatment."
-        
-        return jsonify({
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'message': message,
-            'riskLevel': risk_level
-        })
-        
-    except KeyError as e:
-        logger.error(f"Missing field in request: {e}")
-        return jsonify({'error': f'Missing required field: {e}'}), 400
+        model = registry.get(disease)
+        if model is None:
+            return model_unavailable(disease)
+
+        media_type = negotiate(request.accept_mimetypes, MEDIA_TYPES + BINARY_TYPES)
+        if request.mimetype in (NPY, ARROW):
+            if request.mimetype not in BINARY_TYPES:
+                return jsonify({'error': f'{request.mimetype} bodies need pyarrow, which is not installed'}), 415
+            # The body's float64 data becomes the feature matrix without a Python object per value
+            try:
+                features = read_matrix(request.mimetype, request.get_data(cache=False), DISEASES[disease], MAX_BATCH_SIZE)
+            except BatchTooLarge as e:
+                return jsonify({'error': str(e)}), 413
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            g.timer.mark('parse')
+            input_data, valid_rows, errors = validators[disease].filter_matrix(features)
+            g.timer.mark('extract')
+            return respond(score_matrix(disease, model, len(features), input_data, valid_rows, errors, media_type, g.timer),
+                           media_type)
+
+        data = request.get_json(silent=True)
+        g.timer.mark('parse')
+        records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': 'Request body must be a non-empty array of records'}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch size exceeds the limit of {MAX_BATCH_SIZE} records'}), 413
+
+        return respond(score_batch(disease, model, records, media_type, g.timer), media_type)
+
     except Exception as e:
-        logger.error(f"Error in heart disease prediction: {e}")
+        logger.error(f"Error in {disease} batch prediction: {e}")
         return jsonify({'error': 'Failed to make prediction'}), 500
 
-@app.route('/api/predict/parkinsons', methods=['POST'])
-def predict_parkinsons():
-    """Predict Parkinson's disease risk"""
+def screen_group(disease, group, media_type):
+    """Score one disease's record, or list of records, from a screening request
+
+    Returns the result in the shape of the single or batch route's response,
+    its HTTP status on its own, and the StageTimer of the work.
+    """
+    timer = StageTimer()
+    model = registry.get(disease)
+    if model is None:
+        return {'error': f'{DISEASES[disease].title} model not available'}, 500, timer
+
+    if isinstance(group, list):
+        return score_batch(disease, model, group, media_type, timer), 200, timer
+
+    input_data, errors = validators[disease].extract(group)
+    timer.mark('extract')
+    if errors:
+        return {'error': format_errors(errors), 'fields': errors}, 400, timer
+    # The request already scores each disease once; waiting on a micro-batch window here would only add latency
+    prediction, confidence = predict_row(disease, model, input_data, timer, coalesce=False)
+    return fragments[disease].record(prediction, confidence, media_type), 200, timer
+
+@app.route('/api/screen', methods=['POST'])
+def screen():
+    """Screen for any subset of the diseases in one request
+
+    The body maps disease names to a record, or to a list of records, with
+    that disease's fields. Each disease's result has the shape of its single
+    or batch route's response, and fails on its own without failing the
+    others.
+    """
+    timer = StageTimer()
     try:
-        if parkinsons_model is None or parkinsons_scaler is None:
-            logger.error("Parkinson's disease model or scaler not available")
-            return jsonify({'error': 'Parkinson\'s disease model not available. Please check if model files are uploaded.'}), 500
-        
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract features in the correct order (excluding name and status)
-        features = [
-            data['mdvpFo'],
-            data['mdvpFhi'],
-            data['mdvpFlo'],
-            data['mdvpJitter'],
-            data['mdvpJitterAbs'],
-            data['mdvpRap'],
-            data['mdvpPpq'],
-            data['jitterDdp'],
-            data['mdvpShimmer'],
-            data['mdvpShimmerDb'],
-            data['shimmerApq3'],
-            data['shimmerApq5'],
-            data['mdvpApq'],
-            data['shimmerDda'],
-            data['nhr'],
-            data['hnr'],
-            data['rpde'],
-            data['dfa'],
-            data['spread1'],
-            data['spread2'],
-            data['d2'],
-            data['ppe']
-        ]
-        
-        # Convert to numpy array and reshape
-        input_data = np.asarray(features).reshape(1, -1)
-        
-        # Scale the input data
-        input_data_scaled = parkinsons_scaler.transform(input_data)
-        
-        # Make prediction
-        prediction = parkinsons_model.predict(input_data_scaled)[0]
-        
-        # Get prediction probability if available
-        try:
-            prediction_proba = parkinsons_model.predict_proba(input_data_scaled)
-            confidence = calculate_confidence(prediction_proba, prediction)
-        except:
-            confidence = 0.85
-        
-        risk_level = determine_risk_level(prediction, confidence)
-        
-        # Create response message
-        if prediction == 0:
-            message = "The person does not have Parkinson's disease. Continue monitoring neurological health."
+        data = request.get_json(silent=True)
+        media_type = negotiate(request.accept_mimetypes)
+        timer.mark('parse')
+        if not isinstance(data, dict) or not data:
+            return jsonify({'error': f"Request body must map one or more of {', '.join(DISEASES)} to a record or a list of records"}), 400
+        unknown = [disease for disease in data if disease not in DISEASES]
+        if unknown:
+            return jsonify({'error': f"Unknown disease(s): {', '.join(unknown)}"}), 404
+
+        for disease, group in data.items():
+            if not (isinstance(group, dict) and group) and not (isinstance(group, list) and group):
+                return jsonify({'error': f'{disease} must be a record or a non-empty array of records'}), 400
+        rows = sum(len(group) for group in data.values() if isinstance(group, list))
+        if rows > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch size exceeds the limit of {MAX_BATCH_SIZE} records'}), 413
+
+        if screen_pool is not None and len(data) > 1 and rows >= SCREEN_PARALLEL_ROWS:
+            futures = {disease: screen_pool.submit(screen_group, disease, group, media_type) for disease, group in data.items()}
+            outcomes = {disease: future.result() for disease, future in futures.items()}
         else:
-            message = "The person has Parkinson's disease. Please consult with a neurologist for proper evaluation and treatment."
-        
-        return jsonify({
-            'prediction': int(prediction),
-            'confidence': confidence,
-            'message': message,
-            'riskLevel': risk_level
-        })
-        
-    except KeyError as e:
-        logger.error(f"Missing field in request: {e}")
-        return jsonify({'error': f'Missing required field: {e}'}), 400
+            outcomes = {disease: screen_group(disease, group, media_type) for disease, group in data.items()}
+        timer.mark('predict')
+
+        results = {}
+        timings = {}
+        for disease, (result, status, group_timer) in outcomes.items():
+            request_metrics.observe(disease, 'screen', group_timer, status)
+            results[disease] = result
+            timings[disease] = {
+                'ms': group_timer.elapsed() * 1000,
+                'stages': {stage: seconds * 1000 for stage, seconds in group_timer.stages}
+            }
+
+        statuses = [status for _, status, _ in outcomes.values()]
+        body = {
+            'results': results,
+            'errorCount': sum(status >= 400 for status in statuses),
+            'timings': timings,
+            'totalMs': timer.elapsed() * 1000
+        }
+        if all(status >= 400 for status in statuses):
+            return respond(body, media_type, max(statuses))
+        return respond(body, media_type)
+
     except Exception as e:
-        logger.error(f"Error in Parkinson's disease prediction: {e}")
+        logger.error(f"Error in screening: {e}")
         return jsonify({'error': 'Failed to make prediction'}), 500
 
+@app.route('/api/feedback/<disease>', methods=['POST'])
+@instrumented('feedback')
+def feedback(disease):
+    """Record confirmed outcomes for scored records, for online model updates"""
+    if disease not in DISEASES:
+        return jsonify({'error': f'Unknown disease: {disease}'}), 404
+
+    try:
+        data = request.get_json(silent=True)
+        g.timer.mark('parse')
+        records = data.get('records') if isinstance(data, dict) and 'records' in data else data
+        if isinstance(records, dict):
+            records = [records]
+        if not isinstance(records, list) or not records:
+            return jsonify({'error': 'Request body must be a record or a non-empty array of records, each with an outcome'}), 400
+        if len(records) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'Batch size exceeds the limit of {MAX_BATCH_SIZE} records'}), 413
+
+        input_data, valid_rows, errors = validators[disease].extract_batch(records)
+        outcomes = range(len(DISEASES[disease].messages))
+        keep = []
+        for position, index in enumerate(valid_rows):
+            outcome = records[index].get('outcome')
+            if isinstance(outcome, bool) or outcome not in outcomes:
+                errors[index] = {'outcome': f'outcome must be one of {", ".join(map(str, outcomes))}'}
+            else:
+                keep.append(position)
+        g.timer.mark('extract')
+
+        messages = {str(index): format_errors(row_errors) for index, row_errors in sorted(errors.items())}
+        if not keep:
+            return jsonify({'error': messages[str(min(errors))], 'errors': messages}), 400
+
+        feedback_log.append(disease, input_data[keep], [records[valid_rows[p]]['outcome'] for p in keep])
+        if online_learner is not None:
+            online_learner.ensure_running()
+
+        return jsonify({
+            'accepted': len(keep),
+            'errorCount': len(errors),
+            'errors': messages
+        }), 202
+
+    except Exception as e:
+        logger.error(f"Error recording {disease} feedback: {e}")
+        return jsonify({'error': 'Failed to record feedback'}), 500
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    lines = request_metrics.render()
+
+    lines += format_metric(
+        'prediction_model_info', 'gauge', 'Loaded model version per disease',
+        [({'disease': disease, 'version': status['version'], 'format': status['format']}, 1)
+         for disease, status in registry.status().items() if status['loaded']]
+    )
+
+    memory = process_memory()
+    lines += format_metric(
+        'process_resident_memory_bytes', 'gauge', 'Resident memory of this worker',
+        [({'pid': os.getpid()}, memory['rss'])]
+    )
+    if memory['pss'] is not None:
+        lines += format_metric(
+            'process_proportional_memory_bytes', 'gauge', 'Resident memory of this worker with shared pages split between sharers',
+            [({'pid': os.getpid()}, memory['pss'])]
+        )
+
+    if prediction_cache is not None:
+        cache_stats = prediction_cache.stats()['diseases']
+        for counter in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+            lines += format_metric(
+                f'prediction_cache_{counter}_total', 'counter', f'Prediction cache {counter}',
+                [({'disease': disease}, stats[counter]) for disease, stats in sorted(cache_stats.items())]
+            )
+        lines += format_metric(
+            'prediction_cache_entries', 'gauge', 'Entries in the prediction cache',
+            [({'disease': disease}, stats['size']) for disease, stats in sorted(cache_stats.items())]
+        )
+
+    if batchers:
+        lines += format_histogram(
+            'prediction_microbatch_size', 'Requests coalesced into each micro-batch',
+            [({'disease': disease}, batcher.histogram()) for disease, batcher in sorted(batchers.items())]
+        )
+
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -307,13 +470,37 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+def warm_up(disease, version):
+    """Run a dummy record and batch through validation, the model and response encoding
+
+    The first call of each code path is much slower than later ones; paying for
+    it here keeps it off the first real patient request.
+    """
+    validator = validators[disease]
+    record = {field.name: field.min or 0 for field in DISEASES[disease].fields}
+    input_data, _ = validator.extract(record)
+    version.predict(input_data)
+    predictions, confidences = version.predict(np.repeat(input_data, 8, axis=0))
+    for media_type in MEDIA_TYPES:
+        encode({'results': fragments[disease].batch(8, range(8), predictions, confidences, {}, media_type)}, media_type)
+
+# With PRELOAD_MODELS=1 every model is loaded and warmed at import. Under
+# gunicorn --preload (see gunicorn.conf.py) that happens once in the master,
+# and the forked workers share the loaded pages copy-on-write.
+startup = {'preloaded': False, 'initSeconds': None, 'warmupSeconds': None}
+if os.environ.get('PRELOAD_MODELS', '0') == '1':
+    warmup_started = time.perf_counter()
+    if not registry.preload(warm_up):
+        logger.warning(f"Preloaded with missing models: {registry.status()}")
+    startup['preloaded'] = True
+    startup['warmupSeconds'] = time.perf_counter() - warmup_started
+    logger.info(f"Preloaded and warmed {len(DISEASES)} models in {startup['warmupSeconds'] * 1000:.1f} ms")
+startup['initSeconds'] = time.perf_counter() - _init_started
+
 if __name__ == '__main__':
     # Check if models are loaded
-    if diabetes_model is None:
-        logger.warning("Diabetes model not loaded")
-    if heart_model is None:
-        logger.warning("Heart disease model not loaded")
-    if parkinsons_model is None:
-        logger.warning("Parkinson's disease model not loaded")
+    for disease in DISEASES:
+        if registry.get(disease) is None:
+            logger.warning(f"{disease} model not loaded")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
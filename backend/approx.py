@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixed-cost stand-ins for non-linear kernel SVMs
+An explicit feature map (Nystroem landmarks or random Fourier features) followed
+by a linear layer, fitted by kernel_approx.py to reproduce a kernel SVC's
+decision values. Prediction costs O(components x features) per row whatever the
+number of support vectors, and needs only numpy.
+"""
+
+import numpy as np
+from kernels import kernel_matrix
+
+class ApproximateKernelModel:
+    """Explicit kernel feature map plus linear layer with the SVC prediction interface
+
+    For 'nystroem', basis holds the landmark rows and the decision value is
+    K(x, landmarks) . weights + bias, with the Nystroem normalization already
+    folded into weights. For 'rff', basis holds the random projection and
+    offsets the random phases, and the decision value is
+    cos(x . basis + offsets) . weights + bias.
+    """
+
+    def __init__(self, method, kernel, kernel_params, basis, weights, bias, classes, offsets=None, source=None):
+        if method not in ('nystroem', 'rff'):
+            raise ValueError(f'Unknown approximation method: {method}')
+        self.method = method
+        self.kernel = kernel
+        self.kernel_params = dict(kernel_params)
+        self.basis = np.ascontiguousarray(basis, dtype=np.float64)
+        self.offsets = None if offsets is None else np.ascontiguousarray(offsets, dtype=np.float64)
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.classes_ = np.asarray(classes)
+        self.source = source or {}
+
+    @property
+    def n_components(self):
+        return self.weights.shape[0]
+
+    @property
+    def n_features_in_(self):
+        return self.basis.shape[1] if self.method == 'nystroem' else self.basis.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.basis.nbytes + self.weights.nbytes + (self.offsets.nbytes if self.offsets is not None else 0)
+
+    def transform(self, X):
+        """The explicit feature map of each row, before the linear layer"""
+        X = np.asarray(X, dtype=np.float64)
+        if self.method == 'nystroem':
+            return kernel_matrix(X, self.basis, self.kernel, **self.kernel_params)
+        return np.cos(X @ self.basis + self.offsets)
+
+    def decision_function(self, X):
+        return self.transform(X) @ self.weights + self.bias
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact model artifacts for the prediction API
+One memory-mappable file per disease holding the scaler and linear SVM parameters
+
+File layout:
+    8 bytes   magic b'DPMODEL\\0'
+    4 bytes   format version (little-endian uint32)
+    4 bytes   header length (little-endian uint32)
+    N bytes   JSON header (features, classes, calibration, array offsets, metadata)
+    padding   up to a 64-byte boundary
+    data      little-endian float64 arrays, each 64-byte aligned
+"""
+
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+from datetime import datetime, timezone
+
+MAGIC = b'DPMODEL\0'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+ARTIFACT_SUFFIX = '.artifact'
+
+def content_version(*chunks):
+    """Short content hash identifying a model version"""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def file_version(*paths):
+    """Content hash of the given files, read in order"""
+    chunks = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            chunks.append(f.read())
+    return content_version(*chunks)
+
+def file_stats(*paths):
+    """(mtime_ns, size) of the given files, a cheap check that they are unchanged"""
+    return [[st.st_mtime_ns, st.st_size] for st in map(os.stat, paths)]
+
+def artifact_path(model_dir, disease):
+    return os.path.join(model_dir, f'{disease}{ARTIFACT_SUFFIX}')
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def export_artifact(path, disease, model, scaler, calibrator=None, source_paths=None, metadata=None):
+    """Write a fitted StandardScaler + linear SVC pair and its calibrator as a compact artifact"""
+    from fused import FusedLinearModel, verify_equivalence
+
+    fused = FusedLinearModel.from_sklearn(model, scaler)
+    if not verify_equivalence(fused, model, scaler):
+        raise ValueError(f'Fused {disease} model does not match the sklearn pipeline')
+
+    arrays = {
+        'mean': np.asarray(scaler.mean_, dtype='<f8'),
+        'scale': np.asarray(scaler.scale_, dtype='<f8'),
+        'coef': np.asarray(model.coef_, dtype='<f8').ravel(),
+        'intercept': np.asarray(model.intercept_, dtype='<f8').ravel(),
+        'weights': fused.weights.astype('<f8'),
+        'bias': np.array([fused.bias], dtype='<f8')
+    }
+
+    columns = getattr(scaler, 'feature_names_in_', None)
+    header = {
+        'disease': disease,
+        'n_features': int(fused.n_features),
+        'columns': [str(c) for c in columns] if columns is not None else None,
+        'classes': [c.item() if hasattr(c, 'item') else c for c in model.classes_],
+        'kernel': getattr(model, 'kernel', 'linear'),
+        'calibration': calibrator.to_dict() if calibrator is not None else None,
+        'source_version': file_version(*source_paths) if source_paths else None,
+        'source_stats': file_stats(*source_paths) if source_paths else None,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'metadata': metadata or {},
+        'arrays': {}
+    }
+
+    # Lay the arrays out back to back, each on an aligned offset from the data start
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'offset': offset, 'shape': list(array.shape)}
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(len(MAGIC) + 8 + len(header_bytes))
+
+    # Write to a temporary file and rename so readers never see a partial artifact
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + header['arrays'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+    return header
+
+def read_header(path):
+    """Read the JSON header and data offset of an artifact"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a model artifact')
+        version, header_length = struct.unpack('<II', f.read(8))
+        if version != FORMAT_VERSION:
+            raise ValueError(f'Unsupported artifact format version {version}')
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    header['data_offset'] = _align(len(MAGIC) + 8 + header_length)
+    return header
+
+def load_artifact(path):
+    """Memory-map an artifact, returning its header and read-only arrays"""
+    header = read_header(path)
+    size = os.path.getsize(path) - header['data_offset']
+    buffer = np.memmap(path, dtype=np.uint8, mode='r', offset=header['data_offset'], shape=(size,))
+
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        count = int(np.prod(spec['shape']))
+        arrays[name] = np.frombuffer(buffer, dtype='<f8', count=count, offset=spec['offset']).reshape(spec['shape'])
+
+    return header, arrays
+
+def main(argv=None):
+    """Export the pickled models in a directory as compact artifacts"""
+    import pickle
+
+    parser = argparse.ArgumentParser(description='Export pickled models as memory-mappable artifacts')
+    parser.add_argument('diseases', nargs='*', default=['diabetes', 'heart', 'parkinsons'])
+    parser.add_argument('--model-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+
+    for disease in args.diseases:
+        model_path = os.path.join(args.model_dir, f'{disease}_model.sav')
+        scaler_path = os.path.join(args.model_dir, f'{disease}_scaler.sav')
+        calibrator_path = os.path.join(args.model_dir, f'{disease}_calibrator.sav')
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+
+        source_paths = [model_path, scaler_path]
+        calibrator = None
+        if os.path.exists(calibrator_path):
+            with open(calibrator_path, 'rb') as f:
+                calibrator = pickle.load(f)
+            source_paths.append(calibrator_path)
+
+        path = artifact_path(args.model_dir, disease)
+        header = export_artifact(path, disease, model, scaler, calibrator=calibrator, source_paths=source_paths)
+        print(f"Wrote {path} (version {header['source_version']}, {os.path.getsize(path)} bytes)")
+
+if __name__ == '__main__':
+    sys.exit(main())
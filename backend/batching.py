@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request micro-batching for the prediction API
+Coalesces concurrent single-record requests into one model call
+"""
+
+import numpy as np
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """Collects concurrent rows for a short window and predicts them together"""
+
+    def __init__(self, name, predict_fn, window_ms=2.0, max_batch=64):
+        self.name = name
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+
+        # Batch size histogram buckets: 1, 2, 4, ... up to max_batch
+        self.buckets = []
+        bucket = 1
+        while bucket < max_batch:
+            self.buckets.append(bucket)
+            bucket *= 2
+        self.buckets.append(max_batch)
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._sizes = Histogram(self.buckets)
+
+    def _ensure_worker(self):
+        """Start the worker thread, restarting it in forked children"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._reset_stats()
+            self._thread = threading.Thread(target=self._run, name=f'microbatch-{self.name}', daemon=True)
+            self._thread.start()
+
+    def submit(self, row, model):
+        """Queue one feature row and block until model's (prediction, confidence) for it is ready"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, model, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch):
+        # Each row is predicted by the model its request resolved, so a reload inside the
+        # window splits the batch instead of answering with a version the caller never saw
+        by_model = {}
+        for item in batch:
+            by_model.setdefault(id(item[1]), []).append(item)
+        for items in by_model.values():
+            self._predict(items[0][1], items)
+        self._sizes.observe(len(batch))
+
+    def _predict(self, model, items):
+        rows = np.vstack([row for row, _, _ in items])
+        try:
+            predictions, confidences = self.predict_fn(model, rows)
+        except Exception as e:
+            logger.error(f"Micro-batch prediction failed for {self.name}: {e}")
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), prediction, confidence in zip(items, predictions.tolist(), confidences.tolist()):
+            future.set_result((prediction, confidence))
+
+    def histogram(self):
+        """Return the histogram of realized batch sizes"""
+        return self._sizes
+
+    def stats(self):
+        """Return configuration and realized batch size statistics"""
+        sizes = self._sizes
+        return {
+            'windowMs': self.window * 1000.0,
+            'maxBatch': self.max_batch,
+            'requests': int(sizes.sum),
+            'batches': sizes.count,
+            'meanBatchSize': sizes.sum / sizes.count if sizes.count else 0.0,
+            'batchSizeHistogram': {
+                str(bucket): count for bucket, count in zip(self.buckets, sizes.counts)
+            }
+        }
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary feature matrices for the batch routes
+A batch can be sent as a little-endian float64 .npy array, or as an Arrow IPC
+stream with one float64 column per feature in the disease's order. Either is
+read into numpy without a Python object per value: the .npy body is wrapped
+by np.frombuffer as it is, and each Arrow column is copied into the matrix in
+one step. Results are written back in the same formats
+"""
+
+import importlib.util
+import io
+
+import numpy as np
+from risk import RISK_LEVELS, risk_level_codes
+from serialization import Encoded
+
+NPY = 'application/x-npy'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+# Arrow needs pyarrow, which is imported on first use to keep it out of startup
+BINARY_TYPES = (NPY, ARROW) if importlib.util.find_spec('pyarrow') is not None else (NPY,)
+
+FEATURE_DTYPE = np.dtype('<f8')
+
+# One row per record; invalid records have prediction -1, confidence NaN and an empty risk level
+RESULT_DTYPE = np.dtype([('prediction', '<i1'), ('confidence', '<f8'), ('riskLevel', '<U6')])
+
+_NPY_HEADER_READERS = {
+    (1, 0): np.lib.format.read_array_header_1_0,
+    (2, 0): np.lib.format.read_array_header_2_0
+}
+
+class BatchTooLarge(ValueError):
+    """A binary batch with more rows than the route accepts"""
+
+def read_npy(body, n_features, max_rows):
+    """A (rows, n_features) float64 view of an .npy body, checked against its header"""
+    stream = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(stream)
+        if version not in _NPY_HEADER_READERS:
+            raise ValueError(f'unsupported format version {version[0]}.{version[1]}')
+        shape, fortran_order, dtype = _NPY_HEADER_READERS[version](stream)
+    except ValueError as e:
+        raise ValueError(f'Invalid .npy body: {e}')
+
+    if dtype != FEATURE_DTYPE:
+        raise ValueError(f'Array dtype must be little-endian float64 (<f8), not {dtype.str}')
+    if len(shape) != 2 or shape[1] != n_features:
+        raise ValueError(f'Array shape must be (rows, {n_features}), not {shape}')
+    if not shape[0]:
+        raise ValueError('Array has no rows')
+    if shape[0] > max_rows:
+        raise BatchTooLarge(f'Batch size exceeds the limit of {max_rows} records')
+    offset = stream.tell()
+    if len(body) - offset != shape[0] * shape[1] * FEATURE_DTYPE.itemsize:
+        raise ValueError(f'Array data is {len(body) - offset} bytes; shape {shape} needs {shape[0] * shape[1] * 8}')
+
+    data = np.frombuffer(body, dtype=FEATURE_DTYPE, count=shape[0] * shape[1], offset=offset)
+    # A Fortran-ordered array is its transpose's data, so it is viewed rather than copied too
+    return data.reshape(shape[::-1]).T if fortran_order else data.reshape(shape)
+
+def read_arrow(body, column_orders, max_rows):
+    """A (rows, features) float64 matrix from an Arrow IPC stream
+
+    The stream's columns must be float64 without nulls and named as one of
+    column_orders, in that order.
+    """
+    import pyarrow as pa
+
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f'Invalid Arrow IPC stream: {e}')
+
+    names = table.schema.names
+    if not any(names == list(order) for order in column_orders):
+        raise ValueError(f"Arrow columns must be {', '.join(column_orders[0])} in that order")
+    for field, column in zip(table.schema, table.columns):
+        if field.type != pa.float64():
+            raise ValueError(f'Column {field.name} must be float64, not {field.type}')
+        if column.null_count:
+            raise ValueError(f'Column {field.name} has {column.null_count} null values')
+    if not table.num_rows:
+        raise ValueError('Arrow stream has no rows')
+    if table.num_rows > max_rows:
+        raise BatchTooLarge(f'Batch size exceeds the limit of {max_rows} records')
+
+    # Column-major, so each column lands in one contiguous copy
+    matrix = np.empty((table.num_rows, len(names)), dtype=np.float64, order='F')
+    for position, column in enumerate(table.columns):
+        start = 0
+        for chunk in column.chunks:
+            matrix[start:start + len(chunk), position] = chunk.to_numpy(zero_copy_only=True)
+            start += len(chunk)
+    return matrix
+
+def read_matrix(media_type, body, spec, max_rows):
+    """The feature matrix of a binary batch body for a disease spec"""
+    if media_type == NPY:
+        return read_npy(body, len(spec.fields), max_rows)
+    return read_arrow(body, (spec.field_names, spec.columns), max_rows)
+
+def _result_columns(count, valid_rows, predictions, confidences):
+    """Predictions, confidences and risk level codes for every row, -1/NaN/-1 for invalid ones"""
+    all_predictions = np.full(count, -1, dtype=np.int8)
+    all_confidences = np.full(count, np.nan)
+    codes = np.full(count, -1, dtype=np.int8)
+    if len(valid_rows):
+        if isinstance(valid_rows, range):
+            rows = slice(valid_rows.start, valid_rows.stop, valid_rows.step)
+        else:
+            rows = np.asarray(valid_rows, dtype=np.intp)
+        all_predictions[rows] = predictions
+        all_confidences[rows] = confidences
+        codes[rows] = risk_level_codes(predictions, confidences)
+    return all_predictions, all_confidences, codes
+
+def write_npy(count, valid_rows, predictions, confidences):
+    """Results as an .npy array of RESULT_DTYPE records"""
+    all_predictions, all_confidences, codes = _result_columns(count, valid_rows, predictions, confidences)
+    results = np.zeros(count, dtype=RESULT_DTYPE)
+    results['prediction'] = all_predictions
+    results['confidence'] = all_confidences
+    results['riskLevel'] = np.array(RISK_LEVELS + ('',))[codes]
+    buffer = io.BytesIO()
+    np.lib.format.write_array(buffer, results, allow_pickle=False)
+    return buffer.getvalue()
+
+def write_arrow(messages, count, valid_rows, predictions, confidences, errors):
+    """Results as an Arrow IPC stream, with nulls and an error message for invalid rows"""
+    import pyarrow as pa
+
+    all_predictions, all_confidences, codes = _result_columns(count, valid_rows, predictions, confidences)
+    invalid = codes < 0
+    error_column = pa.nulls(count, pa.string())
+    if errors:
+        error_messages = [None] * count
+        for index, message in errors.items():
+            error_messages[index] = message
+        error_column = pa.array(error_messages, type=pa.string())
+
+    table = pa.table({
+        'prediction': pa.array(all_predictions, mask=invalid),
+        'confidence': pa.array(all_confidences, mask=invalid),
+        'message': pa.DictionaryArray.from_arrays(pa.array(all_predictions, mask=invalid), messages),
+        'riskLevel': pa.DictionaryArray.from_arrays(pa.array(codes, mask=invalid), list(RISK_LEVELS)),
+        'error': error_column
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def write_results(media_type, messages, count, valid_rows, predictions, confidences, errors):
+    """A batch's results encoded as media_type; errors maps row indices to messages"""
+    if media_type == NPY:
+        return Encoded(write_npy(count, valid_rows, predictions, confidences))
+    return Encoded(write_arrow(list(messages), count, valid_rows, predictions, confidences, errors))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prediction cache for the prediction API
+Bounded LRU cache of results keyed on disease, model version and feature vector
+"""
+
+import numpy as np
+import threading
+import time
+from collections import OrderedDict
+
+class PredictionCache:
+    """Thread-safe LRU cache with a TTL and per-disease hit metrics"""
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def _count(self, disease, counter, amount=1):
+        counters = self._counters.setdefault(disease, {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0
+        })
+        counters[counter] += amount
+
+    @staticmethod
+    def _canonical(row):
+        # Same values must give the same key whatever the input types were;
+        # adding 0.0 turns -0.0 into 0.0
+        return (np.asarray(row, dtype=np.float64) + 0.0).tobytes()
+
+    def _invalidate(self, disease, version):
+        """Drop a disease's entries when its model version changes to free their space"""
+        if self._versions.get(disease) == version:
+            return
+        stale = [key for key in self._entries if key[0] == disease]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            self._count(disease, 'invalidations', len(stale))
+        self._versions[disease] = version
+
+    def get(self, disease, version, row):
+        """Return the cached result for a feature row, or None"""
+        key = (disease, version, self._canonical(row))
+        now = time.monotonic()
+        with self._lock:
+            self._invalidate(disease, version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self._count(disease, 'misses')
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._count(disease, 'expirations')
+                self._count(disease, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count(disease, 'hits')
+            return value
+
+    def put(self, disease, version, row, value):
+        """Store a result, evicting the least recently used entry when full"""
+        key = (disease, version, self._canonical(row))
+        with self._lock:
+            self._invalidate(disease, version)
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._count(evicted_key[0], 'evictions')
+
+    def stats(self):
+        """Return size, configuration and per-disease counters"""
+        with self._lock:
+            sizes = {}
+            for disease, _, _ in self._entries:
+                sizes[disease] = sizes.get(disease, 0) + 1
+            diseases = {}
+            for disease, counters in self._counters.items():
+                lookups = counters['hits'] + counters['misses']
+                diseases[disease] = dict(
+                    counters,
+                    size=sizes.get(disease, 0),
+                    hitRate=counters['hits'] / lookups if lookups else 0.0
+                )
+            return {
+                'maxSize': self.max_size,
+                'ttlSeconds': self.ttl,
+                'size': len(self._entries),
+                'diseases': diseases
+            }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Confidence calibration for the SVM models
+Maps a decision_function value to a probability without probability=True
+"""
+
+import numpy as np
+import argparse
+import os
+import pickle
+import sys
+
+class Calibrator:
+    """Platt or isotonic mapping from decision values to P(class 1)"""
+
+    def __init__(self, method, a=None, b=None, x=None, y=None):
+        self.method = method
+        self.a = a
+        self.b = b
+        self.x = None if x is None else np.asarray(x, dtype=np.float64)
+        self.y = None if y is None else np.asarray(y, dtype=np.float64)
+
+    def predict_proba(self, decision):
+        """Probability of the positive class for each decision value"""
+        if self.method == 'platt':
+            return 1.0 / (1.0 + np.exp(-(self.a * decision + self.b)))
+        return np.interp(decision, self.x, self.y)
+
+    def confidence(self, decision):
+        """Probability of the predicted class, which is positive when decision > 0"""
+        proba = self.predict_proba(decision)
+        return np.where(decision > 0, proba, 1.0 - proba)
+
+    def to_dict(self):
+        if self.method == 'platt':
+            return {'method': 'platt', 'a': self.a, 'b': self.b}
+        return {'method': 'isotonic', 'x': self.x.tolist(), 'y': self.y.tolist()}
+
+    @classmethod
+    def from_dict(cls, params):
+        return cls(**params)
+
+def fit_calibrator(decision, y, method='platt'):
+    """Fit a calibrator on held-out decision values and their true labels"""
+    decision = np.asarray(decision, dtype=np.float64).ravel()
+    y = np.asarray(y).ravel()
+
+    if method == 'platt':
+        from sklearn.linear_model import LogisticRegression
+
+        regression = LogisticRegression(C=1e6)
+        regression.fit(decision.reshape(-1, 1), y)
+        return Calibrator('platt', a=float(regression.coef_[0, 0]), b=float(regression.intercept_[0]))
+
+    if method == 'isotonic':
+        from sklearn.isotonic import IsotonicRegression
+
+        regression = IsotonicRegression(out_of_bounds='clip', y_min=0.0, y_max=1.0)
+        regression.fit(decision, y)
+        return Calibrator('isotonic', x=regression.X_thresholds_, y=regression.y_thresholds_)
+
+    raise ValueError(f'Unknown calibration method: {method}')
+
+def calibrate_model(model, X, y, method='platt', cv=5):
+    """Fit a calibrator on out-of-fold decision values of a copy of the model"""
+    from sklearn.base import clone
+    from sklearn.model_selection import cross_val_predict
+
+    decision = cross_val_predict(clone(model), X, y, cv=cv, method='decision_function')
+    return fit_calibrator(decision, y, method)
+
+def main(argv=None):
+    """Fit calibrators for already trained models from their dataset"""
+    import pandas as pd
+    from artifacts import artifact_path, export_artifact
+
+    parser = argparse.ArgumentParser(description='Fit confidence calibrators for trained models')
+    parser.add_argument('disease', choices=['diabetes', 'heart', 'parkinsons'])
+    parser.add_argument('dataset', help='CSV the model was trained on')
+    parser.add_argument('--label', required=True, help='Label column')
+    parser.add_argument('--drop', nargs='*', default=[], help='Extra non-feature columns')
+    parser.add_argument('--method', choices=['platt', 'isotonic'], default='platt')
+    parser.add_argument('--model-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    args = parser.parse_args(argv)
+
+    model_path = os.path.join(args.model_dir, f'{args.disease}_model.sav')
+    scaler_path = os.path.join(args.model_dir, f'{args.disease}_scaler.sav')
+    calibrator_path = os.path.join(args.model_dir, f'{args.disease}_calibrator.sav')
+    with open(model_path, 'rb') as f:
+        model = pickle.load(f)
+    with open(scaler_path, 'rb') as f:
+        scaler = pickle.load(f)
+
+    dataset = pd.read_csv(args.dataset)
+    X = scaler.transform(dataset.drop(columns=[args.label] + args.drop))
+    y = dataset[args.label].to_numpy()
+
+    # Go through the module so the pickle refers to calibration.Calibrator, not __main__
+    import calibration
+    calibrator = calibration.calibrate_model(model, X, y, args.method)
+    with open(calibrator_path, 'wb') as f:
+        pickle.dump(calibrator, f)
+    print(f"Wrote {calibrator_path} ({calibrator.to_dict()})")
+
+    path = artifact_path(args.model_dir, args.disease)
+    export_artifact(path, args.disease, model, scaler, calibrator=calibrator,
+                    source_paths=[model_path, scaler_path, calibrator_path])
+    print(f"Wrote {path}")
+
+if __name__ == '__main__':
+    sys.exit(main())
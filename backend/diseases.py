@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disease specifications served by the prediction API
+Fields are listed in the feature order the models were trained on
+"""
+
+from schema import DiseaseSpec, Field
+
+DIABETES = DiseaseSpec(
+    name='diabetes',
+    title='Diabetes',
+    fields=[
+        Field('pregnancies', 'Pregnancies', 'Pregnancies', int, min=0),
+        Field('glucose', 'Glucose', 'Glucose level', min=0),
+        Field('bloodPressure', 'BloodPressure', 'Blood pressure', min=0),
+        Field('skinThickness', 'SkinThickness', 'Skin thickness', min=0),
+        Field('insulin', 'Insulin', 'Insulin level', min=0),
+        Field('bmi', 'BMI', 'BMI', min=0),
+        Field('diabetesPedigreeFunction', 'DiabetesPedigreeFunction', 'Diabetes pedigree function', min=0),
+        Field('age', 'Age', 'Age', int, min=0, max=130)
+    ],
+    messages=(
+        "The person is not diabetic. Continue maintaining a healthy lifestyle.",
+        "The person is diabetic. Please consult with a healthcare professional for proper management."
+    ),
+    dataset='diabetes.csv',
+    label='Outcome'
+)
+
+HEART = DiseaseSpec(
+    name='heart',
+    title='Heart disease',
+    fields=[
+        Field('age', 'age', 'Age', int, min=0, max=130),
+        Field('sex', 'sex', 'Sex', int, min=0, max=1),
+        Field('cp', 'cp', 'Chest pain type', int, min=0, max=3),
+        Field('trestbps', 'trestbps', 'Resting blood pressure', min=0),
+        Field('chol', 'chol', 'Cholesterol', min=0),
+        Field('fbs', 'fbs', 'Fasting blood sugar', int, min=0, max=1),
+        Field('restecg', 'restecg', 'Resting ECG', int, min=0, max=2),
+        Field('thalach', 'thalach', 'Max heart rate', min=0),
+        Field('exang', 'exang', 'Exercise induced angina', int, min=0, max=1),
+        Field('oldpeak', 'oldpeak', 'ST depression', min=0),
+        Field('slope', 'slope', 'Slope', int, min=0, max=2),
+        Field('ca', 'ca', 'Number of major vessels', int, min=0, max=4),
+        Field('thal', 'thal', 'Thalassemia', int, min=0, max=3)
+    ],
+    messages=(
+        "The person does not have heart disease. Continue maintaining cardiovascular health.",
+        "The person has heart disease. Please consult with a cardiologist for proper evaluation and treatment."
+    ),
+    dataset='heart.csv',
+    label='target'
+)
+
+PARKINSONS = DiseaseSpec(
+    name='parkinsons',
+    title="Parkinson's disease",
+    fields=[
+        Field('mdvpFo', 'MDVP:Fo(Hz)', 'MDVP:Fo(Hz)', min=0),
+        Field('mdvpFhi', 'MDVP:Fhi(Hz)', 'MDVP:Fhi(Hz)', min=0),
+        Field('mdvpFlo', 'MDVP:Flo(Hz)', 'MDVP:Flo(Hz)', min=0),
+        Field('mdvpJitter', 'MDVP:Jitter(%)', 'MDVP:Jitter(%)', min=0),
+        Field('mdvpJitterAbs', 'MDVP:Jitter(Abs)', 'MDVP:Jitter(Abs)', min=0),
+        Field('mdvpRap', 'MDVP:RAP', 'MDVP:RAP', min=0),
+        Field('mdvpPpq', 'MDVP:PPQ', 'MDVP:PPQ', min=0),
+        Field('jitterDdp', 'Jitter:DDP', 'Jitter:DDP', min=0),
+        Field('mdvpShimmer', 'MDVP:Shimmer', 'MDVP:Shimmer', min=0),
+        Field('mdvpShimmerDb', 'MDVP:Shimmer(dB)', 'MDVP:Shimmer(dB)', min=0),
+        Field('shimmerApq3', 'Shimmer:APQ3', 'Shimmer:APQ3', min=0),
+        Field('shimmerApq5', 'Shimmer:APQ5', 'Shimmer:APQ5', min=0),
+        Field('mdvpApq', 'MDVP:APQ', 'MDVP:APQ', min=0),
+        Field('shimmerDda', 'Shimmer:DDA', 'Shimmer:DDA', min=0),
+        Field('nhr', 'NHR', 'NHR', min=0),
+        Field('hnr', 'HNR', 'HNR', min=0),
+        Field('rpde', 'RPDE', 'RPDE', min=0),
+        Field('dfa', 'DFA', 'DFA', min=0),
+        Field('spread1', 'spread1', 'Spread1'),
+        Field('spread2', 'spread2', 'Spread2'),
+        Field('d2', 'D2', 'D2', min=0),
+        Field('ppe', 'PPE', 'PPE', min=0)
+    ],
+    messages=(
+        "The person does not have Parkinson's disease. Continue monitoring neurological health.",
+        "The person has Parkinson's disease. Please consult with a neurologist for proper evaluation and treatment."
+    ),
+    dataset='parkinsons.csv',
+    label='status',
+    ignore=['name']
+)
+
+# Every disease served by the API, keyed by the name used in routes
+DISEASES = {spec.name: spec for spec in (DIABETES, HEART, PARKINSONS)}
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fused inference for linear SVM models
+Folds a StandardScaler and a linear SVC into one weight vector and bias
+"""
+
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+class FusedLinearModel:
+    """Scaler + linear SVC compiled into a single dot product"""
+
+    def __init__(self, weights, bias, classes):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.classes = np.asarray(classes)
+        self.n_features = self.weights.shape[0]
+
+    @classmethod
+    def from_sklearn(cls, model, scaler):
+        """Compile a fitted StandardScaler and linear SVC into fused form
+
+        Linear models without a kernel, such as the SGD models written by
+        online updates, fuse the same way.
+        """
+        kernel = getattr(model, 'kernel', 'linear')
+        if kernel != 'linear':
+            raise ValueError(f"Only linear kernels can be fused, got {kernel!r}")
+        if len(model.classes_) != 2:
+            raise ValueError('Only binary classifiers can be fused')
+
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        intercept = float(np.ravel(model.intercept_)[0])
+
+        # decision(x) = coef . (x - mean) / scale + intercept
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros_like(coef)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones_like(coef)
+        weights = coef / scale
+        bias = intercept - np.dot(weights, mean)
+
+        return cls(weights, bias, model.classes_)
+
+    def decision_function(self, X):
+        """Signed distance to the separating hyperplane for each row"""
+        return np.dot(X, self.weights) + self.bias
+
+    def predict(self, X):
+        """Predict class labels for each row"""
+        return self.classes[(self.decision_function(X) > 0).astype(np.intp)]
+
+def verify_equivalence(fused, model, scaler, n_samples=256, seed=0, atol=1e-8):
+    """Check that the fused model matches the sklearn scaler + model pipeline"""
+    rng = np.random.default_rng(seed)
+    n_features = fused.n_features
+
+    # Sample around the training distribution in the original feature space
+    mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+    X = mean + scale * rng.normal(scale=2.0, size=(n_samples, n_features))
+
+    X_scaled = scaler.transform(X)
+    expected_decision = model.decision_function(X_scaled)
+    fused_decision = fused.decision_function(X)
+
+    if not np.allclose(fused_decision, expected_decision, rtol=1e-6, atol=atol):
+        max_error = float(np.max(np.abs(fused_decision - expected_decision)))
+        logger.error(f"Fused decision values differ from sklearn (max abs error {max_error:.3g})")
+        return False
+
+    # Rows sitting on the hyperplane may legitimately flip, so ignore them
+    decisive = np.abs(expected_decision) > atol
+    if not np.array_equal(fused.predict(X)[decisive], model.predict(X_scaled)[decisive]):
+        logger.error("Fused predictions differ from sklearn")
+        return False
+
+    return True
+
+def compile_fused_model(model, scaler):
+    """Compile and verify a fused model, returning None if sklearn must be used"""
+    if model is None or scaler is None:
+        return None
+
+    try:
+        fused = FusedLinearModel.from_sklearn(model, scaler)
+    except (ValueError, AttributeError) as e:
+        logger.info(f"Using sklearn inference: {e}")
+        return None
+
+    if not verify_equivalence(fused, model, scaler):
+        logger.warning("Fused model failed the equivalence check, falling back to sklearn")
+        return None
+
+    return fused
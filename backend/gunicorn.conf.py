@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn configuration for the prediction API
+The master imports the app, loading and warming every model, before forking
+the workers, so they start ready to serve and share the model pages
+copy-on-write. Startup-to-ready time and each worker's memory are logged.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import gc
+import os
+import time
+
+from metrics import process_memory
+
+_started = time.perf_counter()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+
+# Import the app, and with it the models, once in the master. Without
+# preloading each worker loads and warms its own copy before serving.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+os.environ.setdefault('PRELOAD_MODELS', '1')
+
+def _mb(value):
+    return f'{value / 2 ** 20:.1f} MB' if value is not None else 'n/a'
+
+def when_ready(server):
+    memory = process_memory()
+    server.log.info(f"Master ready in {time.perf_counter() - _started:.2f}s "
+                    f"(preload {'on' if preload_app else 'off'}), RSS {_mb(memory['rss'])}")
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach, so garbage
+    # collections in the workers do not write to, and un-share, those pages
+    gc.freeze()
+
+def post_worker_init(worker):
+    memory = process_memory()
+    worker.log.info(f"Worker {worker.pid} ready {time.perf_counter() - _started:.2f}s after master start, "
+                    f"RSS {_mb(memory['rss'])}, PSS {_mb(memory['pss'])}, shared {_mb(memory['shared'])}")
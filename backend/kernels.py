@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kernel functions of the libsvm SVMs in plain numpy
+Shared by the Gram matrix cache and the kernel model approximations
+"""
+
+import numpy as np
+
+def kernel_matrix(X, Y=None, kernel='rbf', gamma=1.0, degree=3, coef0=0.0):
+    """K(X, Y) for the libsvm kernels, with a numeric gamma"""
+    Y = X if Y is None else Y
+    product = X @ Y.T
+    if kernel == 'linear':
+        return product
+    if kernel == 'poly':
+        return (gamma * product + coef0) ** degree
+    if kernel == 'sigmoid':
+        return np.tanh(gamma * product + coef0)
+    if kernel == 'rbf':
+        squared = np.einsum('ij,ij->i', X, X)[:, None] + np.einsum('ij,ij->i', Y, Y)[None, :] - 2.0 * product
+        np.maximum(squared, 0.0, out=squared)
+        return np.exp(-gamma * squared)
+    raise ValueError(f'Unknown kernel: {kernel}')
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request metrics for the prediction API
+Per-disease counters and per-stage latency histograms in Prometheus text format
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Latency buckets in seconds, from 10 us (a fused prediction) up to slow requests
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+class StageTimer:
+    """Records the time spent in consecutive stages of one request
+
+    Prediction requests are split into parse, extract, scale, predict,
+    predict_proba and serialize stages.
+    """
+
+    __slots__ = ('start', 'last', 'stages')
+
+    def __init__(self):
+        self.start = self.last = time.perf_counter()
+        self.stages = []
+
+    def mark(self, stage):
+        """Close the current stage, attributing the time since the last mark to it"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum and count"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    return '{' + pairs + '}'
+
+def format_metric(name, metric_type, help_text, samples):
+    """Render one metric family from (labels, value) samples"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} {metric_type}']
+    for labels, value in samples:
+        lines.append(f'{name}{_format_labels(labels)} {value}')
+    return lines
+
+def format_histogram(name, help_text, histograms):
+    """Render a histogram family from (labels, Histogram) pairs"""
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for labels, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(dict(labels, le=repr(float(bound))))} {cumulative}')
+        lines.append(f'{name}_bucket{_format_labels(dict(labels, le="+Inf"))} {histogram.count}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum}')
+        lines.append(f'{name}_count{_format_labels(labels)} {histogram.count}')
+    return lines
+
+class RequestMetrics:
+    """Request counts, error counts and latency histograms per disease and route"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._errors = {}
+        self._latency = {}
+        self._stages = {}
+
+    def observe(self, disease, route, timer, status):
+        """Record one finished request and the stage timings it collected"""
+        key = (disease, route)
+        elapsed = timer.elapsed()
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 400:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = Histogram(self.buckets)
+            latency.observe(elapsed)
+
+            for stage, seconds in timer.stages:
+                stage_key = (disease, route, stage)
+                histogram = self._stages.get(stage_key)
+                if histogram is None:
+                    histogram = self._stages[stage_key] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def render(self):
+        """Return the metrics as Prometheus text exposition lines"""
+        with self._lock:
+            lines = format_metric(
+                'prediction_requests_total', 'counter', 'Prediction requests handled',
+                [({'disease': d, 'route': r}, v) for (d, r), v in sorted(self._requests.items())]
+            )
+            lines += format_metric(
+                'prediction_errors_total', 'counter', 'Prediction requests answered with an error status',
+                [({'disease': d, 'route': r}, v) for (d, r), v in sorted(self._errors.items())]
+            )
+            lines += format_histogram(
+                'prediction_request_duration_seconds', 'End-to-end prediction request latency',
+                [({'disease': d, 'route': r}, h) for (d, r), h in sorted(self._latency.items())]
+            )
+            lines += format_histogram(
+                'prediction_stage_duration_seconds', 'Latency of each prediction request stage',
+                [({'disease': d, 'route': r, 'stage': s}, h) for (d, r, s), h in sorted(self._stages.items())]
+            )
+        return lines
+
+def process_memory(pid='self'):
+    """Resident, proportional and shared memory of a process in bytes
+
+    Pss splits pages shared with other processes, such as copy-on-write pages
+    inherited from a preloading master, between them, so the Pss of every
+    worker adds up to the memory they really use. Linux only; elsewhere only
+    the peak resident size of this process is known.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            # Skip the address range header, keep the "Name:   123 kB" lines
+            kb = {
+                key: int(value.split()[0])
+                for key, _, value in (line.partition(':') for line in f) if value.strip().endswith('kB')
+            }
+        return {
+            'rss': kb['Rss'] * 1024,
+            'pss': kb['Pss'] * 1024,
+            'shared': (kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)) * 1024
+        }
+    except (OSError, KeyError, ValueError):
+        if pid != 'self':
+            return None
+        import resource
+
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, 'pss': None, 'shared': None}
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Online updates of the linear models from clinician feedback
+Confirmed outcomes are appended to a per-disease log shared by every worker.
+One process at a time, holding a file lock, runs the learner: it applies new
+feedback with hinge-loss SGD, starting from the served model's weights, and
+periodically writes the result, calibrated on held-out feedback, as a new
+numbered snapshot that every worker's registry hot-reloads. The shipped model files are never modified; deleting
+the newest snapshot rolls back to the previous one, or to the shipped model
+
+Feedback directory layout:
+    <disease>.jsonl         one {"x": [...], "y": 0|1, "t": ...} line per confirmed record
+    <disease>.state.json    log offset and sample counts as of the last snapshot
+    .learner.lock           held by the process running the learner
+    snapshots/<disease>/<base version>/<number>/
+                            model, scaler, calibrator and artifact of one snapshot
+"""
+
+import fcntl
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from artifacts import export_artifact
+from calibration import fit_calibrator
+
+logger = logging.getLogger(__name__)
+
+class FeedbackLog:
+    """Append-only log of labeled records per disease"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, disease):
+        return os.path.join(self.directory, f'{disease}.jsonl')
+
+    def append(self, disease, features, outcomes):
+        """Append rows of features with their confirmed outcomes in one locked write"""
+        received = datetime.now(timezone.utc).isoformat()
+        lines = ''.join(
+            json.dumps({'x': row, 'y': outcome, 't': received}) + '\n'
+            for row, outcome in zip(features.tolist(), outcomes)
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(disease), 'a') as f:
+            # Workers append concurrently; the lock keeps their lines whole
+            fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(lines)
+
+    def read(self, disease, offset):
+        """Features and outcomes appended since offset, and the offset after the last complete line"""
+        try:
+            with open(self.path(disease), 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return None, None, offset
+
+        end = data.rfind(b'\n') + 1
+        rows = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        if not rows:
+            return None, None, offset
+        X = np.array([row['x'] for row in rows], dtype=np.float64)
+        y = np.array([row['y'] for row in rows], dtype=np.int64)
+        return X, y, offset + end
+
+class OnlineLearner:
+    """Background SGD updates of each disease's linear model, snapshotted into the registry"""
+
+    def __init__(self, registry, log, diseases, interval=30.0, min_samples=20, alpha=1e-3, eta0=0.01, holdout_every=5):
+        if registry.snapshot_dir is None:
+            raise ValueError('Online learning needs a registry with a snapshot_dir to write versions to')
+        if holdout_every < 2:
+            raise ValueError('holdout_every must be at least 2, so some feedback is trained on and some held out')
+        self.registry = registry
+        self.log = log
+        self.diseases = list(diseases)
+        self.interval = interval
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.eta0 = eta0
+        self.holdout_every = holdout_every
+
+        self._states = {}
+        self._status = {disease: {'samples': 0, 'pending': 0, 'snapshots': 0, 'version': None,
+                                  'lastSnapshot': None, 'error': None} for disease in self.diseases}
+        self._lock_file = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_running(self):
+        """Start the learner thread, restarting it in forked children"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._lock_file = None
+            self._states = {}
+            self._thread = threading.Thread(target=self._run, name='online-learner', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            if not self._acquire():
+                continue
+            for disease in self.diseases:
+                try:
+                    self.step(disease)
+                except Exception as e:
+                    logger.error(f"Online update of {disease} failed: {e}")
+                    self._status[disease]['error'] = str(e)
+                    self._states.pop(disease, None)
+
+    def _acquire(self):
+        """Whether this process runs the learner, taking the lock if it is free"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(self.log.directory, exist_ok=True)
+        lock_file = open(os.path.join(self.log.directory, '.learner.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        # Held until this process exits
+        self._lock_file = lock_file
+        logger.info(f"Process {os.getpid()} is running the online learner")
+        return True
+
+    def is_leader(self):
+        return self._lock_file is not None and self._pid == os.getpid()
+
+    def _state_path(self, disease):
+        return os.path.join(self.log.directory, f'{disease}.state.json')
+
+    def _model_stat(self, disease):
+        """Which model file is served, newest snapshot or shipped, and its state"""
+        path = self.registry.paths(disease)[0]
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+
+    def _start(self, disease):
+        """Learner state from the served model and the log offset of its last snapshot"""
+        model_path, scaler_path, _, _ = self.registry.paths(disease)
+        file_stat = self._model_stat(disease)
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+
+        if getattr(model, 'kernel', 'linear') != 'linear' or not hasattr(model, 'coef_'):
+            raise ValueError(f"{disease} model is not linear; online updates need a linear model")
+
+        try:
+            with open(self._state_path(disease)) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            saved = {}
+
+        return {
+            'model': self._as_sgd(model),
+            'scaler': scaler,
+            'file_stat': file_stat,
+            'offset': saved.get('offset', 0),
+            'samples': saved.get('samples', 0),
+            'snapshots': saved.get('snapshots', 0),
+            'pending': 0
+        }
+
+    def _as_sgd(self, model):
+        """A hinge-loss SGD classifier continuing from a linear model's weights"""
+        from sklearn.linear_model import SGDClassifier
+
+        if isinstance(model, SGDClassifier):
+            return model
+        sgd = SGDClassifier(loss='hinge', alpha=self.alpha, learning_rate='constant', eta0=self.eta0)
+        # partial_fit keeps weights that are already set, so learning starts from the SVM's hyperplane
+        sgd.coef_ = np.array(model.coef_, dtype=np.float64, order='C').reshape(1, -1)
+        sgd.intercept_ = np.array(model.intercept_, dtype=np.float64).ravel()
+        sgd.classes_ = np.asarray(model.classes_)
+        return sgd
+
+    def _held_out(self, first, count):
+        """Mask of the records at log positions first to first + count - 1 kept for calibration
+
+        Every holdout_every-th record by position in the log is never trained
+        on. Positions, unlike offsets, do not depend on line lengths, so the
+        same records are held out after a restart or a rollback.
+        """
+        return np.arange(first, first + count) % self.holdout_every == self.holdout_every - 1
+
+    def step(self, disease):
+        """Apply feedback logged since the last step and snapshot when enough has accumulated"""
+        state = self._states.get(disease)
+        # A retrained shipped model or a rolled back snapshot replaces ours; start again from it
+        if state is None or self._model_stat(disease) != state['file_stat']:
+            state = self._states[disease] = self._start(disease)
+
+        X, y, offset = self.log.read(disease, state['offset'])
+        if y is not None:
+            train = ~self._held_out(state['samples'], len(y))
+            if train.any():
+                model = state['model']
+                model.partial_fit(state['scaler'].transform(X[train]), y[train], classes=model.classes_)
+                if not (np.all(np.isfinite(model.coef_)) and np.all(np.isfinite(model.intercept_))):
+                    raise ValueError('SGD update produced non-finite weights')
+            state['offset'] = offset
+            state['samples'] += len(y)
+            state['pending'] += int(train.sum())
+
+        status = self._status[disease]
+        status.update(samples=state['samples'], pending=state['pending'], snapshots=state['snapshots'], error=None)
+        if state['pending'] >= self.min_samples:
+            return self.snapshot(disease, state)
+        return None
+
+    def _calibrate(self, disease, state):
+        """Platt calibrator of the updated model on the held-out feedback, or None when too little
+
+        The SGD updates change the scale of the decision values, so the shipped
+        calibrator no longer applies. The feedback is the only labelled data
+        the learner has, and a calibrator fitted on records the model was
+        trained on reports optimistic confidences, so only held-out records
+        are used. Without enough of both outcomes among them the snapshot has
+        no calibrator and reports the default confidence.
+        """
+        X, y, _ = self.log.read(disease, 0)
+        if y is None:
+            return None
+        held = self._held_out(0, len(y))
+        X, y = X[held], y[held]
+        if len(y) < self.min_samples or len(np.unique(y)) < 2:
+            return None
+        decision = state['model'].decision_function(state['scaler'].transform(X))
+        return fit_calibrator(decision, y)
+
+    def snapshot(self, disease, state):
+        """Write the updated model as a new numbered snapshot and swap it in"""
+        root = self.registry.snapshot_root(disease)
+        if root is None:
+            raise ValueError(f"{disease} shipped model files are missing")
+        latest = self.registry.latest_snapshot(disease)
+        number = int(os.path.basename(latest)) + 1 if latest else 1
+        calibrator = self._calibrate(disease, state)
+
+        # Written to a hidden directory and renamed, so a numbered snapshot is always complete
+        tmp_dir = os.path.join(root, f'.{number:04d}.tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        model_path, scaler_path, calibrator_path, compact_path = self.registry.model_paths(tmp_dir, disease)
+        for path, obj in ((model_path, state['model']), (scaler_path, state['scaler']), (calibrator_path, calibrator)):
+            if obj is not None:
+                with open(path, 'wb') as f:
+                    pickle.dump(obj, f)
+
+        source_paths = [model_path, scaler_path] + ([calibrator_path] if calibrator is not None else [])
+        header = export_artifact(
+            compact_path, disease, state['model'], state['scaler'], calibrator=calibrator, source_paths=source_paths,
+            metadata={'online': {'samples': state['samples'], 'snapshot': number,
+                                 'base': os.path.basename(root)}}
+        )
+        os.rename(tmp_dir, os.path.join(root, f'{number:04d}'))
+
+        state['file_stat'] = self._model_stat(disease)
+        state['snapshots'] += 1
+        state['pending'] = 0
+        saved = {'offset': state['offset'], 'samples': state['samples'], 'snapshots': state['snapshots'],
+                 'version': header['source_version'], 'snapshot': number,
+                 'calibrated': calibrator is not None, 'updated': datetime.now(timezone.utc).isoformat()}
+        tmp_state = f'{self._state_path(disease)}.tmp'
+        with open(tmp_state, 'w') as f:
+            json.dump(saved, f, indent=2)
+        os.replace(tmp_state, self._state_path(disease))
+
+        # This process swaps at once; other workers pick the files up on their next poll
+        self.registry.refresh()
+        self._status[disease].update(pending=0, snapshots=state['snapshots'], version=header['source_version'],
+                                     lastSnapshot=saved['updated'])
+        logger.info(f"Snapshot {number:04d} of {disease} after {state['samples']} feedback records, "
+                    f"version {header['source_version']}, {'calibrated' if calibrator else 'uncalibrated'}")
+        return header['source_version']
+
+    def status(self):
+        return {'leader': self.is_leader(), 'diseases': self._status}
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kernel SVMs compressed to a reduced set of support vectors
+Written by sv_reduce.py as a drop-in replacement for a pickled SVC: the same
+decision function form, sum_j coef_j K(x, v_j) + b, over far fewer vectors,
+evaluated with numpy alone
+"""
+
+import numpy as np
+from kernels import kernel_matrix
+
+class ReducedKernelSVC:
+    """A kernel SVC's decision function over a reduced set of vectors
+
+    Exposes the SVC attributes and methods the backend and the tools use:
+    kernel, classes_, support_vectors_, dual_coef_, intercept_,
+    decision_function and predict.
+    """
+
+    method = 'reduced'
+
+    def __init__(self, kernel, kernel_params, vectors, coefficients, bias, classes, source=None):
+        self.kernel = kernel
+        self.kernel_params = dict(kernel_params)
+        self.support_vectors_ = np.ascontiguousarray(vectors, dtype=np.float64)
+        self.coefficients = np.ascontiguousarray(coefficients, dtype=np.float64).ravel()
+        self.bias = float(bias)
+        self.classes_ = np.asarray(classes)
+        self.source = source or {}
+
+    @property
+    def dual_coef_(self):
+        return self.coefficients.reshape(1, -1)
+
+    @property
+    def intercept_(self):
+        return np.array([self.bias])
+
+    @property
+    def n_features_in_(self):
+        return self.support_vectors_.shape[1]
+
+    def decision_function(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return kernel_matrix(X, self.support_vectors_, self.kernel, **self.kernel_params) @ self.coefficients + self.bias
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model registry for the prediction API
+Loads each disease's model on first use and hot-reloads retrained files
+"""
+
+import numpy as np
+import pickle
+import os
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from fused import FusedLinearModel, compile_fused_model
+from artifacts import artifact_path, content_version, file_stats, file_version, load_artifact, read_header
+from calibration import Calibrator
+
+logger = logging.getLogger(__name__)
+
+# Confidence reported for models trained without a calibrator
+DEFAULT_CONFIDENCE = 0.85
+
+class ModelVersion:
+    """A fully built model for one disease, never modified once serving"""
+
+    def __init__(self, disease, model, scaler, fused, calibrator, version, file_stats, load_seconds, model_format='pickle',
+                 snapshot=None):
+        self.disease = disease
+        self.model = model
+        self.scaler = scaler
+        self.fused = fused
+        self.calibrator = calibrator
+        self.version = version
+        self.file_stats = file_stats
+        self.load_seconds = load_seconds
+        self.model_format = model_format
+        self.snapshot = snapshot
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def predict(self, input_data, timer=None):
+        """Return predictions and confidences for every row of a feature matrix"""
+        if self.fused is not None:
+            decision = self.fused.decision_function(input_data)
+            predictions = self.fused.classes[(decision > 0).astype(np.intp)]
+        else:
+            input_data_scaled = self.scaler.transform(input_data)
+            if timer is not None:
+                timer.mark('scale')
+            if self.calibrator is None and getattr(self.model, 'probability', False):
+                predictions = self.model.predict(input_data_scaled)
+                if timer is not None:
+                    timer.mark('predict')
+                confidences = self.model.predict_proba(input_data_scaled).max(axis=1)
+                if timer is not None:
+                    timer.mark('predict_proba')
+                return predictions, confidences
+            decision = self.model.decision_function(input_data_scaled)
+            predictions = self.model.classes_[(decision > 0).astype(np.intp)]
+        if timer is not None:
+            timer.mark('predict')
+
+        # Calibrated probability of the predicted class from the same decision values
+        if self.calibrator is not None:
+            confidences = self.calibrator.confidence(decision)
+        else:
+            confidences = np.full(len(predictions), DEFAULT_CONFIDENCE)
+        if timer is not None:
+            timer.mark('predict_proba')
+
+        return predictions, confidences
+
+    def status(self):
+        return {
+            'loaded': True,
+            'version': self.version,
+            'loadedAt': self.loaded_at.isoformat(),
+            'loadSeconds': self.load_seconds,
+            'format': self.model_format,
+            'inference': 'fused' if self.fused is not None else getattr(self.model, 'method', 'sklearn'),
+            'calibration': self.calibrator.method if self.calibrator is not None else None,
+            'snapshot': self.snapshot
+        }
+
+class ModelRegistry:
+    """Lazily loads models per disease and atomically swaps in new versions
+
+    With a snapshot_dir, the newest online-learning snapshot of a disease's
+    shipped model is served instead of the shipped files. Snapshots live in
+    <snapshot_dir>/<disease>/<base version>/<number>/, where the base version
+    hashes the shipped pickles, so retraining the shipped model starts from it
+    again, and deleting the newest snapshot rolls back to the one before.
+    """
+
+    def __init__(self, model_dir, diseases, use_fused=True, poll_interval=5.0, model_format='auto', snapshot_dir=None):
+        self.model_dir = model_dir
+        self.snapshot_dir = snapshot_dir
+        self.diseases = list(diseases)
+        self.use_fused = use_fused
+        self.poll_interval = poll_interval
+        self.model_format = model_format
+
+        self._versions = {}
+        self._errors = {}
+        self._failed_stats = {}
+        self._last_attempt = {}
+        self._seen_paths = {}
+        self._seen_stats = {}
+        self._base_versions = {}
+        self._verified_sources = {}
+        self._locks = {disease: threading.Lock() for disease in self.diseases}
+        self._watcher_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+
+    def model_paths(self, directory, disease):
+        """Return the model, scaler, calibrator and artifact file paths for a disease in a directory"""
+        return (
+            os.path.join(directory, f'{disease}_model.sav'),
+            os.path.join(directory, f'{disease}_scaler.sav'),
+            os.path.join(directory, f'{disease}_calibrator.sav'),
+            artifact_path(directory, disease)
+        )
+
+    def paths(self, disease):
+        """Return the file paths of the version to serve: the newest snapshot, else the shipped files"""
+        return self.model_paths(self.latest_snapshot(disease) or self.model_dir, disease)
+
+    def base_version(self, disease):
+        """Content version of the shipped pickles, rehashed only when their files change"""
+        pickle_paths = self._pickle_paths(self.model_paths(self.model_dir, disease))
+        try:
+            stats = tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, pickle_paths))
+        except FileNotFoundError:
+            return None
+        cached = self._base_versions.get(disease)
+        if cached is None or cached[0] != stats:
+            cached = self._base_versions[disease] = (stats, file_version(*pickle_paths))
+        return cached[1]
+
+    def snapshot_root(self, disease):
+        """Directory of the numbered snapshots taken from the current shipped model"""
+        if self.snapshot_dir is None:
+            return None
+        base = self.base_version(disease)
+        return os.path.join(self.snapshot_dir, disease, base) if base is not None else None
+
+    def latest_snapshot(self, disease):
+        """Newest snapshot directory of the current shipped model, or None"""
+        root = self.snapshot_root(disease)
+        try:
+            numbers = [int(name) for name in os.listdir(root) if name.isdigit()] if root else []
+        except FileNotFoundError:
+            return None
+        # Snapshots are renamed into place once complete, so a numbered directory is never partial
+        return os.path.join(root, f'{max(numbers):04d}') if numbers else None
+
+    def _pickle_paths(self, paths):
+        """Pickles making up a version; the calibrator is optional"""
+        model_path, scaler_path, calibrator_path, _ = paths
+        if os.path.exists(calibrator_path):
+            return [model_path, scaler_path, calibrator_path]
+        return [model_path, scaler_path]
+
+    def _stat_files(self, disease, paths=None):
+        """Stat the files of the version to serve, remembering which paths they were for the health probe"""
+        paths = paths or self.paths(disease)
+        stats = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stats.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                stats.append(None)
+        self._seen_paths[disease] = paths
+        self._seen_stats[disease] = tuple(stats)
+        return self._seen_stats[disease]
+
+    def _select_format(self, disease, paths):
+        """Pick the artifact when it exists and was exported from the current pickles"""
+        if self.model_format != 'auto':
+            return self.model_format
+        if not self.use_fused:
+            return 'pickle'
+
+        model_path, scaler_path, _, compact_path = paths
+        if not os.path.exists(compact_path):
+            return 'pickle'
+        if not (os.path.exists(model_path) and os.path.exists(scaler_path)):
+            return 'artifact'
+
+        # Pickles renamed into place keep the stats recorded at export, so only changed files are hashed,
+        # and a hash that matched is remembered for the stats it matched at (checkouts and copies reset mtimes)
+        header = read_header(compact_path)
+        pickle_paths = self._pickle_paths(paths)
+        stats = file_stats(*pickle_paths)
+        source = (header.get('source_version'), stats)
+        if header.get('source_stats') == stats or self._verified_sources.get(compact_path) == source:
+            return 'artifact'
+        if header.get('source_version') != file_version(*pickle_paths):
+            return 'pickle'
+        self._verified_sources[compact_path] = source
+        return 'artifact'
+
+    def _build(self, disease):
+        """Load, compile and verify a new version without touching the live one"""
+        start = time.perf_counter()
+        # Resolved once, so a snapshot appearing meanwhile cannot mix files from two versions
+        paths = self.paths(disease)
+        compact_path = paths[-1]
+        directory = os.path.dirname(compact_path)
+        snapshot = os.path.basename(directory) if directory != self.model_dir else None
+        file_stats = self._stat_files(disease, paths)
+
+        if self._select_format(disease, paths) == 'artifact':
+            # Memory-mapped weights are shared by every process using the file
+            header, arrays = load_artifact(compact_path)
+            fused = FusedLinearModel(arrays['weights'], arrays['bias'][0], header['classes'])
+            calibration = header.get('calibration')
+            calibrator = Calibrator.from_dict(calibration) if calibration else None
+            return ModelVersion(
+                disease, None, None, fused, calibrator, header['source_version'] or file_version(compact_path),
+                file_stats, time.perf_counter() - start, model_format='artifact', snapshot=snapshot
+            )
+
+        contents = []
+        for path in self._pickle_paths(paths):
+            with open(path, 'rb') as f:
+                contents.append(f.read())
+
+        # Files are replaced one at a time, the model last; a set that does not match the artifact
+        # is a write in progress or pickles replaced without re-exporting, never served
+        version = content_version(*contents)
+        if os.path.exists(compact_path):
+            source_version = read_header(compact_path).get('source_version')
+            if source_version is not None and source_version != version:
+                raise ValueError(f"{disease} pickles (version {version}) do not match {compact_path} "
+                                 f"(version {source_version}); re-export it with artifacts.py if they were replaced")
+
+        model = pickle.loads(contents[0])
+        scaler = pickle.loads(contents[1])
+        calibrator = pickle.loads(contents[2]) if len(contents) > 2 else None
+        fused = compile_fused_model(model, scaler) if self.use_fused else None
+
+        return ModelVersion(
+            disease, model, scaler, fused, calibrator, version,
+            file_stats, time.perf_counter() - start, snapshot=snapshot
+        )
+
+    def _load(self, disease):
+        """Build a version and swap it in, keeping the old one on failure"""
+        try:
+            version = self._build(disease)
+        except Exception as e:
+            logger.error(f"Error loading model/scaler for {disease}: {e}")
+            self._errors[disease] = str(e)
+            self._failed_stats[disease] = self._stat_files(disease)
+            return None
+
+        current = self._versions.get(disease)
+        if current is not None and current.version == version.version:
+            # Files were touched but the content is unchanged
+            current.file_stats = version.file_stats
+            return current
+
+        # A single dict assignment, so readers see either the old or the new version
+        self._versions[disease] = version
+        self._errors.pop(disease, None)
+        logger.info(f"Loaded {disease} model version {version.version} in {version.load_seconds * 1000:.1f} ms")
+        return version
+
+    def get(self, disease):
+        """Return the live version for a disease, loading it on first use"""
+        self._ensure_watcher()
+        version = self._versions.get(disease)
+        if version is not None:
+            return version
+
+        with self._locks[disease]:
+            version = self._versions.get(disease)
+            if version is not None:
+                return version
+
+            # Retry missing models at most once per poll interval
+            now = time.monotonic()
+            last_attempt = self._last_attempt.get(disease)
+            if last_attempt is not None and now - last_attempt < self.poll_interval:
+                return None
+            self._last_attempt[disease] = now
+
+            return self._load(disease)
+
+    def preload(self, warm_up=None):
+        """Load every disease now, without starting the watcher thread
+
+        Used before forking workers, which start their own watchers on first
+        use. warm_up(disease, version) runs once per loaded version so the
+        first real request does not pay for first-call code paths.
+        """
+        for disease in self.diseases:
+            with self._locks[disease]:
+                self._last_attempt[disease] = time.monotonic()
+                version = self._versions.get(disease) or self._load(disease)
+            if version is not None and warm_up is not None:
+                warm_up(disease, version)
+        return self.ready()
+
+    def ready(self):
+        """Whether every disease has a version serving"""
+        return all(disease in self._versions for disease in self.diseases)
+
+    def files_exist(self):
+        """Presence of each model file as of the last load or watcher poll"""
+        present = {}
+        for disease in self.diseases:
+            # Resolved and stat'ed once here if no load or poll has done it yet, never again per probe
+            if disease not in self._seen_stats:
+                self._stat_files(disease)
+            for path, stat in zip(self._seen_paths[disease], self._seen_stats[disease]):
+                present[os.path.basename(path)] = stat is not None
+        return present
+
+    def _ensure_watcher(self):
+        """Start the file watcher, restarting it in forked children"""
+        if self.poll_interval <= 0:
+            return
+        if self._watcher is not None and self._watcher_pid == os.getpid():
+            return
+        with self._watcher_lock:
+            if self._watcher is not None and self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+            self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.refresh()
+
+    def refresh(self):
+        """Reload every loaded disease whose files changed on disk"""
+        for disease in self.diseases:
+            current = self._versions.get(disease)
+            if current is None:
+                continue
+            file_stats = self._stat_files(disease)
+            # Skip files that are unchanged or already failed to load as they are
+            if file_stats != current.file_stats and file_stats != self._failed_stats.get(disease):
+                with self._locks[disease]:
+                    self._load(disease)
+
+    def status(self):
+        """Return the load state of every disease without triggering loads"""
+        status = {}
+        for disease in self.diseases:
+            version = self._versions.get(disease)
+            if version is not None:
+                status[disease] = version.status()
+            else:
+                status[disease] = {'loaded': False, 'error': self._errors.get(disease)}
+        return status
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Risk levels reported alongside each prediction
+Shared by the API and the bulk scoring CLI so both label results the same way
+"""
+
+import numpy as np
+
+def determine_risk_level(prediction, confidence):
+    """Determine risk level based on prediction and confidence"""
+    if prediction == 0:
+        if confidence > 0.8:
+            return 'low'
+        elif confidence > 0.6:
+            return 'low'
+        else:
+            return 'medium'
+    else:
+        if confidence > 0.8:
+            return 'high'
+        elif confidence > 0.6:
+            return 'medium'
+        else:
+            return 'medium'
+
+RISK_LEVELS = ('low', 'medium', 'high')
+
+def risk_level_codes(predictions, confidences):
+    """determine_risk_level for whole arrays, as indices into RISK_LEVELS"""
+    predictions = np.asarray(predictions)
+    confidences = np.asarray(confidences)
+    return np.where(
+        predictions == 0,
+        np.where(confidences > 0.6, 0, 1),
+        np.where(confidences > 0.8, 2, 1)
+    )
+
+def risk_levels(predictions, confidences):
+    """determine_risk_level for whole arrays of predictions and confidences"""
+    return np.array(RISK_LEVELS, dtype=object)[risk_level_codes(predictions, confidences)]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Declarative disease specifications for the prediction API
+A spec lists the model's input fields in order; compiling it gives a validator
+that turns request JSON into a float64 feature matrix in one pass
+"""
+
+import math
+import numpy as np
+from operator import itemgetter
+
+class Field:
+    """One model input: request name, dataset column, type and allowed range"""
+
+    def __init__(self, name, column, label, type=float, min=None, max=None, message=None):
+        self.name = name
+        self.column = column
+        self.label = label
+        self.type = type
+        self.min = min
+        self.max = max
+        self.message = message or self._default_message()
+
+    def accepts(self, value):
+        """Whether a float value is finite, in range and of the right type"""
+        if not np.isfinite(value):
+            return False
+        if self.min is not None and value < self.min:
+            return False
+        if self.max is not None and value > self.max:
+            return False
+        return self.type is not int or value == round(value)
+
+    def _default_message(self):
+        kind = 'a whole number' if self.type is int else 'a number'
+        if self.min is not None and self.max is not None:
+            return f'{self.label} must be {kind} between {self.min:g} and {self.max:g}'
+        if self.min is not None:
+            return f'{self.label} must be {kind}, {self.min:g} or greater'
+        if self.max is not None:
+            return f'{self.label} must be {kind}, {self.max:g} or less'
+        return f'{self.label} must be {kind}'
+
+class DiseaseSpec:
+    """Everything needed to serve, and retrain, the model for one disease"""
+
+    def __init__(self, name, title, fields, messages, dataset, label, ignore=()):
+        self.name = name
+        self.title = title
+        self.fields = list(fields)
+        self.messages = tuple(messages)
+        self.dataset = dataset
+        self.label = label
+        self.ignore = list(ignore)
+
+    @property
+    def field_names(self):
+        return [field.name for field in self.fields]
+
+    @property
+    def columns(self):
+        return [field.column for field in self.fields]
+
+    def compile(self):
+        return Validator(self)
+
+class Validator:
+    """Compiled request validator for one disease spec"""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.fields = spec.fields
+        self.names = tuple(spec.field_names)
+        self.n_features = len(self.names)
+
+        # Fetch every field with one C-level call
+        getter = itemgetter(*self.names)
+        self._get = getter if self.n_features > 1 else (lambda data: (getter(data),))
+
+        # Finite bounds, so the range comparisons also reject NaN and infinity
+        largest = np.finfo(np.float64).max
+        lower = [-largest if f.min is None else float(f.min) for f in self.fields]
+        upper = [largest if f.max is None else float(f.max) for f in self.fields]
+        integer = [f.type is int for f in self.fields]
+        self._lower = np.array(lower, dtype=np.float64)
+        self._upper = np.array(upper, dtype=np.float64)
+        self._integer_columns = np.flatnonzero(integer)
+        self._extract_row = self._compile_row()
+
+    def _compile_row(self):
+        """Build a function returning one valid record's (1, n) row, or None
+
+        On a handful of values every numpy call costs more than plain Python
+        comparisons, so the checks are generated as one expression over the
+        unpacked values. Small whole-number ranges become a set membership
+        test; NaN and infinity in fields open on either side make the sum of
+        the values non-finite. Numeric strings and anything else the
+        expression cannot decide fall through to the slower path.
+        """
+        namespace = {'get': self._get, 'isfinite': math.isfinite, 'array': np.array, 'float64': np.float64}
+        conditions = []
+        for i, field in enumerate(self.fields):
+            bounded = field.min is not None and field.max is not None
+            if field.type is int and bounded and field.max - field.min <= 1024:
+                namespace[f'allowed{i}'] = frozenset(range(math.ceil(field.min), math.floor(field.max) + 1))
+                conditions.append(f'v{i} in allowed{i}')
+                continue
+            if field.min is not None:
+                namespace[f'lower{i}'] = float(field.min)
+                conditions.append(f'lower{i} <= v{i}')
+            if field.max is not None:
+                namespace[f'upper{i}'] = float(field.max)
+                conditions.append(f'v{i} <= upper{i}')
+            if field.type is int:
+                conditions.append(f'v{i} % 1 == 0')
+            if not bounded and 'isfinite(sum(values))' not in conditions:
+                conditions.insert(0, 'isfinite(sum(values))')
+
+        names = ''.join(f'v{i}, ' for i in range(self.n_features))
+        source = (
+            'def extract_row(data):\n'
+            '    values = get(data)\n'
+            f'    {names}= values\n'
+            f'    if {" and ".join(conditions) or "True"}:\n'
+            '        return array((values,), dtype=float64)\n'
+        )
+        exec(source, namespace)
+        return namespace['extract_row']
+
+    def _invalid(self, matrix):
+        """Boolean mask of values that are not finite, out of range or not whole"""
+        invalid = ~((matrix >= self._lower) & (matrix <= self._upper))
+        if len(self._integer_columns):
+            columns = matrix[:, self._integer_columns]
+            invalid[:, self._integer_columns] |= columns != np.floor(columns)
+        return invalid
+
+    def _record_errors(self, record):
+        """Collect every problem with a record that failed the fast path"""
+        if not isinstance(record, dict):
+            return {'_': 'Record must be a JSON object'}
+
+        errors = {}
+        for field in self.fields:
+            if field.name not in record:
+                errors[field.name] = f'{field.name} is required'
+                continue
+            try:
+                value = float(record[field.name])
+            except (TypeError, ValueError, OverflowError):
+                errors[field.name] = field.message
+                continue
+            if not field.accepts(value):
+                errors[field.name] = field.message
+        return errors
+
+    def _mask_errors(self, invalid_row):
+        return {self.fields[i].name: self.fields[i].message for i in np.flatnonzero(invalid_row)}
+
+    def extract(self, data):
+        """Return a (1, n) feature row and a dict of field errors"""
+        try:
+            row = self._extract_row(data)
+        except (KeyError, TypeError, OverflowError):
+            row = None
+        if row is not None:
+            return row, {}
+
+        # Missing fields, numeric strings and invalid values
+        try:
+            row = np.array((self._get(data),), dtype=np.float64)
+        except (KeyError, TypeError, ValueError, OverflowError):
+            return None, self._record_errors(data)
+        invalid = self._invalid(row)[0]
+        if invalid.any():
+            return None, self._mask_errors(invalid)
+        return row, {}
+
+    def validate_matrix(self, features):
+        """Positions of invalid rows in a feature matrix and their field errors"""
+        invalid = self._invalid(features)
+        bad = np.flatnonzero(invalid.any(axis=1))
+        return bad, {int(position): self._mask_errors(invalid[position]) for position in bad}
+
+    def extract_batch(self, records):
+        """Return the feature matrix of valid records, their indices and per-row errors"""
+        features = np.empty((len(records), self.n_features), dtype=np.float64)
+        valid_rows = []
+        errors = {}
+
+        for index, record in enumerate(records):
+            try:
+                features[len(valid_rows)] = self._get(record)
+            except (KeyError, TypeError, ValueError, OverflowError):
+                errors[index] = self._record_errors(record)
+                continue
+            valid_rows.append(index)
+
+        features, valid_rows, matrix_errors = self.filter_matrix(features[:len(valid_rows)], valid_rows)
+        errors.update(matrix_errors)
+        return features, valid_rows, errors
+
+    def filter_matrix(self, features, rows=None):
+        """Return the valid rows of a feature matrix, their indices and per-row errors
+
+        Range and type checks run over the whole matrix at once. rows gives the
+        index of each matrix row in the request, by default its position; when
+        every row is valid the matrix is returned as it is, without a copy.
+        """
+        rows = range(len(features)) if rows is None else rows
+        bad, bad_errors = self.validate_matrix(features)
+        if not len(bad):
+            return features, rows, {}
+        errors = {rows[position]: bad_errors[position] for position in bad}
+        keep = np.ones(len(features), dtype=bool)
+        keep[bad] = False
+        return features[keep], [index for index, kept in zip(rows, keep) if kept], errors
+
+def format_errors(errors):
+    """One human-readable message for a dict of field errors"""
+    return '; '.join(errors.values())
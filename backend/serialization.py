@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Response encoding for the prediction API
+JSON through orjson when it is installed and the standard library otherwise,
+or MessagePack for clients that ask for it in Accept. Prediction results are
+assembled from byte fragments encoded once per disease, class and risk level,
+so a batch response only formats its confidences row by row
+"""
+
+import json
+import struct
+
+import numpy as np
+from risk import RISK_LEVELS, risk_level_codes
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+
+# Offered in order of preference; an Accept of */* gets JSON
+MEDIA_TYPES = (JSON, MSGPACK, 'application/x-msgpack') if msgpack is not None else (JSON,)
+
+class Encoded(bytes):
+    """Bytes already encoded in the response format, spliced into a body verbatim"""
+
+def negotiate(accept_mimetypes, offered=MEDIA_TYPES):
+    """Media type to answer a request with, from its parsed Accept header"""
+    return accept_mimetypes.best_match(offered, default=JSON)
+
+def is_json(media_type):
+    return media_type == JSON
+
+def _dump_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode()
+
+def _msgpack_header(length, fix, short, long):
+    if length < 16:
+        return bytes([fix | length])
+    if length < 0x10000:
+        return struct.pack('>BH', short, length)
+    return struct.pack('>BI', long, length)
+
+def encode(obj, media_type=JSON):
+    """Encode a response body, copying Encoded fragments inside it as they are"""
+    if isinstance(obj, Encoded):
+        return obj
+    if isinstance(obj, dict):
+        if is_json(media_type):
+            return b'{' + b','.join(_dump_json(str(key)) + b':' + encode(value, media_type)
+                                    for key, value in obj.items()) + b'}'
+        return _msgpack_header(len(obj), 0x80, 0xde, 0xdf) + b''.join(
+            msgpack.packb(key) + encode(value, media_type) for key, value in obj.items())
+    if isinstance(obj, (list, tuple)):
+        if is_json(media_type):
+            return b'[' + b','.join(encode(value, media_type) for value in obj) + b']'
+        return _msgpack_header(len(obj), 0x90, 0xdc, 0xdd) + b''.join(encode(value, media_type) for value in obj)
+    if is_json(media_type):
+        return _dump_json(obj)
+    return msgpack.packb(obj)
+
+def encode_array(items, media_type=JSON):
+    """An Encoded array of already encoded items"""
+    if is_json(media_type):
+        return Encoded(b'[' + b','.join(items) + b']')
+    return Encoded(_msgpack_header(len(items), 0x90, 0xdc, 0xdd) + b''.join(items))
+
+class ResultFragments:
+    """Encoded prediction results of one disease, with only the confidence left to fill in
+
+    A result is {"confidence", "message", "prediction", "riskLevel"}. All but
+    the confidence follow from the predicted class and risk level, so the
+    rest of the result is encoded once for every combination of the two.
+    """
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        combinations = [(prediction, level) for prediction in range(len(self.messages)) for level in RISK_LEVELS]
+
+        self._prefixes = {JSON: b'{"confidence":'}
+        self._separators = {JSON: b','}
+        self._suffixes = {JSON: np.array([
+            b',"message":' + _dump_json(self.messages[prediction]) + b',"prediction":' + _dump_json(prediction)
+            + b',"riskLevel":' + _dump_json(level) + b'}'
+            for prediction, level in combinations
+        ], dtype=object)}
+
+        if msgpack is not None:
+            # A float64 confidence is marker 0xcb then 8 big-endian bytes
+            prefix = _msgpack_header(4, 0x80, 0xde, 0xdf) + msgpack.packb('confidence') + b'\xcb'
+            suffixes = np.array([
+                msgpack.packb('message') + msgpack.packb(self.messages[prediction]) + msgpack.packb('prediction')
+                + msgpack.packb(prediction) + msgpack.packb('riskLevel') + msgpack.packb(level)
+                for prediction, level in combinations
+            ], dtype=object)
+            for media_type in MEDIA_TYPES[1:]:
+                self._prefixes[media_type] = prefix
+                self._separators[media_type] = b''
+                self._suffixes[media_type] = suffixes
+
+        # Each suffix followed by the start of the next result, so a whole batch is one join
+        self._continued = {
+            media_type: np.array([suffix + self._separators[media_type] + self._prefixes[media_type]
+                                  for suffix in suffixes.tolist()], dtype=object)
+            for media_type, suffixes in self._suffixes.items()
+        }
+
+    def _confidences(self, confidences, media_type):
+        """Each confidence encoded on its own"""
+        confidences = np.ascontiguousarray(confidences, dtype=np.float64)
+        if not is_json(media_type):
+            packed = confidences.astype('>f8').tobytes()
+            return [packed[start:start + 8] for start in range(0, len(packed), 8)]
+        if orjson is not None:
+            return orjson.dumps(confidences, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].split(b',')
+        return ','.join(map(repr, confidences.tolist())).encode().split(b',')
+
+    def _codes(self, predictions, confidences):
+        """Index of each row's class and risk level into the suffix tables"""
+        predictions = np.asarray(predictions).astype(np.intp)
+        return predictions * len(RISK_LEVELS) + risk_level_codes(predictions, confidences)
+
+    def results(self, predictions, confidences, media_type=JSON):
+        """Encoded results of every row, in order"""
+        prefix = self._prefixes[media_type]
+        suffixes = self._suffixes[media_type][self._codes(predictions, confidences)].tolist()
+        return [prefix + confidence + suffix
+                for confidence, suffix in zip(self._confidences(confidences, media_type), suffixes)]
+
+    def record(self, prediction, confidence, media_type=JSON):
+        """Encoded result of a single record"""
+        return Encoded(self.results([prediction], [confidence], media_type)[0])
+
+    def batch(self, count, valid_rows, predictions, confidences, errors, media_type=JSON):
+        """Encoded array of a batch's results, with each invalid row's error dict at its index"""
+        if not errors:
+            if not count:
+                return encode_array([], media_type)
+            # [prefix, confidence, suffix + next prefix, confidence, ..., last suffix], joined once
+            codes = self._codes(predictions, confidences)
+            if is_json(media_type):
+                opening, closing = b'[', b']'
+            else:
+                opening, closing = _msgpack_header(count, 0x90, 0xdc, 0xdd), b''
+            pieces = [None] * (2 * count + 1)
+            pieces[0] = opening + self._prefixes[media_type]
+            pieces[1::2] = self._confidences(confidences, media_type)
+            pieces[2::2] = self._continued[media_type][codes].tolist()
+            pieces[-1] = self._suffixes[media_type][codes[-1]] + closing
+            return Encoded(b''.join(pieces))
+
+        rows = self.results(predictions, confidences, media_type) if len(valid_rows) else []
+        items = [None] * count
+        for index, row in zip(valid_rows, rows):
+            items[index] = row
+        for index, error in errors.items():
+            items[index] = encode(error, media_type)
+        return encode_array(items, media_type)
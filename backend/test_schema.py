@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the compiled request validator
+A bad record must come back as field errors, never as an exception
+
+Usage:
+    python -m pytest backend/test_schema.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from diseases import DIABETES
+
+RECORD = {'pregnancies': 2, 'glucose': 120, 'bloodPressure': 70, 'skinThickness': 20,
+          'insulin': 80, 'bmi': 25.0, 'diabetesPedigreeFunction': 0.5, 'age': 40}
+
+def test_out_of_range_value_is_a_record_error():
+    row, errors = DIABETES.compile().extract({**RECORD, 'glucose': 10 ** 400})
+    assert row is None
+    assert list(errors) == ['glucose']
+
+def test_batch_out_of_range_value_is_a_row_error():
+    records = [RECORD, {**RECORD, 'glucose': 10 ** 400}, {**RECORD, 'age': 200}, RECORD]
+    features, rows, errors = DIABETES.compile().extract_batch(records)
+    assert list(rows) == [0, 3]
+    assert features.shape == (2, len(DIABETES.fields))
+    assert {index: list(fields) for index, fields in errors.items()} == {1: ['glucose'], 2: ['age']}
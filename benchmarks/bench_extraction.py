@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark for request feature extraction
+Compares the per-field dict lookups and np.asarray used by the old handlers
+with the compiled schema validator, for single records and batches
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from diseases import DISEASES
+
+SAMPLE_RECORDS = {
+    'diabetes': {
+        'pregnancies': 6, 'glucose': 148, 'bloodPressure': 72, 'skinThickness': 35,
+        'insulin': 0, 'bmi': 33.6, 'diabetesPedigreeFunction': 0.627, 'age': 50
+    },
+    'heart': {
+        'age': 57, 'sex': 1, 'cp': 0, 'trestbps': 140, 'chol': 192, 'fbs': 0, 'restecg': 1,
+        'thalach': 148, 'exang': 0, 'oldpeak': 0.4, 'slope': 1, 'ca': 0, 'thal': 1
+    },
+    'parkinsons': {
+        'mdvpFo': 119.992, 'mdvpFhi': 157.302, 'mdvpFlo': 74.997, 'mdvpJitter': 0.00784,
+        'mdvpJitterAbs': 0.00007, 'mdvpRap': 0.0037, 'mdvpPpq': 0.00554, 'jitterDdp': 0.01109,
+        'mdvpShimmer': 0.04374, 'mdvpShimmerDb': 0.426, 'shimmerApq3': 0.02182, 'shimmerApq5': 0.0313,
+        'mdvpApq': 0.02971, 'shimmerDda': 0.06545, 'nhr': 0.02211, 'hnr': 21.033, 'rpde': 0.414783,
+        'dfa': 0.815285, 'spread1': -4.813031, 'spread2': 0.266482, 'd2': 2.301442, 'ppe': 0.284654
+    }
+}
+
+def legacy_extract(data, fields):
+    """Feature row built the way the per-disease handlers did"""
+    features = [
+        data[field] for field in fields
+    ]
+    return np.asarray(features, dtype=np.float64).reshape(1, -1)
+
+def legacy_extract_batch(records, fields):
+    features = np.empty((len(records), len(fields)), dtype=np.float64)
+    for index, record in enumerate(records):
+        features[index] = [float(record[field]) for field in fields]
+    return features
+
+def best(fn, number):
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure request feature extraction cost')
+    parser.add_argument('--number', type=int, default=50000, help='Iterations per single-record timing run')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Records per batch')
+    args = parser.parse_args(argv)
+
+    for disease, spec in DISEASES.items():
+        validator = spec.compile()
+        fields = spec.field_names
+        record = SAMPLE_RECORDS[disease]
+        records = [record] * args.batch_size
+
+        # Both paths must produce the same features
+        assert np.array_equal(legacy_extract(record, fields), validator.extract(record)[0])
+        assert np.array_equal(legacy_extract_batch(records, fields), validator.extract_batch(records)[0])
+
+        single_old = best(lambda: legacy_extract(record, fields), args.number)
+        single_new = best(lambda: validator.extract(record), args.number)
+        batch_number = max(args.number // args.batch_size, 1)
+        batch_old = best(lambda: legacy_extract_batch(records, fields), batch_number)
+        batch_new = best(lambda: validator.extract_batch(records), batch_number)
+
+        print(f"{disease} ({len(fields)} features)")
+        print(f"  single: {single_old * 1e6:7.2f} us -> {single_new * 1e6:7.2f} us ({single_old / single_new:.2f}x)")
+        print(f"  batch:  {batch_old * 1e3:7.2f} ms -> {batch_new * 1e3:7.2f} ms ({batch_old / batch_new:.2f}x, {args.batch_size} records)")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark for the Gram matrix cache
+Times a C x fold sweep fitted with SVC computing kernels itself against the same
+sweep fitted from a cached, memory-mapped Gram matrix, on the diabetes training
+split and on larger synthetic datasets
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from gram_cache import GramCache, resolve_gamma
+from sklearn.datasets import make_classification
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from train import load_dataset
+
+def folds(y, n_folds, seed=0):
+    return list(StratifiedKFold(n_folds, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+
+def sweep_direct(X, y, kernel, gamma, Cs, splits):
+    """Fit and score every (C, fold) with SVC evaluating the kernel itself"""
+    scores = []
+    for C in Cs:
+        for train, test in splits:
+            model = SVC(kernel=kernel, gamma=gamma, C=C).fit(X[train], y[train])
+            scores.append(np.mean(model.predict(X[test]) == y[test]))
+    return scores
+
+def sweep_cached(gram, y, Cs, splits):
+    """Fit and score every (C, fold) by slicing a precomputed Gram matrix"""
+    scores = []
+    for C in Cs:
+        for train, test in splits:
+            model = SVC(kernel='precomputed', C=C).fit(gram[np.ix_(train, train)], y[train])
+            scores.append(np.mean(model.predict(gram[np.ix_(test, train)]) == y[test]))
+    return scores
+
+def run(name, X, y, args):
+    X = StandardScaler().fit_transform(X)
+    gamma = resolve_gamma(X, 'scale')
+    splits = folds(y, args.folds)
+    fits = len(args.C) * len(splits)
+
+    started = time.perf_counter()
+    direct = sweep_direct(X, y, args.kernel, gamma, args.C, splits)
+    direct_seconds = time.perf_counter() - started
+
+    cache_dir = tempfile.mkdtemp(prefix='gram-bench-')
+    try:
+        cache = GramCache(cache_dir)
+        key = cache.add_dataset(X)
+        started = time.perf_counter()
+        gram = cache.gram(key, args.kernel, gamma)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        cached = sweep_cached(gram, y, args.C, splits)
+        cached_seconds = time.perf_counter() - started
+
+        # A fresh process would find the matrix on disk and only memory-map it
+        started = time.perf_counter()
+        GramCache(cache_dir).gram(key, args.kernel, gamma)
+        reopen_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(cache_dir)
+
+    agreement = np.mean(np.isclose(direct, cached))
+    print(f"{name}: {len(X)} rows x {X.shape[1]} features, {args.kernel} kernel, {fits} fits")
+    print(f"  direct:          {direct_seconds:8.3f} s")
+    print(f"  cached (cold):   {build_seconds + cached_seconds:8.3f} s  "
+          f"({direct_seconds / (build_seconds + cached_seconds):.2f}x, includes {build_seconds:.3f} s to build)")
+    print(f"  cached (warm):   {reopen_seconds + cached_seconds:8.3f} s  "
+          f"({direct_seconds / (reopen_seconds + cached_seconds):.2f}x)")
+    print(f"  fold scores agree: {agreement * 100:.0f}%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare SVC fits with and without the Gram matrix cache')
+    parser.add_argument('--kernel', choices=['linear', 'poly', 'rbf', 'sigmoid'], default='rbf')
+    parser.add_argument('--C', nargs='+', type=float, default=[0.1, 1.0, 10.0, 100.0])
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--sizes', nargs='*', type=int, default=[2000, 4000], help='Synthetic dataset sizes')
+    parser.add_argument('--features', type=int, default=20, help='Synthetic feature count')
+    args = parser.parse_args(argv)
+
+    X_train, _, y_train, _ = load_dataset('diabetes', os.path.join(BASE_DIR, 'dataset'))
+    run('diabetes', X_train, y_train, args)
+
+    for size in args.sizes:
+        X, y = make_classification(n_samples=size, n_features=args.features, n_informative=args.features // 2,
+                                   flip_y=0.05, random_state=0)
+        run(f'synthetic-{size}', X, y, args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmark for the request metrics instrumentation
+Compares the per-request cost of stage timing and histogram updates with a
+full prediction request through the Flask test client
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+from metrics import RequestMetrics, StageTimer
+
+DIABETES_RECORD = {
+    'pregnancies': 6, 'glucose': 148, 'bloodPressure': 72, 'skinThickness': 35,
+    'insulin': 0, 'bmi': 33.6, 'diabetesPedigreeFunction': 0.627, 'age': 50
+}
+
+def instrumentation_cost(request_metrics, number):
+    """Seconds spent per request timing six stages and recording them"""
+    def instrument():
+        timer = StageTimer()
+        for stage in ('parse', 'extract', 'scale', 'predict', 'predict_proba', 'serialize'):
+            timer.mark(stage)
+        request_metrics.observe('diabetes', 'single', timer, 200)
+
+    return min(timeit.repeat(instrument, number=number, repeat=5)) / number
+
+def request_cost(number):
+    """Seconds per diabetes prediction through the Flask test client"""
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+    import app
+
+    client = app.app.test_client()
+    client.post('/api/predict/diabetes', json=DIABETES_RECORD)
+    return min(timeit.repeat(
+        lambda: client.post('/api/predict/diabetes', json=DIABETES_RECORD),
+        number=number, repeat=5
+    )) / number
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure metrics instrumentation overhead')
+    parser.add_argument('--number', type=int, default=20000, help='Iterations per timing run')
+    args = parser.parse_args(argv)
+
+    overhead = instrumentation_cost(RequestMetrics(), args.number)
+    request = request_cost(max(args.number // 20, 1))
+
+    print(f"Instrumentation per request: {overhead * 1e6:.2f} us")
+    print(f"Prediction request:          {request * 1e6:.2f} us")
+    print(f"Overhead:                    {overhead / request * 100:.2f}%")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load generator for a locally running prediction API
+Builds request bodies from real rows of the datasets, mapped to the API's field
+names, and drives the server either closed-loop (a fixed number of clients,
+each sending its next request when the previous one returns) or open-loop (a
+fixed arrival rate, whatever the server's response times). Reports throughput,
+latency percentiles and error rate per endpoint.
+
+Open-loop latency is measured from when a request was due to be sent, so time
+spent waiting behind a slow server counts against it.
+
+Usage:
+    python benchmarks/loadgen.py closed --concurrency 8 --duration 30
+    python benchmarks/loadgen.py open --rate 200 --duration 30 --diseases heart
+    python benchmarks/loadgen.py closed --batch-size 100 --spawn 4    # start gunicorn with 4 workers first
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+BACKEND_DIR = os.path.join(BASE_DIR, 'backend')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from dataset_cache import load_columns
+from diseases import DISEASES
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+BATCH_BODIES = 256
+
+def record_from_row(spec, columns, row):
+    """Request record for one dataset row, keyed by the API's field names"""
+    return {
+        field.name: int(columns[field.column][row]) if field.type is int else float(columns[field.column][row])
+        for field in spec.fields
+    }
+
+def build_payloads(disease, batch_size=0, seed=0):
+    """Encoded request bodies built from every row of the disease's dataset
+
+    With batch_size 0 there is one single-record body per row; otherwise there
+    are BATCH_BODIES batches of batch_size randomly chosen rows.
+    """
+    spec = DISEASES[disease]
+    columns = load_columns(spec.dataset)
+    n_rows = len(columns[spec.label])
+    records = [record_from_row(spec, columns, row) for row in range(n_rows)]
+    if not batch_size:
+        return [json.dumps(record).encode() for record in records]
+
+    rng = random.Random(seed)
+    return [json.dumps(rng.choices(records, k=batch_size)).encode() for _ in range(BATCH_BODIES)]
+
+class Endpoint:
+    def __init__(self, disease, batch_size):
+        self.name = f'{disease}/batch' if batch_size else disease
+        self.path = f'/api/predict/{disease}/batch' if batch_size else f'/api/predict/{disease}'
+        self.rows_per_request = batch_size or 1
+        self.payloads = build_payloads(disease, batch_size)
+
+class Stats:
+    """Latencies and errors of one client thread, merged at the end"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, endpoint, latency, status):
+        self.latencies.setdefault(endpoint.name, []).append(latency)
+        key = (endpoint.name, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[endpoint.name] = self.errors.get(endpoint.name, 0) + 1
+
+    def merge(self, other):
+        for name, latencies in other.latencies.items():
+            self.latencies.setdefault(name, []).extend(latencies)
+        for name, count in other.errors.items():
+            self.errors[name] = self.errors.get(name, 0) + count
+        for key, count in other.statuses.items():
+            self.statuses[key] = self.statuses.get(key, 0) + count
+
+class Client:
+    """One keep-alive HTTP connection; reconnects when the server closes it"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.connection = None
+
+    def post(self, path, body):
+        """Send one request and return its status code, or the exception name on failure"""
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request('POST', path, body, {'Content-Type': 'application/json'})
+            response = self.connection.getresponse()
+            response.read()
+            if response.will_close:
+                self.close()
+            return response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            return type(e).__name__
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+def run_closed(endpoints, args, host, port):
+    """args.concurrency clients each send requests back to back until the deadline"""
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    results = []
+
+    def client_loop(seed):
+        rng = random.Random(seed)
+        client = Client(host, port, args.timeout)
+        stats = Stats()
+        while True:
+            endpoint = rng.choice(endpoints)
+            body = rng.choice(endpoint.payloads)
+            sent = time.perf_counter()
+            if sent >= deadline:
+                break
+            status = client.post(endpoint.path, body)
+            if sent >= measure_from:
+                stats.record(endpoint, time.perf_counter() - sent, status)
+        client.close()
+        results.append(stats)
+
+    threads = [threading.Thread(target=client_loop, args=(seed,)) for seed in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = Stats()
+    for result in results:
+        stats.merge(result)
+    return stats, {'mode': 'closed', 'concurrency': args.concurrency}
+
+def run_open(endpoints, args, host, port):
+    """Requests arrive at args.rate per second and are sent by a pool of up to args.max_clients"""
+    rng = random.Random(0)
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    arrivals = queue.Queue()
+    results = []
+
+    def client_loop():
+        client = Client(host, port, args.timeout)
+        stats = Stats()
+        while True:
+            item = arrivals.get()
+            if item is None:
+                break
+            due, endpoint, body = item
+            status = client.post(endpoint.path, body)
+            if due >= measure_from:
+                # From when the request was due, not when a client got to it
+                stats.record(endpoint, time.perf_counter() - due, status)
+        client.close()
+        results.append(stats)
+
+    threads = [threading.Thread(target=client_loop) for _ in range(args.max_clients)]
+    for thread in threads:
+        thread.start()
+
+    offered = 0
+    late = 0
+    due = started
+    while due < deadline:
+        now = time.perf_counter()
+        if due > now:
+            time.sleep(due - now)
+        elif now - due > 0.01:
+            late += 1
+        endpoint = rng.choice(endpoints)
+        arrivals.put((due, endpoint, rng.choice(endpoint.payloads)))
+        if due >= measure_from:
+            offered += 1
+        due += rng.expovariate(args.rate) if args.arrivals == 'poisson' else 1.0 / args.rate
+
+    for _ in threads:
+        arrivals.put(None)
+    for thread in threads:
+        thread.join()
+
+    stats = Stats()
+    for result in results:
+        stats.merge(result)
+    return stats, {'mode': 'open', 'rate': args.rate, 'arrivals': args.arrivals,
+                   'offered': offered, 'late_dispatches': late, 'max_clients': args.max_clients}
+
+def summarize(stats, endpoints, elapsed):
+    """Per-endpoint and overall throughput, latency percentiles and error rate"""
+    rows_per_request = {endpoint.name: endpoint.rows_per_request for endpoint in endpoints}
+
+    def describe(latencies, errors, rows):
+        latencies = np.asarray(latencies) * 1000
+        count = len(latencies)
+        summary = {
+            'requests': count,
+            'errors': errors,
+            'error_rate': errors / count if count else 0.0,
+            'requests_per_second': count / elapsed,
+            'rows_per_second': rows / elapsed
+        }
+        if count:
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary.update({'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': float(latencies.max())})
+        return summary
+
+    endpoints_summary = {}
+    for name, latencies in sorted(stats.latencies.items()):
+        endpoints_summary[name] = describe(latencies, stats.errors.get(name, 0), len(latencies) * rows_per_request[name])
+
+    everything = [latency for latencies in stats.latencies.values() for latency in latencies]
+    total_rows = sum(len(latencies) * rows_per_request[name] for name, latencies in stats.latencies.items())
+    statuses = {}
+    for (name, status), count in sorted(stats.statuses.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        statuses.setdefault(name, {})[str(status)] = count
+    return {
+        'endpoints': endpoints_summary,
+        'total': describe(everything, sum(stats.errors.values()), total_rows),
+        'statuses': statuses
+    }
+
+def print_report(summary, run_info, elapsed):
+    print(f"{run_info['mode']}-loop run, {elapsed:.1f}s measured", end='')
+    if run_info['mode'] == 'closed':
+        print(f", {run_info['concurrency']} clients")
+    else:
+        print(f", {run_info['rate']:g} req/s {run_info['arrivals']} arrivals offered ({run_info['offered']} requests), "
+              f"{run_info['max_clients']} clients")
+        if run_info['late_dispatches']:
+            print(f"  {run_info['late_dispatches']} requests were dispatched over 10ms late; "
+                  f"the load generator itself may be saturated")
+
+    header = f"{'endpoint':<20}{'requests':>10}{'req/s':>10}{'rows/s':>10}{'p50 ms':>10}{'p95 ms':>10}" \
+             f"{'p99 ms':>10}{'max ms':>10}{'errors':>10}"
+    print(header)
+    print('-' * len(header))
+    rows = list(summary['endpoints'].items())
+    if len(rows) > 1:
+        rows += [(None, None), ('total', summary['total'])]
+    for name, row in rows:
+        if row is None:
+            print('-' * len(header))
+            continue
+        latency = ''.join(f"{row.get(key, float('nan')):>10.2f}" for key in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms'))
+        print(f"{name:<20}{row['requests']:>10}{row['requests_per_second']:>10.1f}{row['rows_per_second']:>10.0f}"
+              f"{latency}{row['error_rate'] * 100:>9.2f}%")
+
+    for name, statuses in summary['statuses'].items():
+        unexpected = {status: count for status, count in statuses.items() if status != '200'}
+        if unexpected:
+            print(f"{name}: " + ', '.join(f'{status} x{count}' for status, count in unexpected.items()))
+
+def wait_until_healthy(host, port, timeout):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=1)
+            connection.request('GET', '/api/health')
+            if connection.getresponse().status == 200:
+                return True
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.2)
+    return False
+
+def spawn_server(workers, host, port):
+    """Start gunicorn on the backend with the given worker count"""
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(workers),
+               '--bind', f'{host}:{port}', '--log-level', 'warning']
+    server = subprocess.Popen(command, cwd=BACKEND_DIR)
+    if not wait_until_healthy(host, port, 60):
+        server.terminate()
+        raise RuntimeError(f"gunicorn did not become healthy on {host}:{port}")
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Drive a local prediction API with dataset-derived requests')
+    parser.add_argument('mode', choices=['closed', 'open'], help='closed: fixed clients; open: fixed arrival rate')
+    parser.add_argument('--url', default=os.environ.get('LOADGEN_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--allow-remote', action='store_true', help='Allow a URL that is not localhost')
+    parser.add_argument('--diseases', nargs='+', default=list(DISEASES), help='Endpoints to exercise')
+    parser.add_argument('--batch-size', type=int, default=0, help='Post batches of this many rows to the batch routes')
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+    parser.add_argument('--warmup', type=float, default=3.0, help='Seconds of load before measuring starts')
+    parser.add_argument('--concurrency', type=int, default=8, help='Closed loop: concurrent clients')
+    parser.add_argument('--rate', type=float, default=100.0, help='Open loop: requests per second')
+    parser.add_argument('--arrivals', choices=['poisson', 'uniform'], default='poisson',
+                        help='Open loop: spacing of arrivals')
+    parser.add_argument('--max-clients', type=int, default=64, help='Open loop: most requests in flight at once')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+    parser.add_argument('--spawn', type=int, metavar='WORKERS',
+                        help='Start gunicorn with this many workers on the URL\'s port for the run')
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    unknown = [disease for disease in args.diseases if disease not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)} (choose from {', '.join(DISEASES)})")
+    url = urlsplit(args.url)
+    host, port = url.hostname or '127.0.0.1', url.port or 80
+    if url.scheme != 'http':
+        parser.error('only http:// URLs are supported')
+    if host not in LOCAL_HOSTS and not args.allow_remote:
+        parser.error(f'{host} is not localhost; pass --allow-remote to load-test another machine')
+    if args.mode == 'open' and args.rate <= 0:
+        parser.error('--rate must be positive')
+
+    endpoints = [Endpoint(disease, args.batch_size) for disease in args.diseases]
+    server = spawn_server(args.spawn, host, port) if args.spawn else None
+    try:
+        if server is None and not wait_until_healthy(host, port, 5):
+            print(f"No healthy server at {args.url}; start one or pass --spawn", file=sys.stderr)
+            return 1
+        run = run_closed if args.mode == 'closed' else run_open
+        stats, run_info = run(endpoints, args, host, port)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(stats, endpoints, args.duration)
+    print_report(summary, run_info, args.duration)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': args.url, 'batch_size': args.batch_size, 'duration': args.duration,
+                       **run_info, **summary}, f, indent=2)
+            f.write('\n')
+    return 1 if summary['total']['errors'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
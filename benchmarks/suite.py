@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for serving latency, batch throughput, startup and training
+Each group runs several times and every result is the median of those runs.
+Writes results as JSON, compares them with a stored baseline, and exits with
+status 1 when any result regresses by more than the threshold
+
+Usage:
+    python benchmarks/suite.py                                # run and compare with baseline.json
+    python benchmarks/suite.py --only serving batch --group-threshold batch=0.5
+    python benchmarks/suite.py --only serving --repeats 9 --cpu 2
+    python benchmarks/suite.py --only serialization --serialization-rows 10000
+    python benchmarks/suite.py --save-baseline                # record a new baseline
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.dirname(BENCH_DIR)
+BACKEND_DIR = os.path.join(BASE_DIR, 'backend')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_extraction import SAMPLE_RECORDS
+from diseases import DISEASES
+
+# Packages whose version is recorded with the results; JSON and msgpack encoding depend on orjson and msgpack
+PACKAGES = {'numpy': 'numpy', 'sklearn': 'scikit-learn', 'flask': 'flask', 'orjson': 'orjson', 'msgpack': 'msgpack'}
+GROUPS = ['serving', 'batch', 'serialization', 'startup', 'training']
+KERNELS = ['linear', 'poly', 'rbf', 'sigmoid']
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Groups held to a different slowdown than --threshold, for a measured reason. Empty: every group is
+# held to --threshold, and noise is kept under it by pinning the suite to one CPU and taking the
+# median of --repeats runs rather than by loosening the gate.
+GROUP_THRESHOLDS = {}
+
+# Measure the model, not the prediction cache, micro-batching or the reload watcher
+BENCH_ENV = {'PREDICTION_CACHE_SIZE': '0', 'MICROBATCH': '0', 'MODEL_RELOAD_INTERVAL': '0'}
+
+def result(value, unit, better='lower', threshold=None):
+    """A benchmark result; threshold overrides --threshold for a result noisier than the rest"""
+    entry = {'value': value, 'unit': unit, 'better': better}
+    if threshold is not None:
+        entry['threshold'] = threshold
+    return entry
+
+def load_app():
+    os.environ.update(BENCH_ENV)
+    os.chdir(BACKEND_DIR)
+    import app
+
+    return app.app.test_client()
+
+def bench_serving(args):
+    """Median and p95 latency of single-record requests per disease"""
+    client = load_app()
+    results = {}
+    for disease in DISEASES:
+        url = f'/api/predict/{disease}'
+        record = SAMPLE_RECORDS[disease]
+        for _ in range(args.warmup):
+            assert client.post(url, json=record).status_code == 200
+
+        timings = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            client.post(url, json=record)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        results[f'serving.{disease}.p50_us'] = result(statistics.median(timings) * 1e6, 'us')
+        results[f'serving.{disease}.p95_us'] = result(timings[int(len(timings) * 0.95)] * 1e6, 'us')
+    return results
+
+def bench_batch(args):
+    """Rows per second through the batch route at several batch sizes"""
+    client = load_app()
+    results = {}
+    for disease in DISEASES:
+        url = f'/api/predict/{disease}/batch'
+        for size in args.batch_sizes:
+            records = [SAMPLE_RECORDS[disease]] * size
+            assert client.post(url, json=records).status_code == 200
+
+            # Repeat each size for roughly the same number of rows
+            repeats = max(args.batch_rows // size, 3)
+            best = float('inf')
+            for _ in range(3):
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    client.post(url, json=records)
+                best = min(best, (time.perf_counter() - started) / repeats)
+            results[f'batch.{disease}.{size}.rows_per_s'] = result(size / best, 'rows/s', 'higher')
+    return results
+
+def bench_serialization(args):
+    """Time to encode one batch response, per disease and format
+
+    jsonify is the reference: a dict per row passed through Flask's jsonify,
+    which is how batch responses were built before the precomputed fragments.
+    """
+    import numpy as np
+    from risk import determine_risk_level
+    from serialization import MEDIA_TYPES, ResultFragments, encode
+
+    app = load_app().application
+    rng = np.random.default_rng(0)
+    predictions = rng.integers(0, 2, args.serialization_rows)
+    confidences = rng.uniform(0.5, 1.0, args.serialization_rows)
+    rows = args.serialization_rows
+
+    def median_ms(encode_response):
+        # A few milliseconds each, so one descheduling moves a single timing by half; the median of many does not move.
+        # Encoding allocates a bytes object per row, and when the collector runs would depend on what ran before,
+        # so it is paused while timing, as timeit does.
+        encode_response()
+        gc.collect()
+        gc.disable()
+        try:
+            timings = []
+            for _ in range(args.serialization_runs):
+                started = time.perf_counter()
+                encode_response()
+                timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+        return statistics.median(timings) * 1000
+
+    results = {}
+    for disease, spec in DISEASES.items():
+        def jsonify_dicts():
+            with app.app_context():
+                app.json.response({'results': [
+                    {'prediction': prediction, 'confidence': confidence, 'message': spec.messages[prediction],
+                     'riskLevel': determine_risk_level(prediction, confidence)}
+                    for prediction, confidence in zip(predictions.tolist(), confidences.tolist())
+                ], 'count': rows, 'errorCount': 0}).get_data()
+
+        results[f'serialization.{disease}.{rows}.jsonify_ms'] = result(median_ms(jsonify_dicts), 'ms')
+        fragments = ResultFragments(spec.messages)
+        for media_type in MEDIA_TYPES[:2]:
+            name = media_type.split('/')[1]
+            results[f'serialization.{disease}.{rows}.{name}_ms'] = result(median_ms(lambda: encode({
+                'results': fragments.batch(rows, range(rows), predictions, confidences, {}, media_type),
+                'count': rows, 'errorCount': 0
+            }, media_type)), 'ms')
+    return results
+
+def bench_startup(args):
+    """Fresh-interpreter time to import app.py and to serve the first prediction"""
+    script = (
+        "import time, json\n"
+        "started = time.perf_counter()\n"
+        "import app\n"
+        "imported = time.perf_counter()\n"
+        "client = app.app.test_client()\n"
+        f"client.post('/api/predict/diabetes', json={SAMPLE_RECORDS['diabetes']!r})\n"
+        "print(json.dumps([imported - started, time.perf_counter() - started]))\n"
+    )
+    env = dict(os.environ, **BENCH_ENV, PYTHONWARNINGS='ignore')
+    imports, first_requests = [], []
+    for _ in range(args.startup_runs):
+        output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        imported, first_request = json.loads(output.strip().splitlines()[-1])
+        imports.append(imported)
+        first_requests.append(first_request)
+    return {
+        'startup.import_s': result(min(imports), 's'),
+        'startup.first_request_s': result(min(first_requests), 's')
+    }
+
+def bench_training(args):
+    """Wall time to fit each disease's scaler and SVM for each kernel"""
+    from sklearn import svm
+    from sklearn.preprocessing import StandardScaler
+    from train import load_dataset
+
+    results = {}
+    for disease in DISEASES:
+        X_train, _, y_train, _ = load_dataset(disease, os.path.join(BASE_DIR, 'dataset'))
+        for kernel in args.kernels:
+            def fit():
+                X_scaled = StandardScaler().fit_transform(X_train)
+                svm.SVC(kernel=kernel).fit(X_scaled, y_train)
+
+            # Fits take milliseconds, so each timing run repeats them for at least 0.2s to average out noise
+            fit()
+            started = time.perf_counter()
+            repeats = 0
+            while time.perf_counter() - started < 0.2:
+                fit()
+                repeats += 1
+            best = float('inf')
+            for _ in range(args.training_runs):
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    fit()
+                best = min(best, (time.perf_counter() - started) / repeats)
+            results[f'training.{disease}.{kernel}_ms'] = result(best * 1000, 'ms')
+    return results
+
+BENCHMARKS = {'serving': bench_serving, 'batch': bench_batch, 'serialization': bench_serialization,
+              'startup': bench_startup, 'training': bench_training}
+
+def package_version(name):
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+def pin_cpu(cpu):
+    """Run the suite, and the interpreters it starts, on one CPU; returns the CPU or None where unsupported
+
+    Moving between cores loses warm caches mid-measurement, which shows up as runs that are slower
+    for no reason in the code. Child processes inherit the affinity, so startup runs are pinned too.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    if cpu is None:
+        cpu = max(os.sched_getaffinity(0))
+    os.sched_setaffinity(0, {cpu})
+    return cpu
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': platform.python_version(),
+        **{name: package_version(package) for name, package in PACKAGES.items()},
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def install_changes(environment, baseline_environment):
+    """Packages whose version differs from the baseline's, as name -> (baseline, current)"""
+    return {
+        name: (baseline_environment[name], environment[name])
+        for name in ('python', *PACKAGES)
+        if name in baseline_environment and baseline_environment[name] != environment.get(name)
+    }
+
+def median_results(runs):
+    """Each result's median over repeated runs of a group, keeping every run's value"""
+    merged = {}
+    for name, first in runs[0].items():
+        values = [run[name]['value'] for run in runs]
+        merged[name] = dict(first, value=statistics.median(values), runs=values)
+    return merged
+
+def group_thresholds(overrides):
+    """Per-group thresholds from GROUP=FRACTION overrides on top of GROUP_THRESHOLDS"""
+    thresholds = dict(GROUP_THRESHOLDS)
+    for override in overrides:
+        group, _, value = override.partition('=')
+        if group not in GROUPS:
+            raise ValueError(f"unknown group {group!r} in --group-threshold {override}")
+        thresholds[group] = float(value)
+    return thresholds
+
+def compare(results, baseline, threshold):
+    """Relative change of each result against the baseline and whether it regressed"""
+    rows = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if previous is None or not previous['value']:
+            rows.append((name, current, None, None, False))
+            continue
+        change = current['value'] / previous['value'] - 1.0
+        # Positive change is worse for times, negative change is worse for throughput
+        worse = change if current['better'] == 'lower' else -change
+        rows.append((name, current, previous, change, worse > current.get('threshold', threshold)))
+    return rows
+
+def print_comparison(rows, threshold):
+    width = max(len(row[0]) for row in rows)
+    for name, current, previous, change, regressed in rows:
+        line = f"{name:<{width}}  {current['value']:>14,.2f} {current['unit']:<7}"
+        if previous is not None:
+            line += f"  baseline {previous['value']:>14,.2f}  {change * 100:+7.1f}%"
+            if regressed:
+                line += '  REGRESSION'
+        print(line)
+    regressions = sum(1 for row in rows if row[4])
+    print(f"\n{regressions} regression(s) beyond {threshold * 100:.0f}%, or their group's threshold where one is set")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite and compare with a baseline')
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=GROUPS, help='Benchmark groups to run')
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results.json'), help='Where to write results')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 0.25)),
+                        help='Allowed relative slowdown of every result (default 0.25 = 25%%, or BENCH_THRESHOLD)')
+    parser.add_argument('--group-threshold', action='append', default=[], metavar='GROUP=FRACTION',
+                        help='Hold one group to a different slowdown than --threshold')
+    parser.add_argument('--ignore-install-changes', action='store_true',
+                        help='Report, but do not fail on, regressions against a baseline from other package versions')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Runs of each group; results are their median, which single noisy runs barely move')
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='CPU to pin the suite to (default: the last one available to it)')
+    parser.add_argument('--requests', type=int, default=2000, help='Timed single-record requests per disease')
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 10, 100, 1000])
+    parser.add_argument('--batch-rows', type=int, default=5000, help='Rows scored per timing run of each batch size')
+    parser.add_argument('--serialization-rows', type=int, default=10000, help='Rows in each encoded batch response')
+    parser.add_argument('--serialization-runs', type=int, default=25, help='Timed encodings of each response')
+    parser.add_argument('--startup-runs', type=int, default=3)
+    parser.add_argument('--kernels', nargs='+', choices=KERNELS, default=KERNELS)
+    parser.add_argument('--training-runs', type=int, default=3)
+    args = parser.parse_args(argv)
+    try:
+        thresholds = group_thresholds(args.group_threshold)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        cpu = pin_cpu(args.cpu)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot pin to CPU {args.cpu}: {e}")
+
+    results = {}
+    for group in sorted(args.only, key=GROUPS.index):
+        started = time.perf_counter()
+        group_results = median_results([BENCHMARKS[group](args) for _ in range(max(args.repeats, 1))])
+        # Each result stores the threshold it is held to, so the comparison needs no group lookup
+        if group in thresholds:
+            for entry in group_results.values():
+                entry.setdefault('threshold', thresholds[group])
+        results.update(group_results)
+        print(f"{group}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    env = environment()
+    report = {'environment': env, 'threshold': args.threshold, 'group_thresholds': thresholds,
+              'repeats': args.repeats, 'cpu': cpu, 'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+    if args.save_baseline:
+        # Groups that were not run keep their previous baseline
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                previous = json.load(f)['results']
+            report['results'] = {**previous, **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+        print_comparison(compare(results, {}, args.threshold), args.threshold)
+        return 0
+
+    baseline = {'environment': {}, 'results': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one", file=sys.stderr)
+
+    rows = compare(results, baseline['results'], args.threshold)
+    changes = install_changes(env, baseline['environment'])
+    if changes and args.ignore_install_changes:
+        rows = [row[:4] + (False,) for row in rows]
+    regressions = print_comparison(rows, args.threshold)
+    if changes:
+        # A regression may come from the upgrade rather than the tree, but it still fails unless waived
+        recorded = ', '.join(f'{name} {old} (now {new})' for name, (old, new) in changes.items())
+        if args.ignore_install_changes:
+            print(f"Baseline recorded with {recorded}; not checked for regressions (--ignore-install-changes).")
+        else:
+            print(f"Warning: baseline recorded with {recorded}. Regressions may come from these versions; "
+                  f"re-record the baseline with --save-baseline, or pass --ignore-install-changes to only report them.")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for the benchmark suite's regression check
+Two runs on an unchanged tree must pass the comparison with each other,
+otherwise the threshold is tighter than the suite's own noise. That check
+runs the suite twice, so it only runs when BENCH_SLOW=1
+
+Usage:
+    python -m pytest benchmarks/test_suite.py
+    BENCH_SLOW=1 python -m pytest benchmarks/test_suite.py
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from suite import compare, result
+
+SUITE = os.path.join(BENCH_DIR, 'suite.py')
+
+slow = pytest.mark.skipif(os.environ.get('BENCH_SLOW') != '1', reason='runs the whole suite twice; set BENCH_SLOW=1')
+
+# Every group, with fewer iterations than the defaults to keep the two runs to a few minutes
+QUICK = ['--requests', '500', '--warmup', '100', '--batch-sizes', '1', '100', '--batch-rows', '1000',
+         '--kernels', 'linear', 'rbf', '--startup-runs', '2', '--training-runs', '2']
+
+def test_result_threshold_overrides_suite_threshold():
+    baseline = {'a': result(1.0, 'ms'), 'b': result(1.0, 'ms')}
+    current = {'a': result(1.4, 'ms', threshold=0.5), 'b': result(1.4, 'ms')}
+    regressed = {row[0]: row[4] for row in compare(current, baseline, 0.25)}
+    assert regressed == {'a': False, 'b': True}
+
+def test_throughput_regresses_when_lower():
+    baseline = {'batch': result(100.0, 'rows/s', 'higher')}
+    regressed = {row[0]: row[4] for row in compare({'batch': result(70.0, 'rows/s', 'higher')}, baseline, 0.25)}
+    assert regressed == {'batch': True}
+
+@slow
+def test_two_runs_of_same_tree_pass(tmp_path):
+    baseline = str(tmp_path / 'baseline.json')
+    output = str(tmp_path / 'results.json')
+    subprocess.run([sys.executable, SUITE, *QUICK, '--baseline', baseline, '--output', output, '--save-baseline'],
+                   capture_output=True, text=True, check=True)
+    run = subprocess.run([sys.executable, SUITE, *QUICK, '--baseline', baseline, '--output', output],
+                         capture_output=True, text=True)
+    assert run.returncode == 0, [line for line in run.stdout.splitlines() if 'REGRESSION' in line]
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multiprocess streaming bulk scoring for large CSV or Parquet extracts
+Reads the input in chunks, maps its columns to a disease's feature order,
+scores chunks in worker processes with the models the API serves, and writes
+prediction, confidence and risk level for every row in input order
+
+Usage:
+    python bulk_score.py diabetes patients.csv scores.csv
+    python bulk_score.py heart extract.parquet scores.parquet --passthrough patient_id
+    python bulk_score.py diabetes in.csv out.csv --map glucose=plasma_glucose --map age=age_years
+"""
+
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from diseases import DISEASES
+
+OUTPUT_COLUMNS = ['prediction', 'confidence', 'riskLevel', 'error']
+
+# Set in each worker by init_worker
+_model = None
+_validator = None
+
+def file_format(path, requested=None):
+    if requested:
+        return requested
+    return 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'csv'
+
+def input_columns(path, fmt):
+    """Column names of the input without reading its rows"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).schema_arrow.names
+    import pandas as pd
+
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def resolve_columns(spec, available, column_map):
+    """Input column for each feature, in model order
+
+    A feature matches an explicit --map entry, then its dataset column name,
+    then its API field name, then either of those ignoring case.
+    """
+    by_lower = {column.lower(): column for column in available}
+    columns = []
+    missing = []
+    for field in spec.fields:
+        if field.name in column_map:
+            candidates = [column_map[field.name]]
+        else:
+            candidates = [field.column, field.name]
+        match = next((column for column in candidates if column in available), None)
+        if match is None:
+            match = next((by_lower[column.lower()] for column in candidates if column.lower() in by_lower), None)
+        if match is None:
+            missing.append(f'{field.name} ({" or ".join(dict.fromkeys(candidates))})')
+        columns.append(match)
+    if missing:
+        raise ValueError(f"Input has no column for: {', '.join(missing)}")
+    return columns
+
+def read_chunks(path, fmt, columns, chunksize):
+    """Yield DataFrames of at most chunksize rows holding only the needed columns"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    import pandas as pd
+
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunksize)
+
+def init_worker(disease, model_dir, model_format):
+    """Load the model once per worker; artifacts are memory-mapped and shared between workers"""
+    global _model, _validator
+    from registry import ModelRegistry
+
+    registry = ModelRegistry(model_dir, DISEASES, poll_interval=0, model_format=model_format)
+    _model = registry.get(disease)
+    if _model is None:
+        raise RuntimeError(f'No {disease} model could be loaded from {model_dir}')
+    _validator = DISEASES[disease].compile()
+
+def score_chunk(frame, feature_columns, passthrough, output_format):
+    """Score one chunk and return its row count, invalid count and formatted output"""
+    import pandas as pd
+    from risk import risk_levels
+    from schema import format_errors
+
+    # Unparseable values become NaN and are reported as invalid rather than failing the chunk
+    X = np.column_stack([
+        pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        for column in feature_columns
+    ])
+    bad, errors = _validator.validate_matrix(X)
+    valid = np.ones(len(X), dtype=bool)
+    valid[bad] = False
+
+    predictions = np.zeros(len(X), dtype=np.int64)
+    confidences = np.full(len(X), np.nan)
+    if valid.any():
+        predictions[valid], confidences[valid] = _model.predict(X[valid])
+
+    levels = risk_levels(predictions, confidences)
+    messages = np.full(len(X), '', dtype=object)
+    for position, row_errors in errors.items():
+        messages[position] = format_errors(row_errors)
+    levels[~valid] = None
+
+    output = frame[passthrough].reset_index(drop=True) if passthrough else pd.DataFrame(index=range(len(X)))
+    prediction = pd.array(predictions, dtype='Int64')
+    prediction[~valid] = pd.NA
+    output['prediction'] = prediction
+    output['confidence'] = confidences
+    output['riskLevel'] = levels
+    output['error'] = messages
+
+    # CSV formatting is as costly as scoring, so it happens here rather than in the writer
+    if output_format == 'csv':
+        return len(X), len(bad), output.to_csv(index=False, header=False)
+    return len(X), len(bad), output
+
+class OutputWriter:
+    """Write scored chunks to a temporary file, renamed into place when complete"""
+
+    def __init__(self, path, fmt, columns):
+        self.path = path
+        self.fmt = fmt
+        self.tmp_path = f'{path}.tmp'
+        self._parquet = None
+        if fmt == 'csv':
+            self._file = open(self.tmp_path, 'w', newline='')
+            self._file.write(','.join(columns) + '\n')
+
+    def write(self, payload):
+        if self.fmt == 'csv':
+            self._file.write(payload)
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(payload, preserve_index=False)
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.tmp_path, table.schema)
+        self._parquet.write_table(table)
+
+    def close(self, success=True):
+        if self.fmt == 'csv':
+            self._file.close()
+        elif self._parquet is not None:
+            self._parquet.close()
+        if success and os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class Progress:
+    """Live rows/sec on stderr, rewritten in place on a terminal"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.rows = 0
+        self.invalid = 0
+        self.tty = sys.stderr.isatty()
+
+    def update(self, rows, invalid):
+        self.rows += rows
+        self.invalid += invalid
+        now = time.perf_counter()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._print(end='\r' if self.tty else '\n')
+
+    def _print(self, end):
+        elapsed = time.perf_counter() - self.started
+        print(f"{self.rows:,} rows, {self.invalid:,} invalid, {self.rows / elapsed if elapsed else 0:,.0f} rows/s",
+              end=end, file=sys.stderr, flush=True)
+
+    def finish(self):
+        self._print(end='\n')
+        elapsed = time.perf_counter() - self.started
+        return {'rows': self.rows, 'invalid': self.invalid, 'seconds': elapsed,
+                'rows_per_second': self.rows / elapsed if elapsed else 0.0}
+
+class InlineExecutor:
+    """Runs chunks in this process; used with --workers 0"""
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+def parse_map(entries, map_file):
+    column_map = {}
+    if map_file:
+        with open(map_file) as f:
+            column_map.update(json.load(f))
+    for entry in entries:
+        field, _, column = entry.partition('=')
+        if not column:
+            raise ValueError(f'--map expects field=column, got {entry!r}')
+        column_map[field] = column
+    return column_map
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a large CSV or Parquet file with a disease model')
+    parser.add_argument('disease', choices=list(DISEASES))
+    parser.add_argument('input', help='CSV or Parquet file to score')
+    parser.add_argument('output', help='CSV or Parquet file to write')
+    parser.add_argument('--input-format', choices=['csv', 'parquet'], help='Default: from the file extension')
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], help='Default: from the file extension')
+    parser.add_argument('--map', action='append', default=[], metavar='FIELD=COLUMN',
+                        help='Input column for an API field, e.g. glucose=plasma_glucose (repeatable)')
+    parser.add_argument('--map-file', help='JSON object of API field to input column')
+    parser.add_argument('--passthrough', nargs='*', default=[], help='Input columns copied to the output, e.g. an ID')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Rows per chunk')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes, 0 to score in-process')
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help='Chunks in flight at once, which bounds memory (default: 2 per worker)')
+    parser.add_argument('--model-dir', default=os.environ.get('MODEL_DIR', os.path.join(BASE_DIR, 'backend')))
+    parser.add_argument('--model-format', choices=['auto', 'artifact', 'pickle'], default='auto')
+    args = parser.parse_args(argv)
+
+    spec = DISEASES[args.disease]
+    input_format = file_format(args.input, args.input_format)
+    output_format = file_format(args.output, args.output_format)
+
+    try:
+        column_map = parse_map(args.map, args.map_file)
+        available = input_columns(args.input, input_format)
+        feature_columns = resolve_columns(spec, available, column_map)
+        missing = [column for column in args.passthrough if column not in available]
+        if missing:
+            raise ValueError(f"Input has no passthrough column: {', '.join(missing)}")
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    needed = list(dict.fromkeys(args.passthrough + feature_columns))
+    print(f"Scoring {args.input} for {args.disease} with columns {feature_columns}", file=sys.stderr)
+
+    if args.workers > 0:
+        executor = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                       initargs=(args.disease, args.model_dir, args.model_format))
+    else:
+        init_worker(args.disease, args.model_dir, args.model_format)
+        executor = InlineExecutor()
+    max_pending = args.max_pending or max(2 * args.workers, 1)
+
+    writer = OutputWriter(args.output, output_format, args.passthrough + OUTPUT_COLUMNS)
+    progress = Progress()
+    pending = collections.deque()
+
+    def drain(limit):
+        # Results are written strictly in submission order, so output rows follow input rows
+        while len(pending) > limit:
+            rows, invalid, payload = pending.popleft().result()
+            writer.write(payload)
+            progress.update(rows, invalid)
+
+    success = False
+    try:
+        for frame in read_chunks(args.input, input_format, needed, args.chunksize):
+            pending.append(executor.submit(score_chunk, frame, feature_columns, args.passthrough, output_format))
+            drain(max_pending - 1)
+        drain(0)
+        success = True
+    finally:
+        # On failure, chunks not yet started are dropped rather than scored for nothing
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=success)
+        writer.close(success)
+
+    summary = progress.finish()
+    print(f"Wrote {args.output}: {summary['rows']:,} rows ({summary['invalid']:,} invalid) in "
+          f"{summary['seconds']:.2f}s, {summary['rows_per_second']:,.0f} rows/s", file=sys.stderr)
+
+if __name__ == '__main__':
+    sys.exit(main())
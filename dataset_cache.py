@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary columnar cache for the CSVs under dataset/
+Each CSV is parsed once and stored as one typed .npy file per column in a
+directory named by the CSV's content hash. Later loads memory-map the columns.
+If the CSV changes, the cache is rebuilt on the next load.
+
+Cache layout, under dataset/:
+    .cache/<name>.json           size, mtime and content hash of the CSV last seen
+    .cache/<name>-<hash>/        columns.json plus 000.npy, 001.npy, ... per column
+    .cache/external/             the same for CSVs elsewhere, named <name>.<path hash>
+
+Usage:
+    python dataset_cache.py      # build or refresh the cache for every CSV
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_DIR = os.path.join(BASE_DIR, 'dataset')
+CACHE_DIRNAME = '.cache'
+
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from artifacts import file_version
+from diseases import DISEASES
+
+# Columns already opened in this process, keyed by CSV path
+_loaded = {}
+
+def dataset_path(name, dataset_dir=DATASET_DIR):
+    """Path of a CSV given its name ('diabetes'), file name or path"""
+    if os.sep in name or os.path.isabs(name):
+        return name
+    if name.endswith('.csv'):
+        return os.path.join(dataset_dir, name)
+    return os.path.join(dataset_dir, f'{name}.csv')
+
+def _cache_paths(path):
+    path = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if os.path.dirname(path) == DATASET_DIR:
+        return os.path.join(DATASET_DIR, CACHE_DIRNAME), stem
+    # Nothing is written next to CSVs outside dataset/; the path hash keeps same-named files apart
+    digest = hashlib.sha256(os.path.dirname(path).encode()).hexdigest()[:12]
+    return os.path.join(DATASET_DIR, CACHE_DIRNAME, 'external'), f'{stem}.{digest}'
+
+def _write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _build(path, directory):
+    """Parse the CSV and write every column as a .npy file, renaming the directory into place"""
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    tmp_dir = f'{directory}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    columns = []
+    for i, name in enumerate(frame.columns):
+        values = frame[name].to_numpy()
+        # Text columns become fixed-width unicode, which memory-maps like numbers do
+        if values.dtype == object:
+            values = values.astype(str)
+        file_name = f'{i:03d}.npy'
+        np.save(os.path.join(tmp_dir, file_name), values)
+        columns.append({'name': str(name), 'dtype': values.dtype.str, 'file': file_name})
+
+    _write_json(os.path.join(tmp_dir, 'columns.json'), {'rows': len(frame), 'columns': columns})
+
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Another process built the same content first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _remove_stale(cache_dir, stem, keep):
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(f'{stem}-') and entry != os.path.basename(keep) and not entry.endswith('.tmp'):
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+
+def cache_directory(path):
+    """Directory holding the cached columns of a CSV, building or rebuilding it when stale"""
+    cache_dir, stem = _cache_paths(path)
+    pointer_path = os.path.join(cache_dir, f'{stem}.json')
+    stat = os.stat(path)
+
+    # An unchanged size and mtime means the recorded hash still holds, so skip hashing the CSV
+    try:
+        with open(pointer_path) as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        pointer = {}
+    if pointer.get('size') == stat.st_size and pointer.get('mtime_ns') == stat.st_mtime_ns:
+        directory = os.path.join(cache_dir, f"{stem}-{pointer['hash']}")
+        if os.path.exists(os.path.join(directory, 'columns.json')):
+            return directory
+
+    os.makedirs(cache_dir, exist_ok=True)
+    version = file_version(path)
+    directory = os.path.join(cache_dir, f'{stem}-{version}')
+    if not os.path.exists(os.path.join(directory, 'columns.json')):
+        _build(path, directory)
+        _remove_stale(cache_dir, stem, directory)
+    _write_json(pointer_path, {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': version})
+    return directory
+
+def load_columns(name, dataset_dir=DATASET_DIR):
+    """Ordered dict of column name to read-only memory-mapped array"""
+    path = os.path.abspath(dataset_path(name, dataset_dir))
+    directory = cache_directory(path)
+
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == directory:
+        return cached[1]
+
+    with open(os.path.join(directory, 'columns.json')) as f:
+        manifest = json.load(f)
+    columns = {
+        column['name']: np.load(os.path.join(directory, column['file']), mmap_mode='r')
+        for column in manifest['columns']
+    }
+    _loaded[path] = (directory, columns)
+    return columns
+
+def load_frame(name, dataset_dir=DATASET_DIR):
+    """The CSV as a pandas DataFrame, built from the cached columns"""
+    import pandas as pd
+
+    return pd.DataFrame({column: np.asarray(values) for column, values in load_columns(name, dataset_dir).items()})
+
+def load_xy(disease, dataset_dir=DATASET_DIR, path=None):
+    """float64 features in the disease spec's column order and int64 labels
+
+    path loads another CSV with the same columns instead of the disease's dataset;
+    a relative path is taken from the working directory, not dataset_dir.
+    """
+    spec = DISEASES[disease]
+    columns = load_columns(os.path.abspath(path) if path else spec.dataset, dataset_dir)
+    X = np.column_stack([columns[column] for column in spec.columns]).astype(np.float64, copy=False)
+    y = np.asarray(columns[spec.label]).astype(np.int64)
+    return X, y
+
+def main(argv=None):
+    names = sorted(entry for entry in os.listdir(DATASET_DIR) if entry.endswith('.csv'))
+    for name in names:
+        started = time.perf_counter()
+        directory = cache_directory(os.path.join(DATASET_DIR, name))
+        columns = load_columns(name)
+        rows = len(next(iter(columns.values()))) if columns else 0
+        print(f"{name}: {rows} rows x {len(columns)} columns in {os.path.relpath(directory, BASE_DIR)} "
+              f"({(time.perf_counter() - started) * 1000:.1f} ms)")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whole-dataset evaluation of the saved disease prediction models
+Loads the persisted scaler and model the way the backend does, scores every
+row in vectorized batches, and reports accuracy, the confusion matrix and the
+rows the model got wrong
+
+Usage:
+    python evaluate.py diabetes
+    python evaluate.py heart --csv big.csv --chunksize 100000 --mismatches wrong.csv
+    python evaluate.py parkinsons --json
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from diseases import DISEASES
+from registry import ModelRegistry
+
+def iter_batches(disease, csv_path=None, chunksize=None):
+    """Yield (first row index, X, y) batches of a dataset"""
+    spec = DISEASES[disease]
+
+    if chunksize:
+        import pandas as pd
+
+        # Only the needed columns are parsed, one bounded chunk at a time
+        path = csv_path or os.path.join(BASE_DIR, 'dataset', spec.dataset)
+        start = 0
+        for chunk in pd.read_csv(path, usecols=spec.columns + [spec.label], chunksize=chunksize):
+            yield start, chunk[spec.columns].to_numpy(dtype=np.float64), chunk[spec.label].to_numpy(dtype=np.int64)
+            start += len(chunk)
+        return
+
+    from dataset_cache import load_xy
+
+    X, y = load_xy(disease, path=csv_path)
+    yield 0, X, y
+
+class Evaluation:
+    """Running accuracy, confusion matrix and mismatches over scored batches"""
+
+    def __init__(self, classes, show=20, mismatch_writer=None):
+        self.classes = np.asarray(classes)
+        self.confusion = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+        self.rows = 0
+        self.mismatch_count = 0
+        self.mismatches = []
+        self.show = show
+        self.mismatch_writer = mismatch_writer
+
+    def update(self, start, y, predictions, confidences):
+        # searchsorted would quietly count an unknown label as a neighbouring class
+        known = np.isin(y, self.classes)
+        if not known.all():
+            unknown = np.unique(y[~known]).tolist()
+            raise ValueError(f"labels {unknown} from row {start + int(np.argmin(known))} are not among the "
+                             f"model's classes {self.classes.tolist()}")
+        n_classes = len(self.classes)
+        actual = np.searchsorted(self.classes, y)
+        predicted = np.searchsorted(self.classes, predictions)
+        self.confusion += np.bincount(actual * n_classes + predicted, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+        self.rows += len(y)
+
+        wrong = np.flatnonzero(predictions != y)
+        self.mismatch_count += len(wrong)
+        if self.mismatch_writer is not None:
+            self.mismatch_writer.writerows(
+                zip((wrong + start).tolist(), predictions[wrong].tolist(), y[wrong].tolist(), confidences[wrong].tolist())
+            )
+        # Only the first few are kept in memory
+        for i in wrong[:max(self.show - len(self.mismatches), 0)]:
+            self.mismatches.append({
+                'row': int(start + i),
+                'predicted': predictions[i].item(),
+                'actual': y[i].item(),
+                'confidence': float(confidences[i])
+            })
+
+    def summary(self):
+        correct = int(np.trace(self.confusion))
+        return {
+            'rows': self.rows,
+            'correct': correct,
+            'accuracy': correct / self.rows * 100 if self.rows else 0.0,
+            'classes': self.classes.tolist(),
+            'confusion_matrix': self.confusion.tolist(),
+            'mismatch_count': self.mismatch_count,
+            'mismatches': self.mismatches
+        }
+
+def evaluate(model, batches, show=20, mismatch_writer=None):
+    """Score every batch and summarize the results"""
+    classes = model.fused.classes if model.fused is not None else model.model.classes_
+    evaluation = Evaluation(classes, show, mismatch_writer)
+
+    started = time.perf_counter()
+    scoring = 0.0
+    for start, X, y in batches:
+        scored = time.perf_counter()
+        predictions, confidences = model.predict(X)
+        scoring += time.perf_counter() - scored
+        evaluation.update(start, y, predictions, confidences)
+
+    summary = evaluation.summary()
+    summary['seconds'] = time.perf_counter() - started
+    summary['scoring_seconds'] = scoring
+    summary['rows_per_second'] = summary['rows'] / summary['seconds'] if summary['seconds'] else 0.0
+    return summary
+
+def print_report(disease, summary, model_status):
+    print(f"{disease}: {summary['rows']} rows scored in {summary['seconds']:.3f}s "
+          f"({summary['rows_per_second']:,.0f} rows/s, {model_status['format']} {model_status['inference']} "
+          f"model {model_status['version']})")
+    print(f"Overall Prediction Accuracy: {summary['accuracy']:.2f}%")
+
+    print("Confusion matrix (rows: actual, columns: predicted):")
+    width = max(8, max(len(str(count)) for row in summary['confusion_matrix'] for count in row) + 2)
+    print(' ' * 8 + ''.join(f'{label:>{width}}' for label in summary['classes']))
+    for label, row in zip(summary['classes'], summary['confusion_matrix']):
+        print(f'{label:>8}' + ''.join(f'{count:>{width}}' for count in row))
+
+    print(f"Mismatches: {summary['mismatch_count']}")
+    for mismatch in summary['mismatches']:
+        print(f"Row {mismatch['row']}: Predicted: {mismatch['predicted']} | Actual: {mismatch['actual']} "
+              f"(confidence {mismatch['confidence']:.2f})")
+    if summary['mismatch_count'] > len(summary['mismatches']):
+        print(f"... {summary['mismatch_count'] - len(summary['mismatches'])} more")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Evaluate a saved disease model on a whole dataset')
+    parser.add_argument('disease', choices=list(DISEASES))
+    parser.add_argument('--csv', help='CSV to evaluate (default: the training dataset)')
+    parser.add_argument('--chunksize', type=int, help='Stream the CSV in chunks of this many rows')
+    parser.add_argument('--model-dir', default=os.environ.get('MODEL_DIR', os.path.join(BASE_DIR, 'backend')))
+    parser.add_argument('--model-format', choices=['auto', 'artifact', 'pickle'], default='auto')
+    parser.add_argument('--show', type=int, default=20, help='Mismatched rows to list')
+    parser.add_argument('--mismatches', help='Write every mismatched row to this CSV')
+    parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.model_dir, DISEASES, poll_interval=0, model_format=args.model_format)
+    model = registry.get(args.disease)
+    if model is None:
+        print(f"No {args.disease} model could be loaded from {args.model_dir}", file=sys.stderr)
+        return 1
+
+    batches = iter_batches(args.disease, args.csv, args.chunksize)
+    try:
+        if args.mismatches:
+            with open(args.mismatches, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['row', 'predicted', 'actual', 'confidence'])
+                summary = evaluate(model, batches, args.show, writer)
+        else:
+            summary = evaluate(model, batches, args.show)
+    except ValueError as e:
+        print(f"Cannot evaluate {args.csv or args.disease}: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps({'disease': args.disease, 'model': model.status(), **summary}, indent=2))
+    else:
+        print_report(args.disease, summary, model.status())
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { DiabetesPrediction, HeartDiseasePrediction, ParkinsonsPrediction, PredictionResult } from '../types';
+import { DiabetesPrediction, HeartDiseasePrediction, ParkinsonsPrediction, PredictionResult, ScreeningRequest, ScreeningResult } from '../types';
 
 const API_BASE_URL = 'https://diseasesprediction-8wvr.onrender.com/api';
 
@@ -29,6 +29,12 @@ export const predictionApi = {
     return response.data;
   },
 
+  // Screen for any subset of the diseases in one request
+  screen: async (data: ScreeningRequest): Promise<ScreeningResult> => {
+    const response = await api.post('/screen', data);
+    return response.data;
+  },
+
   // Health check
   healthCheck: async (): Promise<{ status: string; message: string }> => {
     const response = await api.get('/health');
@@ -59,6 +59,29 @@ export interface PredictionResult {
 
 export type DiseaseType = 'diabetes' | 'heart' | 'parkinsons';
 
+export interface ScreeningRequest {
+  diabetes?: DiabetesPrediction;
+  heart?: HeartDiseasePrediction;
+  parkinsons?: ParkinsonsPrediction;
+}
+
+export interface ScreeningError {
+  error: string;
+  fields?: Record<string, string>;
+}
+
+export interface ScreeningTiming {
+  ms: number; // time spent on this disease, in milliseconds
+  stages: Record<string, number>; // e.g. extract, scale, predict
+}
+
+export interface ScreeningResult {
+  results: Partial<Record<DiseaseType, PredictionResult | ScreeningError>>;
+  errorCount: number;
+  timings: Partial<Record<DiseaseType, ScreeningTiming>>;
+  totalMs: number;
+}
+
 export interface DiseaseInfo {
   name: string;
   description: string;
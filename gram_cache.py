@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed Gram matrix cache for SVM tuning
+Each kernel matrix is computed once per dataset, kernel and gamma, saved as a
+.npy file named by its content hash, and memory-mapped on later use. Fits go
+through SVC(kernel='precomputed') and folds are taken by index slicing, so
+candidates that only differ in C, and every fold, share one matrix.
+Because of that, gamma='scale' and 'auto' are resolved from the whole cached
+dataset, not from each fold's training rows as SVC would; pass a number to
+search exactly what will be refitted.
+"""
+
+import os
+import sys
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.svm import SVC
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+from artifacts import content_version
+from kernels import kernel_matrix
+
+def resolve_gamma(X, gamma):
+    """Numeric gamma as SVC computes it for 'scale' and 'auto'"""
+    if gamma == 'scale':
+        variance = X.var()
+        return 1.0 / (X.shape[1] * variance) if variance != 0 else 1.0
+    if gamma == 'auto':
+        return 1.0 / X.shape[1]
+    return float(gamma)
+
+def kernel_params(X, kernel, gamma='scale', degree=3, coef0=0.0):
+    """The parameters a kernel actually depends on, with gamma resolved"""
+    if kernel == 'linear':
+        return {'kernel': 'linear'}
+    params = {'kernel': kernel, 'gamma': resolve_gamma(X, gamma)}
+    if kernel in ('poly', 'sigmoid'):
+        params['coef0'] = float(coef0)
+    if kernel == 'poly':
+        params['degree'] = int(degree)
+    return params
+
+class GramCache:
+    """On-disk cache of datasets and their Gram matrices, shared by worker processes"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._open = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f'{name}.npy')
+
+    def _save(self, name, array):
+        """Write atomically so concurrent workers never read a partial file"""
+        path = self._path(name)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def _load(self, name):
+        array = self._open.get(name)
+        if array is None:
+            array = self._open[name] = np.load(self._path(name), mmap_mode='r')
+        return array
+
+    def add_dataset(self, X):
+        """Store a feature matrix and return its content key"""
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        key = content_version(str(X.shape).encode('utf-8'), X.tobytes())
+        if not os.path.exists(self._path(f'X-{key}')):
+            self._save(f'X-{key}', X)
+        return key
+
+    def dataset(self, key):
+        return self._load(f'X-{key}')
+
+    def gram(self, key, kernel, gamma='scale', degree=3, coef0=0.0):
+        """Memory-mapped Gram matrix of a stored dataset, computed on first use"""
+        X = self.dataset(key)
+        params = kernel_params(X, kernel, gamma, degree, coef0)
+        name = 'K-' + content_version(key.encode('utf-8'), repr(sorted(params.items())).encode('utf-8'))
+
+        if name in self._open or os.path.exists(self._path(name)):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._save(name, kernel_matrix(np.asarray(X), kernel=params['kernel'], gamma=params.get('gamma', 1.0),
+                                           degree=params.get('degree', 3), coef0=params.get('coef0', 0.0)))
+        return self._load(name)
+
+# One cache per directory and process, so memory maps are reused across fits
+_caches = {}
+
+def get_cache(directory):
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = GramCache(directory)
+    return cache
+
+def sample_indices(n_samples):
+    """Row indices to pass as X to PrecomputedKernelSVC"""
+    return np.arange(n_samples).reshape(-1, 1)
+
+class PrecomputedKernelSVC(ClassifierMixin, BaseEstimator):
+    """SVC over a cached Gram matrix; X holds row indices into the cached dataset
+
+    Cross-validation and successive halving subsample X, so they select rows
+    and columns of the Gram matrix instead of recomputing kernel values.
+    A string gamma is resolved on the whole cached dataset, whatever rows are fitted.
+    """
+
+    def __init__(self, cache_dir=None, dataset=None, kernel='rbf', C=1.0, gamma='scale', degree=3, coef0=0.0):
+        self.cache_dir = cache_dir
+        self.dataset = dataset
+        self.kernel = kernel
+        self.C = C
+        self.gamma = gamma
+        self.degree = degree
+        self.coef0 = coef0
+
+    def _gram(self):
+        return get_cache(self.cache_dir).gram(self.dataset, self.kernel, self.gamma, self.degree, self.coef0)
+
+    def fit(self, X, y):
+        self.train_indices_ = np.asarray(X).ravel().astype(np.intp)
+        gram = self._gram()
+        self.svc_ = SVC(kernel='precomputed', C=self.C)
+        self.svc_.fit(gram[np.ix_(self.train_indices_, self.train_indices_)], y)
+        self.classes_ = self.svc_.classes_
+        return self
+
+    def _rows(self, X):
+        indices = np.asarray(X).ravel().astype(np.intp)
+        return self._gram()[np.ix_(indices, self.train_indices_)]
+
+    def decision_function(self, X):
+        return self.svc_.decision_function(self._rows(X))
+
+    def predict(self, X):
+        return self.svc_.predict(self._rows(X))
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fixed-cost approximations of non-linear kernel SVMs
+Distills an RBF, polynomial or sigmoid SVC into an explicit feature map
+(Nystroem landmarks, or random Fourier features for RBF) followed by a linear
+layer fitted to the SVC's decision values. Reports prediction agreement with
+the exact model against the latency and memory saved, for several component
+counts, and can write the approximation as a model the backend serves.
+
+Usage:
+    python kernel_approx.py diabetes                                  # fit an exact RBF SVC and compare
+    python kernel_approx.py heart --kernel poly --components 25 50 100
+    python kernel_approx.py parkinsons --model-dir sweeps --save 100  # approximate a sweep winner
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import timeit
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from approx import ApproximateKernelModel
+from diseases import DISEASES
+from train import kernel_model, write_derived
+
+def kernel_params(model, X_train):
+    """Numeric kernel parameters of an SVC fitted on the scaled rows X_train"""
+    from gram_cache import resolve_gamma
+
+    # 'scale' depends on the rows the SVC was fitted on; other rows would give another gamma
+    params = {'gamma': float(resolve_gamma(X_train, model.gamma))}
+    if model.kernel in ('poly', 'sigmoid'):
+        params['coef0'] = float(model.coef0)
+    if model.kernel == 'poly':
+        params['degree'] = int(model.degree)
+    return params
+
+def fit_approximation(model, X_train, method, n_components, seed=0, augment=4, noise=0.25, alpha=1e-3):
+    """Fit a feature map on the training rows and a ridge layer to the model's decision values
+
+    The training rows are supplemented with `augment` jittered copies, so the
+    layer also learns the decision function between and around them.
+    """
+    from sklearn.kernel_approximation import Nystroem, RBFSampler
+    from sklearn.linear_model import Ridge
+
+    params = kernel_params(model, X_train)
+    rng = np.random.default_rng(seed)
+    X_fit = np.vstack([X_train] + [X_train + rng.normal(scale=noise, size=X_train.shape) for _ in range(augment)])
+    target = model.decision_function(X_fit)
+
+    if method == 'nystroem':
+        feature_map = Nystroem(kernel=model.kernel, n_components=min(n_components, len(X_train)),
+                               random_state=seed, **params).fit(X_train)
+        ridge = Ridge(alpha=alpha).fit(feature_map.transform(X_fit), target)
+        # transform(X) = K(X, landmarks) @ normalization_.T, folded into the layer's weights
+        return ApproximateKernelModel('nystroem', model.kernel, params, feature_map.components_,
+                                      feature_map.normalization_.T @ ridge.coef_, ridge.intercept_, model.classes_)
+
+    if model.kernel != 'rbf':
+        raise ValueError('Random Fourier features only approximate the rbf kernel')
+    feature_map = RBFSampler(gamma=params['gamma'], n_components=n_components, random_state=seed).fit(X_train)
+    ridge = Ridge(alpha=alpha).fit(feature_map.transform(X_fit), target)
+    # transform(X) = sqrt(2 / D) cos(X @ random_weights_ + random_offset_)
+    return ApproximateKernelModel('rff', model.kernel, params, feature_map.random_weights_,
+                                  np.sqrt(2.0 / n_components) * ridge.coef_, ridge.intercept_, model.classes_,
+                                  offsets=feature_map.random_offset_)
+
+def per_row_seconds(decision_function, X, number):
+    """Best time per row scoring X one row at a time, and as one batch"""
+    rows = [X[i:i + 1] for i in range(min(number, len(X)))]
+
+    def single():
+        for row in rows:
+            decision_function(row)
+
+    single_seconds = min(timeit.repeat(single, number=1, repeat=5)) / len(rows)
+    batch_seconds = min(timeit.repeat(lambda: decision_function(X), number=3, repeat=5)) / 3 / len(X)
+    return single_seconds, batch_seconds
+
+def model_bytes(model):
+    """Bytes of the arrays prediction reads: support vectors and dual coefficients for an SVC"""
+    if isinstance(model, ApproximateKernelModel):
+        return model.nbytes
+    return model.support_vectors_.nbytes + model.dual_coef_.nbytes + model.intercept_.nbytes
+
+def compare(model, approximation, X_train, X_test, y_test, args):
+    X_all = np.vstack([X_train, X_test])
+    exact_decision = model.decision_function(X_all)
+    approx_decision = approximation.decision_function(X_all)
+    exact_test = model.predict(X_test)
+    approx_test = approximation.predict(X_test)
+    single, batch = per_row_seconds(approximation.decision_function, X_all, args.timing_rows)
+    return {
+        'method': approximation.method,
+        'components': approximation.n_components,
+        'agreement_test': float(np.mean(exact_test == approx_test) * 100),
+        'agreement_all': float(np.mean((exact_decision > 0) == (approx_decision > 0)) * 100),
+        'decision_mae': float(np.mean(np.abs(exact_decision - approx_decision))),
+        'test_accuracy': float(np.mean(approx_test == y_test) * 100),
+        'single_us': single * 1e6,
+        'batch_ns_per_row': batch * 1e9,
+        'bytes': model_bytes(approximation),
+        'pickle_bytes': len(pickle.dumps(approximation))
+    }
+
+def print_report(disease, exact, rows):
+    print(f"{disease}: exact {exact['kernel']} SVC with {exact['support_vectors']} support vectors, "
+          f"test accuracy {exact['test_accuracy']:.2f}%, {exact['single_us']:.1f} us/row single, "
+          f"{exact['batch_ns_per_row']:,.0f} ns/row batched, {exact['bytes']:,} bytes")
+    print(f"{'method':<10}{'comp':>6}{'agree test':>12}{'agree all':>11}{'dec MAE':>9}{'test acc':>10}"
+          f"{'us/row':>9}{'speedup':>9}{'ns/row':>9}{'speedup':>9}{'bytes':>10}{'ratio':>7}")
+    for row in rows:
+        print(f"{row['method']:<10}{row['components']:>6}{row['agreement_test']:>11.2f}%{row['agreement_all']:>10.2f}%"
+              f"{row['decision_mae']:>9.3f}{row['test_accuracy']:>9.2f}%"
+              f"{row['single_us']:>9.1f}{exact['single_us'] / row['single_us']:>8.1f}x"
+              f"{row['batch_ns_per_row']:>9,.0f}{exact['batch_ns_per_row'] / row['batch_ns_per_row']:>8.1f}x"
+              f"{row['bytes']:>10,}{exact['bytes'] / row['bytes']:>6.1f}x")
+
+def approximate_disease(disease, args):
+    model, scaler, calibrator, X_train, X_test, y_train, y_test = kernel_model(disease, args)
+    X_all = np.vstack([X_train, X_test])
+    single, batch = per_row_seconds(model.decision_function, X_all, args.timing_rows)
+    exact = {
+        'kernel': model.kernel,
+        'support_vectors': int(len(model.support_vectors_)),
+        'test_accuracy': float(np.mean(model.predict(X_test) == y_test) * 100),
+        'single_us': single * 1e6,
+        'batch_ns_per_row': batch * 1e9,
+        'bytes': model_bytes(model),
+        'pickle_bytes': len(pickle.dumps(model))
+    }
+
+    rows = []
+    saved = None
+    for method in args.methods:
+        if method == 'rff' and model.kernel != 'rbf':
+            continue
+        for n_components in args.components:
+            started = time.perf_counter()
+            approximation = fit_approximation(model, X_train, method, n_components, args.seed, args.augment, args.noise)
+            row = compare(model, approximation, X_train, X_test, y_test, args)
+            row['fit_seconds'] = time.perf_counter() - started
+            rows.append(row)
+            if args.save == n_components and method == args.methods[0]:
+                saved = approximation
+
+    print_report(disease, exact, rows)
+    result = {'disease': disease, 'exact': exact, 'approximations': rows}
+
+    if saved is not None:
+        saved.source = {'kernel': model.kernel, 'support_vectors': exact['support_vectors'],
+                        'test_accuracy': exact['test_accuracy']}
+        written = write_derived(disease, saved, scaler, calibrator, args.output_dir)
+        print(f"Wrote {saved.method} approximation with {saved.n_components} components: {', '.join(written)}")
+        result['saved'] = written
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Approximate kernel SVMs with an explicit feature map and a linear layer')
+    parser.add_argument('diseases', nargs='*', help=f"Diseases to approximate (default: {' '.join(DISEASES)})")
+    parser.add_argument('--model-dir', help='Approximate the <disease>_model.sav here instead of fitting a new SVC')
+    parser.add_argument('--kernel', choices=['rbf', 'poly', 'sigmoid'], default='rbf', help='Kernel of a newly fitted SVC')
+    parser.add_argument('--C', type=float, default=1.0)
+    parser.add_argument('--gamma', default='scale')
+    parser.add_argument('--degree', type=int, default=3)
+    parser.add_argument('--coef0', type=float, default=0.0)
+    parser.add_argument('--methods', nargs='+', choices=['nystroem', 'rff'], default=['nystroem', 'rff'])
+    parser.add_argument('--components', nargs='+', type=int, default=[25, 50, 100, 200])
+    parser.add_argument('--augment', type=int, default=4, help='Jittered copies of the training rows to distill on')
+    parser.add_argument('--noise', type=float, default=0.25, help='Jitter, in standard deviations')
+    parser.add_argument('--timing-rows', type=int, default=200, help='Rows scored one at a time for single-row latency')
+    parser.add_argument('--save', type=int, metavar='COMPONENTS',
+                        help='Write the first method\'s approximation with this many components as a servable model')
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'approx'))
+    parser.add_argument('--dataset-dir', default=os.path.join(BASE_DIR, 'dataset'))
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=2)
+    parser.add_argument('--json', help='Also write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    diseases = args.diseases or list(DISEASES)
+    unknown = [disease for disease in diseases if disease not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)} (choose from {', '.join(DISEASES)})")
+    if args.save is not None and args.save not in args.components:
+        parser.error('--save must be one of the --components counts')
+    try:
+        args.gamma = float(args.gamma)
+    except ValueError:
+        pass
+
+    results = []
+    for disease in diseases:
+        try:
+            results.append(approximate_disease(disease, args))
+        except (OSError, ValueError) as e:
+            print(f"{disease}: {e}", file=sys.stderr)
+            return 1
+        print()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+            f.write('\n')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-validated kernel sweep for the disease prediction models
+Searches kernel x C x gamma (x degree for poly) with successive halving across
+all cores, ranks candidates by cross-validated score, and saves the winner
+together with a leaderboard
+
+Usage:
+    python kernel_sweep.py                          # all diseases into sweeps/
+    python kernel_sweep.py heart --kernels rbf poly
+    python kernel_sweep.py diabetes --output-dir backend   # promote the winner
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from train import BASE_DIR, DISEASES, load_dataset, write_models
+
+KERNELS = ['linear', 'poly', 'rbf', 'sigmoid']
+
+def parse_gamma(value):
+    return value if value in ('scale', 'auto') else float(value)
+
+def candidate_grid(kernels, Cs, gammas, degrees, prefix='svc__'):
+    """Parameter grid for the scaler + SVC pipeline; gamma only applies to non-linear kernels"""
+    grid = []
+    for kernel in kernels:
+        params = {f'{prefix}kernel': [kernel], f'{prefix}C': list(Cs)}
+        if kernel != 'linear':
+            params[f'{prefix}gamma'] = list(gammas)
+        if kernel == 'poly':
+            params[f'{prefix}degree'] = list(degrees)
+        grid.append(params)
+    return grid
+
+def leaderboard(search):
+    """Every evaluated candidate, latest halving round first, best score first within a round"""
+    results = search.cv_results_
+    rows = []
+    for i, params in enumerate(results['params']):
+        rows.append({
+            'iteration': int(results['iter'][i]),
+            'n_resources': int(results['n_resources'][i]),
+            'params': {name.replace('svc__', ''): value for name, value in params.items()},
+            'mean_score': float(results['mean_test_score'][i]),
+            'std_score': float(results['std_test_score'][i]),
+            'mean_fit_seconds': float(results['mean_fit_time'][i])
+        })
+
+    # sklearn ranks across rounds, where small early rounds can score higher, so rank by position
+    rows.sort(key=lambda row: (-row['iteration'], -row['mean_score']))
+    for rank, row in enumerate(rows, 1):
+        row['rank'] = rank
+    return rows
+
+def halving_search(estimator, grid, args, refit=True):
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+
+    return HalvingGridSearchCV(
+        estimator, grid,
+        factor=args.factor,
+        cv=StratifiedKFold(args.cv, shuffle=True, random_state=args.seed),
+        scoring=args.scoring,
+        min_resources='exhaust',
+        n_jobs=args.jobs,
+        refit=refit,
+        random_state=args.seed
+    )
+
+def pipeline_search(X_train, y_train, args):
+    """Search a scaler + SVC pipeline, refitting the scaler inside every fold"""
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+
+    grid = candidate_grid(args.kernels, args.Cs, args.gammas, args.degrees)
+    search = halving_search(Pipeline([('scaler', StandardScaler()), ('svc', SVC())]), grid, args)
+    search.fit(X_train, y_train)
+    return search, search.best_estimator_.named_steps['scaler'], search.best_estimator_.named_steps['svc']
+
+def gram_cache_search(X_train, y_train, args):
+    """Search over cached Gram matrices of the training split, scaled once up front"""
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVC
+    from gram_cache import PrecomputedKernelSVC, get_cache, resolve_gamma, sample_indices
+
+    scaler = StandardScaler().fit(X_train)
+    X_scaled = scaler.transform(X_train)
+    cache = get_cache(args.gram_cache)
+    dataset = cache.add_dataset(X_scaled)
+
+    # A fold's rows share one matrix, so 'scale' and 'auto' are resolved once on the whole training split
+    # rather than per fold, and the winner is refitted with the same number
+    gammas = list(dict.fromkeys(resolve_gamma(X_scaled, gamma) for gamma in args.gammas))
+
+    # Compute every matrix here once, rather than in whichever workers need it first
+    grid = candidate_grid(args.kernels, args.Cs, gammas, args.degrees, prefix='')
+    for params in grid:
+        for kernel in params['kernel']:
+            for gamma in params.get('gamma', ['scale']):
+                for degree in params.get('degree', [3]):
+                    cache.gram(dataset, kernel, gamma, degree)
+
+    estimator = PrecomputedKernelSVC(cache_dir=args.gram_cache, dataset=dataset)
+    search = halving_search(estimator, grid, args, refit=False)
+    search.fit(sample_indices(len(X_scaled)), y_train)
+
+    classifier = SVC(**search.best_params_).fit(X_scaled, y_train)
+    return search, scaler, classifier
+
+def sweep_disease(disease, args):
+    """Run the halving search for one disease and return the refitted winner"""
+    from sklearn.metrics import accuracy_score
+    from calibration import calibrate_model
+
+    started = time.perf_counter()
+    X_train, X_test, y_train, y_test = load_dataset(disease, args.dataset_dir, args.test_size, args.seed)
+
+    search_fn = gram_cache_search if args.gram_cache else pipeline_search
+    search, scaler, classifier = search_fn(X_train, y_train, args)
+    X_train_scaled = scaler.transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    train_accuracy = accuracy_score(y_train, classifier.predict(X_train_scaled)) * 100
+    test_accuracy = accuracy_score(y_test, classifier.predict(X_test_scaled)) * 100
+    calibrator = calibrate_model(classifier, X_train_scaled, y_train, args.calibration)
+    board = leaderboard(search)
+
+    return {
+        'disease': disease,
+        'model': classifier,
+        'scaler': scaler,
+        'calibrator': calibrator,
+        'summary': {
+            'best_params': board[0]['params'],
+            'cv_score': float(search.best_score_),
+            'scoring': args.scoring,
+            'train_accuracy': train_accuracy,
+            'test_accuracy': test_accuracy,
+            'candidates': int(search.n_candidates_[0]),
+            'iterations': int(search.n_iterations_),
+            'n_resources': [int(n) for n in search.n_resources_],
+            'n_candidates': [int(n) for n in search.n_candidates_],
+            'seconds': time.perf_counter() - started
+        },
+        'leaderboard': board
+    }
+
+def write_leaderboard(result, output_dir):
+    """Write the summary and leaderboard of one disease as JSON, atomically"""
+    path = os.path.join(output_dir, f"{result['disease']}_leaderboard.json")
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'disease': result['disease'], **result['summary'], 'leaderboard': result['leaderboard']}, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+    return path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Cross-validated SVM kernel sweep with successive halving')
+    parser.add_argument('diseases', nargs='*', help=f"Diseases to sweep (default: {' '.join(DISEASES)})")
+    parser.add_argument('--kernels', nargs='+', choices=KERNELS, default=KERNELS)
+    parser.add_argument('--C', nargs='+', type=float, default=[0.1, 1.0, 10.0, 100.0], dest='Cs')
+    parser.add_argument('--gamma', nargs='+', type=parse_gamma, default=['scale', 0.001, 0.01, 0.1, 1.0], dest='gammas')
+    parser.add_argument('--degree', nargs='+', type=int, default=[2, 3], dest='degrees')
+    parser.add_argument('--cv', type=int, default=5, help='Cross-validation folds')
+    parser.add_argument('--factor', type=int, default=3, help='Keep 1/factor of the candidates each round')
+    parser.add_argument('--scoring', default='accuracy')
+    parser.add_argument('--jobs', type=int, default=-1, help='Parallel fits (default: all cores)')
+    parser.add_argument('--dataset-dir', default=os.path.join(BASE_DIR, 'dataset'))
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'sweeps'))
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=2)
+    parser.add_argument('--calibration', choices=['platt', 'isotonic'], default='platt')
+    parser.add_argument('--gram-cache', metavar='DIR',
+                        help='Fit from Gram matrices cached in DIR instead of recomputing kernels for every fit')
+    args = parser.parse_args(argv)
+
+    diseases = list(dict.fromkeys(args.diseases)) or list(DISEASES)
+    unknown = [disease for disease in diseases if disease not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    for disease in diseases:
+        result = sweep_disease(disease, args)
+        summary = result['summary']
+        files = write_models(result, args.output_dir) + [write_leaderboard(result, args.output_dir)]
+
+        print(f"{disease}: best {summary['best_params']} "
+              f"cv {summary['scoring']} {summary['cv_score']:.4f}, test accuracy {summary['test_accuracy']:.2f}% "
+              f"({summary['candidates']} candidates, {summary['iterations']} rounds, {summary['seconds']:.1f}s)")
+        for path in files:
+            print(f"  wrote {path}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Support-vector reduction for kernel SVMs
+Compresses an RBF, polynomial or sigmoid SVC to the smallest reduced set of
+vectors whose training accuracy stays within a tolerance of the original's.
+The reduced set is either a subset of the support vectors, picked by orthogonal
+matching pursuit ('prune'), or k-means centres of the support vectors of each
+sign ('merge'). In both cases the coefficients and bias are refitted to
+reproduce the original decision values. The result is saved as drop-in
+<disease>_model.sav files, with a before/after report of support vectors,
+size, load time and latency.
+
+Usage:
+    python sv_reduce.py diabetes                                   # fit an exact RBF SVC and reduce it
+    python sv_reduce.py heart --kernel poly --method merge --tolerance 0.5
+    python sv_reduce.py parkinsons --model-dir sweeps --output-dir backend
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import timeit
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from diseases import DISEASES
+from kernel_approx import kernel_params, per_row_seconds
+from kernels import kernel_matrix
+from reduced import ReducedKernelSVC
+from train import kernel_model, write_derived
+
+def distillation_set(X_train, augment, noise, seed=0):
+    """Training rows plus jittered copies, on which reduced models must reproduce the original"""
+    rng = np.random.default_rng(seed)
+    return np.vstack([X_train] + [X_train + rng.normal(scale=noise, size=X_train.shape) for _ in range(augment)])
+
+def refit(vectors, kernel, params, X_fit, target):
+    """Least-squares coefficients and bias of a kernel expansion over the given vectors"""
+    K = kernel_matrix(X_fit, vectors, kernel, **params)
+    design = np.hstack([K, np.ones((len(K), 1))])
+    solution = np.linalg.lstsq(design, target, rcond=None)[0]
+    return solution[:-1], solution[-1]
+
+def prune(model, params, X_fit, target, size):
+    """The `size` support vectors that best reproduce the decision values, by orthogonal matching pursuit"""
+    from sklearn.linear_model import OrthogonalMatchingPursuit
+
+    K = kernel_matrix(X_fit, model.support_vectors_, model.kernel, **params)
+    pursuit = OrthogonalMatchingPursuit(n_nonzero_coefs=size, fit_intercept=True).fit(K, target)
+    chosen = np.flatnonzero(pursuit.coef_)
+    return model.support_vectors_[chosen]
+
+def merge(model, size, seed=0):
+    """k-means centres of the positive and negative support vectors, split in proportion"""
+    from sklearn.cluster import KMeans
+
+    signs = np.sign(model.dual_coef_.ravel())
+    centres = []
+    for sign in (-1, 1):
+        group = model.support_vectors_[signs == sign]
+        n_clusters = min(len(group), max(1, round(size * len(group) / len(signs))))
+        if len(group):
+            centres.append(KMeans(n_clusters=n_clusters, n_init=4, random_state=seed).fit(group).cluster_centers_)
+    return np.vstack(centres)
+
+def reduce_to(model, params, X_fit, target, size, method, seed=0):
+    """A reduced model of `size` vectors with coefficients refitted to the original decision values"""
+    if method == 'prune':
+        vectors = prune(model, params, X_fit, target, size)
+    else:
+        vectors = merge(model, size, seed)
+    coefficients, bias = refit(vectors, model.kernel, params, X_fit, target)
+    return ReducedKernelSVC(model.kernel, params, vectors, coefficients, bias, model.classes_)
+
+def smallest_within_tolerance(model, X_train, y_train, X_fit, args):
+    """Binary search for the fewest vectors keeping training accuracy within the tolerance
+
+    Returns the chosen model and every size tried with its training accuracy.
+    """
+    params = kernel_params(model, X_train)
+    target = model.decision_function(X_fit)
+    required = np.mean(model.predict(X_train) == y_train) * 100 - args.tolerance
+
+    tried = {}
+    best = None
+    low, high = 1, len(model.support_vectors_)
+    while low <= high:
+        size = (low + high) // 2
+        candidate = reduce_to(model, params, X_fit, target, size, args.method, args.seed)
+        accuracy = np.mean(candidate.predict(X_train) == y_train) * 100
+        tried[size] = accuracy
+        if accuracy >= required:
+            best = candidate
+            high = size - 1
+        else:
+            low = size + 1
+    if best is None:
+        raise ValueError(f'No reduced set stays within {args.tolerance} points of the original training accuracy')
+    return best, tried
+
+def measure(model, X_train, X_test, y_train, y_test, args):
+    """Support vectors, size, load time, latency and accuracy of a model"""
+    payload = pickle.dumps(model)
+    load_seconds = min(timeit.repeat(lambda: pickle.loads(payload), number=10, repeat=3)) / 10
+    X_all = np.vstack([X_train, X_test])
+    single, batch = per_row_seconds(model.decision_function, X_all, args.timing_rows)
+    return {
+        'support_vectors': int(len(model.support_vectors_)),
+        'pickle_bytes': len(payload),
+        'load_ms': load_seconds * 1000,
+        'single_us': single * 1e6,
+        'batch_ns_per_row': batch * 1e9,
+        'train_accuracy': float(np.mean(model.predict(X_train) == y_train) * 100),
+        'test_accuracy': float(np.mean(model.predict(X_test) == y_test) * 100)
+    }
+
+def print_report(disease, before, after, agreement):
+    print(f"{disease}: {before['kernel']} SVC reduced by {after['method']}")
+    print(f"{'':<18}{'before':>12}{'after':>12}{'change':>10}")
+    for key, label, fmt in (('support_vectors', 'support vectors', ',.0f'), ('pickle_bytes', 'pickle bytes', ',.0f'),
+                            ('load_ms', 'load ms', '.3f'), ('single_us', 'single us/row', '.1f'),
+                            ('batch_ns_per_row', 'batch ns/row', ',.0f')):
+        ratio = before[key] / after[key] if after[key] else float('inf')
+        print(f"{label:<18}{before[key]:>12{fmt}}{after[key]:>12{fmt}}{ratio:>9.1f}x")
+    for key, label in (('train_accuracy', 'train accuracy'), ('test_accuracy', 'test accuracy')):
+        print(f"{label:<18}{before[key]:>11.2f}%{after[key]:>11.2f}%{after[key] - before[key]:>+9.2f}pt")
+    print(f"Predictions agree with the original on {agreement['train']:.2f}% of training and "
+          f"{agreement['test']:.2f}% of test rows")
+
+def reduce_disease(disease, args):
+    model, scaler, calibrator, X_train, X_test, y_train, y_test = kernel_model(disease, args)
+    X_fit = distillation_set(X_train, args.augment, args.noise, args.seed)
+
+    started = time.perf_counter()
+    reduced, tried = smallest_within_tolerance(model, X_train, y_train, X_fit, args)
+    seconds = time.perf_counter() - started
+
+    before = dict(measure(model, X_train, X_test, y_train, y_test, args), kernel=model.kernel)
+    after = dict(measure(reduced, X_train, X_test, y_train, y_test, args), method=args.method)
+    agreement = {
+        'train': float(np.mean(reduced.predict(X_train) == model.predict(X_train)) * 100),
+        'test': float(np.mean(reduced.predict(X_test) == model.predict(X_test)) * 100)
+    }
+    print_report(disease, before, after, agreement)
+
+    reduced.source = {'kernel': model.kernel, 'support_vectors': before['support_vectors'], 'method': args.method,
+                      'tolerance': args.tolerance}
+    report = {
+        'disease': disease, 'method': args.method, 'tolerance': args.tolerance, 'seconds': seconds,
+        'before': before, 'after': after, 'agreement': agreement,
+        'tried': {str(size): accuracy for size, accuracy in sorted(tried.items())}
+    }
+    if not args.dry_run:
+        written = write_derived(disease, reduced, scaler, calibrator, args.output_dir)
+        path = os.path.join(args.output_dir, f'{disease}_reduction.json')
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Wrote {', '.join(written + [path])}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compress kernel SVMs to a reduced set of support vectors')
+    parser.add_argument('diseases', nargs='*', help=f"Diseases to reduce (default: {' '.join(DISEASES)})")
+    parser.add_argument('--model-dir', help='Reduce the <disease>_model.sav here instead of fitting a new SVC')
+    parser.add_argument('--kernel', choices=['rbf', 'poly', 'sigmoid'], default='rbf', help='Kernel of a newly fitted SVC')
+    parser.add_argument('--C', type=float, default=1.0)
+    parser.add_argument('--gamma', default='scale')
+    parser.add_argument('--degree', type=int, default=3)
+    parser.add_argument('--coef0', type=float, default=0.0)
+    parser.add_argument('--method', choices=['prune', 'merge'], default='prune')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='Training accuracy, in percentage points, the reduced model may lose')
+    parser.add_argument('--augment', type=int, default=4, help='Jittered copies of the training rows to refit on')
+    parser.add_argument('--noise', type=float, default=0.25, help='Jitter, in standard deviations')
+    parser.add_argument('--timing-rows', type=int, default=200, help='Rows scored one at a time for single-row latency')
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'reduced'))
+    parser.add_argument('--dry-run', action='store_true', help='Report without writing the reduced models')
+    parser.add_argument('--dataset-dir', default=os.path.join(BASE_DIR, 'dataset'))
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=2)
+    parser.add_argument('--json', help='Also write every report to this JSON file')
+    args = parser.parse_args(argv)
+
+    diseases = args.diseases or list(DISEASES)
+    unknown = [disease for disease in diseases if disease not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)} (choose from {', '.join(DISEASES)})")
+    try:
+        args.gamma = float(args.gamma)
+    except ValueError:
+        pass
+
+    reports = []
+    for disease in diseases:
+        try:
+            reports.append(reduce_disease(disease, args))
+        except (OSError, ValueError) as e:
+            print(f"{disease}: {e}", file=sys.stderr)
+            return 1
+        print()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+            f.write('\n')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parallel training pipeline for the disease prediction models
+Trains the selected diseases concurrently, one process each, and writes the
+model, scaler, calibrator and artifact of every disease once all are fitted
+
+Usage:
+    python train.py                        # all diseases into backend/
+    python train.py heart --output-dir out
+    python train.py --summary summary.json
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Disease specs, calibration and artifact export are shared with the backend
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, 'backend'))
+from diseases import DISEASES
+
+def peak_memory_mb():
+    """Peak resident set size of the current process in MB"""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def load_dataset(disease, dataset_dir, test_size=0.2, seed=2):
+    """Stratified train/test split of a disease dataset, unscaled"""
+    from sklearn.model_selection import train_test_split
+    from dataset_cache import load_xy
+
+    # Features come in the order the API sends them, as the plain array it scores
+    X, y = load_xy(disease, dataset_dir)
+    return train_test_split(X, y, test_size=test_size, stratify=y, random_state=seed)
+
+def train_disease(disease, dataset_dir, test_size=0.2, seed=2, calibration='platt'):
+    """Fit the scaler, linear SVM and calibrator for one disease, in memory"""
+    from sklearn import svm
+    from sklearn.metrics import accuracy_score
+    from sklearn.preprocessing import StandardScaler
+    from calibration import calibrate_model
+
+    started = time.perf_counter()
+    spec = DISEASES[disease]
+
+    # Split first so the scaler only sees training data
+    X_train, X_test, y_train, y_test = load_dataset(disease, dataset_dir, test_size, seed)
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    classifier = svm.SVC(kernel='linear')
+    classifier.fit(X_train, y_train)
+
+    train_accuracy = accuracy_score(y_train, classifier.predict(X_train)) * 100
+    test_accuracy = accuracy_score(y_test, classifier.predict(X_test)) * 100
+
+    calibrator = calibrate_model(classifier, X_train, y_train, calibration)
+
+    return {
+        'disease': disease,
+        'model': classifier,
+        'scaler': scaler,
+        'calibrator': calibrator,
+        'summary': {
+            'samples': len(X_train) + len(X_test),
+            'features': len(spec.columns),
+            'support_vectors': int(classifier.n_support_.sum()),
+            'train_accuracy': train_accuracy,
+            'test_accuracy': test_accuracy,
+            'seconds': time.perf_counter() - started,
+            'peak_memory_mb': peak_memory_mb()
+        }
+    }
+
+def write_models(result, output_dir):
+    """Write one disease's files, each to a temporary name first and then renamed into place"""
+    from artifacts import artifact_path, export_artifact
+
+    disease = result['disease']
+    paths = {
+        part: os.path.join(output_dir, f'{disease}_{part}.sav')
+        for part in ('scaler', 'calibrator', 'model')
+    }
+
+    # Without a calibrator there is no file; the backend then reports the model's own confidence
+    stale_calibrator = paths.pop('calibrator') if result['calibrator'] is None else None
+
+    tmp_paths = {}
+    for part, path in paths.items():
+        tmp_paths[part] = f'{path}.tmp'
+        with open(tmp_paths[part], 'wb') as f:
+            pickle.dump(result[part], f)
+
+    # The artifact hashes the pickle contents, so the temporary files give the final version.
+    # It is replaced first and the model last: until the model lands the pickles do not match
+    # the artifact, and the backend refuses that mix and keeps serving the old version.
+    written = list(paths.values())
+    compact_path = artifact_path(output_dir, disease)
+    linear = result['model'].kernel == 'linear'
+    if linear:
+        summary = result['summary']
+        metadata = {
+            'columns': DISEASES[disease].columns,
+            'train_accuracy': summary['train_accuracy'],
+            'test_accuracy': summary['test_accuracy']
+        }
+        export_artifact(compact_path, disease, result['model'], result['scaler'], calibrator=result['calibrator'],
+                        source_paths=[tmp_paths[part] for part in ('model', 'scaler', 'calibrator') if part in tmp_paths],
+                        metadata=metadata)
+        written.append(compact_path)
+
+    for part, path in paths.items():
+        os.replace(tmp_paths[part], path)
+
+    # Only linear models have an artifact; an old one would now make the backend refuse the new pickles.
+    # A calibrator left from an earlier model would be loaded with this one, so it goes too.
+    if not linear and os.path.exists(compact_path):
+        os.remove(compact_path)
+    if stale_calibrator is not None and os.path.exists(stale_calibrator):
+        os.remove(stale_calibrator)
+
+    return written
+
+def load_models(disease, model_dir):
+    """A disease's saved model, scaler and calibrator; the calibrator is None when there is no file"""
+    paths = {part: os.path.join(model_dir, f'{disease}_{part}.sav') for part in ('model', 'scaler', 'calibrator')}
+    with open(paths['model'], 'rb') as f:
+        model = pickle.load(f)
+    with open(paths['scaler'], 'rb') as f:
+        scaler = pickle.load(f)
+    calibrator = None
+    if os.path.exists(paths['calibrator']):
+        with open(paths['calibrator'], 'rb') as f:
+            calibrator = pickle.load(f)
+    return model, scaler, calibrator
+
+def kernel_model(disease, args):
+    """A kernel SVC with its scaler, calibrator and scaled data splits, for tools that compress it
+
+    The SVC is loaded from args.model_dir, or fitted from args.kernel, C, gamma,
+    degree and coef0 when no directory is given.
+    """
+    from sklearn import svm
+    from sklearn.preprocessing import StandardScaler
+    from calibration import calibrate_model
+
+    X_train, X_test, y_train, y_test = load_dataset(disease, args.dataset_dir, args.test_size, args.seed)
+    if args.model_dir:
+        model, scaler, calibrator = load_models(disease, args.model_dir)
+    else:
+        scaler = StandardScaler().fit(X_train)
+        model = svm.SVC(kernel=args.kernel, C=args.C, gamma=args.gamma, degree=args.degree, coef0=args.coef0)
+        model.fit(scaler.transform(X_train), y_train)
+        calibrator = calibrate_model(model, scaler.transform(X_train), y_train)
+
+    if getattr(model, 'kernel', None) not in ('rbf', 'poly', 'sigmoid'):
+        raise ValueError(f"{disease} model has kernel {getattr(model, 'kernel', None)!r}; "
+                         f"only rbf, poly and sigmoid SVCs are supported")
+    return model, scaler, calibrator, scaler.transform(X_train), scaler.transform(X_test), y_train, y_test
+
+def write_derived(disease, model, scaler, calibrator, output_dir):
+    """Write a model derived from a kernel SVC with the SVC's scaler and calibrator
+
+    The derived model reproduces the SVC's decision values, so both still apply.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    return write_models({'disease': disease, 'model': model, 'scaler': scaler, 'calibrator': calibrator,
+                         'summary': {}}, output_dir)
+
+def run_isolated(calls, workers):
+    """Run each (function, args) in a process of its own, up to workers at once, yielding results as they finish"""
+    pending = list(calls)
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                function, args = pending.pop(0)
+                executor = ProcessPoolExecutor(max_workers=1)
+                running[executor.submit(function, *args)] = executor
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future).shutdown()
+                yield future.result()
+    finally:
+        for executor in running.values():
+            executor.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the disease prediction models in parallel')
+    parser.add_argument('diseases', nargs='*', help=f"Diseases to train (default: {' '.join(DISEASES)})")
+    parser.add_argument('--dataset-dir', default=os.path.join(BASE_DIR, 'dataset'))
+    parser.add_argument('--output-dir', default=os.path.join(BASE_DIR, 'backend'))
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per disease)')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=2)
+    parser.add_argument('--calibration', choices=['platt', 'isotonic'], default='platt')
+    parser.add_argument('--summary', help='Write the JSON summary to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    diseases = list(dict.fromkeys(args.diseases)) or list(DISEASES)
+    unknown = [disease for disease in diseases if disease not in DISEASES]
+    if unknown:
+        parser.error(f"unknown disease(s): {', '.join(unknown)}")
+    workers = args.workers or len(diseases)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    results = {}
+
+    # A fresh process per disease keeps peak memory figures separate
+    calls = [(train_disease, (disease, args.dataset_dir, args.test_size, args.seed, args.calibration))
+             for disease in diseases]
+    for result in run_isolated(calls, workers):
+        summary = result['summary']
+        results[result['disease']] = result
+        print(f"{result['disease']}: test accuracy {summary['test_accuracy']:.2f}% "
+              f"in {summary['seconds']:.2f}s, peak {summary['peak_memory_mb']:.0f} MB", file=sys.stderr)
+
+    # Nothing is written until every disease has trained
+    summary = {'diseases': {}, 'workers': workers}
+    for disease in diseases:
+        result = results[disease]
+        result['summary']['files'] = write_models(result, args.output_dir)
+        summary['diseases'][disease] = result['summary']
+    summary['wall_seconds'] = time.perf_counter() - started
+
+    output = json.dumps(summary, indent=2)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    sys.exit(main())